@@ -0,0 +1,60 @@
+"""Registrasi, verifikasi, dan hak admin user di atas StorageBackend"""
+import os
+
+
+def register_user(storage, username, password, gender, birth_date):
+    # Konversi birth_date menjadi string untuk menghindari error JSON serialization
+    birth_date_str = birth_date.strftime('%Y-%m-%d') if birth_date else None
+    # Simpan dengan urutan: username, password, Gender, Date (sesuai Google Sheet)
+    if not storage.add_user(username, password, gender, birth_date_str):
+        return False, "Username sudah terdaftar!"
+    return True, "Registrasi berhasil!"
+
+
+def verify_user(storage, username, password):
+    user = storage.get_user(username)
+    if user is not None:
+        if str(user.get('password', '')) == password:
+            return True, "Login berhasil!"
+        else:
+            return False, "Password salah!"
+    else:
+        return False, "Username tidak ditemukan!"
+
+
+def admin_usernames(secrets=None):
+    """Username admin dari env DIABETES_ADMINS (dipisah koma) atau `st.secrets["admin"]["usernames"]`.
+
+    Nama dipakai persis seperti ditulis: username peka huruf besar/kecil di
+    semua backend, jadi "BUDI" adalah user lain yang bisa didaftarkan siapa saja.
+    """
+    names = os.environ.get('DIABETES_ADMINS')
+    if names is not None:
+        return {name.strip() for name in names.split(',') if name.strip()}
+    try:
+        return {str(name) for name in secrets['admin']['usernames']}
+    except Exception:
+        return set()
+
+
+def is_admin(username, secrets=None):
+    return bool(username) and str(username) in admin_usernames(secrets)
+
+
+# Kunci session_state yang hanya diisi setelah login dengan password di sesi ini
+VERIFIED_LOGIN_KEY = 'login_terverifikasi'
+
+
+def mark_verified_login(session_state, username):
+    session_state[VERIFIED_LOGIN_KEY] = str(username)
+
+
+def clear_verified_login(session_state):
+    session_state.pop(VERIFIED_LOGIN_KEY, None)
+
+
+def session_is_admin(session_state, secrets=None):
+    """Hak admin untuk sesi ini; username dari URL (?username=) saja tidak cukup, harus login dengan password"""
+    username = session_state.get('username')
+    verified = session_state.get(VERIFIED_LOGIN_KEY)
+    return bool(verified) and verified == str(username or '') and is_admin(username, secrets)
@@ -1,24 +1,66 @@
 import streamlit as st
-import joblib
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
 import os
-import base64
-import requests
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import json
-
-# Inisialisasi koneksi Google Sheet
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-credentials_dict = st.secrets["gcp_service_account"]
-credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-client = gspread.authorize(credentials)
-sheet = client.open_by_url("https://docs.google.com/spreadsheets/d/1em8HcKtX5pCy53S2_4wc9JBPVkXC3NiVznwvTsDsMpU/edit")
-users_sheet = sheet.worksheet("Users")
-riwayat_sheet = sheet.worksheet("Riwayat")
+import sys
+import datetime
+from metrics import begin_trace, current_trace, exporter_from_env, span, start_span
+from metrics import registry as metrics_registry
+from profiling import profiler_begin, profiler_finish
+begin_trace()
+rerun_timer = start_span('rerun_total')
+# Profiler hanya aktif jika admin mempersenjatainya untuk sesi ini (lihat panel admin di bawah)
+script_profile = profiler_begin(st.session_state, 'script')
+from startup import startup_report, timed, start_prewarm
+with timed('import modul aplikasi'):
+    import accounts
+    from features import ORIGINAL_COLUMNS_ORDER, class_description_mapping
+    from history_export import EXPORT_FORMATS, ExportCache
+    from model_registry import ModelRegistry
+    from storage import storage_from_config
+    from trends import TrendCache
+
+# Inisialisasi penyimpanan (Google Sheet / SQLite / Parquet), satu instance bersama per proses server
+@st.cache_resource
+def get_storage():
+    return storage_from_config(st.secrets)
+
+with timed('inisialisasi penyimpanan'):
+    storage = get_storage()
+
+@st.cache_resource
+def get_model_registry():
+    """Registry artefak bersama untuk seluruh sesi dalam satu proses server"""
+    return ModelRegistry()
+
+model_registry = get_model_registry()
+
+# Prewarm sekali per proses server: impor modul berat, muat model, dan isi cache penyimpanan
+# di latar belakang sementara halaman login sudah bisa ditampilkan
+@st.cache_resource
+def get_prewarm_thread():
+    return start_prewarm(storage, model_registry)
+
+get_prewarm_thread()
+
+@st.cache_resource
+def get_export_cache():
+    """File ekspor riwayat bersama untuk seluruh sesi dalam satu proses server"""
+    return ExportCache()
+
+export_cache = get_export_cache()
+
+@st.cache_resource
+def get_trend_cache():
+    """Deret grafik tren per user bersama untuk seluruh sesi dalam satu proses server"""
+    return TrendCache()
+
+trend_cache = get_trend_cache()
+
+# Ekspor metrik Prometheus (file dan/atau endpoint HTTP) jika dikonfigurasi lewat env
+@st.cache_resource
+def get_metrics_exporter():
+    return exporter_from_env()
+
+metrics_exporter = get_metrics_exporter()
 
 # --- AUTENTIKASI SEDERHANA ---
 if 'user_logged_in' not in st.session_state:
@@ -49,20 +91,12 @@ def set_login_status(username):
 def clear_login_status():
     st.session_state['user_logged_in'] = False
     st.session_state['username'] = ''
+    accounts.clear_verified_login(st.session_state)
     if "logged_in" in st.query_params:
         del st.query_params["logged_in"]
     if "username" in st.query_params:
         del st.query_params["username"]
 
-def load_users():
-    data = users_sheet.get_all_records()
-    return {row['username']: row['password'] for row in data}
-
-def load_user_data():
-    """Load semua data user termasuk tanggal lahir"""
-    data = users_sheet.get_all_records()
-    return {row['username']: row for row in data}
-
 def calculate_age(birth_date_str):
     """Hitung usia dari tanggal lahir"""
     if not birth_date_str:
@@ -77,24 +111,11 @@ def calculate_age(birth_date_str):
         return None
 
 def register_user(username, password, gender, birth_date):
-    users = load_users()
-    if username in users:
-        return False, "Username sudah terdaftar!"
-    # Konversi birth_date menjadi string untuk menghindari error JSON serialization
-    birth_date_str = birth_date.strftime('%Y-%m-%d') if birth_date else None
-    # Simpan dengan urutan: username, password, Gender, Date (sesuai Google Sheet)
-    users_sheet.append_row([username, password, gender, birth_date_str])
-    return True, "Registrasi berhasil!"
+    return accounts.register_user(storage, username, password, gender, birth_date)
 
 def verify_user(username, password):
-    users = load_users()
-    if username in users:
-        if users[username] == password:
-            return True, "Login berhasil!"
-        else:
-            return False, "Password salah!"
-    else:
-        return False, "Username tidak ditemukan!"
+    with span('verify_user'):
+        return accounts.verify_user(storage, username, password)
 
 def login_form():
     st.markdown("<h2 style='color:#0d47a1;'>🔐 Login Pengguna</h2>", unsafe_allow_html=True)
@@ -112,6 +133,8 @@ def login_form():
                 success, message = verify_user(username, password)
                 if success:
                     set_login_status(username)
+                    # Hanya login dengan password yang membuka panel admin, bukan ?username= di URL
+                    accounts.mark_verified_login(st.session_state, username)
                     st.success(message)
                     st.rerun()
                 else:
@@ -132,8 +155,8 @@ def login_form():
             new_birth_date = st.date_input(
                 'Tanggal Lahir',
                 value=None,
-                min_value=pd.Timestamp('1900-01-01').date(),
-                max_value=pd.Timestamp('today').date(),
+                min_value=datetime.date(1900, 1, 1),
+                max_value=datetime.date.today(),
                 help="Pilih tanggal lahir Anda"
             )
             register_submit = st.form_submit_button('Register')
@@ -161,10 +184,12 @@ if not check_login_status():
 else:
     # Tampilkan informasi user yang login
     current_username = st.session_state['username']
-    user_data = load_user_data()
+    # Data Sheets untuk rerun ini (Users, plus Riwayat di halaman riwayat) dibaca dalam satu batch request
+    halaman_aktif = st.session_state.get('halaman', st.query_params.get('page'))
+    storage.prefetch(history=halaman_aktif in ('📊 Riwayat Prediksi', '📈 Dashboard Kohort'))
+    user_info = storage.get_user(current_username)
     
-    if current_username in user_data:
-        user_info = user_data[current_username]
+    if user_info is not None:
         
 
         
@@ -214,68 +239,21 @@ else:
     """, unsafe_allow_html=True)
     logout_button()
 
-model_dt = joblib.load('decision_tree_model.pkl')
-
-try:
-    preprocessor = joblib.load('preprocessor.pkl')
-except Exception as e:
-    from sklearn.pipeline import Pipeline
-    from sklearn.compose import ColumnTransformer
-    from sklearn.preprocessing import OneHotEncoder
-
-    numeric_features = ['AGE', 'Urea', 'Cr', 'HbA1c', 'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI']
-    categorical_features = ['Gender']
-
-    numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='mean')),
-        ('scaler', StandardScaler())
-    ])
-
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='most_frequent')),
-        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-    ])
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, numeric_features),
-            ('cat', categorical_transformer, categorical_features)
-        ],
-        remainder='drop'
-    )
+def load_predictor():
+    """Muat model, preprocessor, dan jalur cepat prediksi; hanya dipanggil oleh halaman yang membutuhkan.
 
+    Preprocessor tidak pernah di-fit ulang saat aplikasi berjalan. Jika artefak
+    tidak tersedia atau tidak cocok, latih ulang secara offline dengan `python train.py --promote`.
+    """
+    from fast_preprocess import FeatureLayoutError
+    from predictor import cached_predictor
     try:
-        df_train = pd.read_csv('Dataset/Dataset of Diabetes .csv')
-        preprocessor.fit(df_train[numeric_features + categorical_features])
+        with timed('muat & kompilasi model'):
+            return cached_predictor(model_registry), None
+    except FeatureLayoutError as e:
+        return None, str(e)
     except Exception as e:
-        try:
-            dummy_data = pd.DataFrame({
-                'Gender': ['M', 'F'] * 50,
-                'AGE': np.random.randint(20, 80, 100),
-                'Urea': np.random.uniform(1.0, 40.0, 100),
-                'Cr': np.random.randint(10, 1500, 100),
-                'HbA1c': np.random.uniform(3.0, 15.0, 100),
-                'Chol': np.random.uniform(1.0, 10.0, 100),
-                'TG': np.random.uniform(0.1, 10.0, 100),
-                'HDL': np.random.uniform(0.1, 3.0, 100),
-                'LDL': np.random.uniform(0.1, 7.0, 100),
-                'VLDL': np.random.uniform(0.0, 5.0, 100),
-                'BMI': np.random.uniform(15.0, 50.0, 100)
-            })
-            if not dummy_data.empty and not dummy_data.isnull().all().all():
-                preprocessor.fit(dummy_data[numeric_features + categorical_features])
-            else:
-                st.error("❌ Data dummy tidak valid. Aplikasi tidak dapat berjalan.")
-                st.stop()
-        except Exception as e:
-            st.error(f"❌ Gagal membuat preprocessor: {e}")
-            st.stop()
-
-class_description_mapping = {
-    'N': 'No Diabetes',
-    'P': 'Prediabetes',
-    'Y': 'Diabetes'
-}
+        return None, f"Gagal memuat model/preprocessor: {e}"
 
 # --- SIDEBAR NAVBAR ---
 st.sidebar.markdown("""
@@ -286,6 +264,10 @@ st.sidebar.markdown("""
 """, unsafe_allow_html=True)
 
 pages = ["🏠 Home", "🧪 Prediksi Diabetes", "📊 Riwayat Prediksi"]
+# Dashboard kohort berisi data lintas user, hanya untuk admin yang login dengan password di sesi ini
+admin_session = accounts.session_is_admin(st.session_state, st.secrets)
+if admin_session:
+    pages.append("📈 Dashboard Kohort")
 
 # Dapatkan halaman dari parameter kueri URL, default ke "🏠 Home" jika tidak ada
 try:
@@ -302,14 +284,35 @@ except ValueError:
 halaman = st.sidebar.radio(
     '',
     pages,
-    index=default_index
+    index=default_index,
+    key='halaman'
 )
 
 # Perbarui parameter kueri URL jika halaman yang dipilih berubah
 if halaman != page_from_query:
     st.query_params["page"] = halaman
 
+# Status artefak model: waktu muat dan jumlah cache hit per proses server
+with st.sidebar.expander('⚙️ Status Model'):
+    st.dataframe(model_registry.stats(), hide_index=True, use_container_width=True)
+    st.caption(f"Dimuat: {model_registry.misses} | Dimuat ulang: {model_registry.reloads}")
+    st.caption(f"Penyimpanan: {storage.name} | Antrean riwayat: {storage.pending_writes()} baris")
+    quota_stats = storage.quota_stats()
+    if quota_stats is not None:
+        st.caption("Kuota Sheets: " + ', '.join(f"{name} {count}" for name, count in quota_stats.items()))
+    # Hanya dibaca jika modul prediksi sudah dimuat, agar expander ini tidak memicu import berat
+    # (modul bisa saja masih setengah diimpor oleh thread prewarm)
+    cache_stats_fn = getattr(sys.modules.get('predictor'), 'prediction_cache_stats', None)
+    if cache_stats_fn is not None:
+        cache_stats = cache_stats_fn()
+        if cache_stats:
+            st.caption(f"Cache prediksi: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+                       f"({cache_stats['hit_rate']:.0%}), {cache_stats['entri']}/{cache_stats['maks']} entri")
+    st.markdown("**⏱️ Rincian Startup**")
+    st.dataframe(startup_report.rows(), hide_index=True, use_container_width=True)
+
 # --- HEADER ---
+header_timer = start_span('render_header')
 st.markdown("""
 <div style='background: linear-gradient(90deg, #f8fafc 0%, #c3ecfd 100%); border-radius: 28px; padding: 38px 24px 32px 24px; box-shadow: 0 4px 24px #4f8cff22; margin-bottom: 32px;'>
     <div style='text-align:center;'>
@@ -337,6 +340,11 @@ st.markdown("""
 }
 </style>
 """, unsafe_allow_html=True)
+header_timer.stop()
+
+# Waktu render halaman yang dipilih, dicatat sebelum footer
+page_timer = start_span(f"render_page:{halaman.split(' ', 1)[-1]}")
+page_profile = profiler_begin(st.session_state, halaman)
 
 if halaman == '🏠 Home':
     # --- NAVBAR TABS HOME ---
@@ -542,6 +550,10 @@ if halaman == '🏠 Home':
     """, unsafe_allow_html=True)
 
 elif halaman == '🧪 Prediksi Diabetes':
+    import numpy as np
+    import pandas as pd
+    predictor, predictor_error = load_predictor()
+
     st.markdown("<h2 style='color:#0d47a1;'>Formulir Prediksi Diabetes</h2>", unsafe_allow_html=True)
     st.write("""
     Masukkan data kesehatan Anda pada form di bawah ini untuk memprediksi status diabetes.
@@ -602,55 +614,42 @@ elif halaman == '🧪 Prediksi Diabetes':
             }
             
             input_df = pd.DataFrame(data_for_df, index=[0])
-            original_columns_order = ['ID', 'No_Pation', 'Gender', 'AGE', 'Urea', 'Cr', 'HbA1c', 'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI']
-            input_df = input_df[original_columns_order]
+            input_df = input_df[ORIGINAL_COLUMNS_ORDER]
             
             st.markdown("<h4 style='color:#1976d2;'>Data yang Anda Masukkan</h4>", unsafe_allow_html=True)
             st.write(input_df)
             
-            if 'preprocessor' in locals():
+            if predictor is not None:
                 try:
-                    input_processed = preprocessor.transform(input_df)
-                    
-                    if 'model_dt' in locals():
-                        # Cek apakah jumlah fitur sesuai dengan yang diharapkan model
-                        expected_features = model_dt.n_features_in_
-                        
-                        # Jika jumlah fitur tidak cocok, tambahkan kolom dummy
-                        if input_processed.shape[1] != expected_features:
-                            import numpy as np
-                            # Tambahkan kolom dummy dengan nilai 0
-                            dummy_cols = np.zeros((input_processed.shape[0], expected_features - input_processed.shape[1]))
-                            input_processed = np.hstack([input_processed, dummy_cols])
-                        
+                    if predictor.model is not None:
                         st.markdown("<h4 style='color:#1976d2;'>Hasil Prediksi</h4>", unsafe_allow_html=True)
-                        prediction = model_dt.predict(input_processed)
-                        prediction_proba = model_dt.predict_proba(input_processed)
+                        prediction, prediction_proba = predictor.predict_record(data_for_df)
                         predicted_class_label = prediction[0]
-                        # Simpan ke Google Sheet tab "Riwayat"
+                        # Simpan ke riwayat (untuk Google Sheet dikirim ke tab "Riwayat" di latar belakang)
                         try:
-                            from datetime import datetime
-                            # Pastikan format tanggal tanpa jam
-                            tanggal_prediksi = datetime.now().strftime('%d %B %Y')
-                            riwayat_sheet.append_row([
-                                st.session_state['username'],
-                                data_for_df['AGE'],
-                                data_for_df['Gender'],
-                                tanggal_prediksi,  # Format: "1 September 2025"
-                                data_for_df['Urea'],
-                                data_for_df['Cr'],
-                                data_for_df['HbA1c'],
-                                data_for_df['Chol'],
-                                data_for_df['TG'],
-                                data_for_df['HDL'],
-                                data_for_df['LDL'],
-                                data_for_df['VLDL'],
-                                data_for_df['BMI'],
-                                predicted_class_label
-                            ])
-                            st.success("✅ Riwayat prediksi berhasil disimpan ke Google Sheet!")
+                            from history import tanggal_sekarang
+                            # Timestamp ISO agar riwayat bisa diurutkan dan difilter per tanggal
+                            tanggal_prediksi = tanggal_sekarang()
+                            with span('append_history'):
+                                storage.append_history([
+                                    st.session_state['username'],
+                                    data_for_df['AGE'],
+                                    data_for_df['Gender'],
+                                    tanggal_prediksi,  # Format: "2025-09-01T12:07:59"
+                                    data_for_df['Urea'],
+                                    data_for_df['Cr'],
+                                    data_for_df['HbA1c'],
+                                    data_for_df['Chol'],
+                                    data_for_df['TG'],
+                                    data_for_df['HDL'],
+                                    data_for_df['LDL'],
+                                    data_for_df['VLDL'],
+                                    data_for_df['BMI'],
+                                    predicted_class_label
+                                ])
+                            st.success("✅ Riwayat prediksi berhasil disimpan!")
                         except Exception as e:
-                            st.warning(f"Gagal menyimpan riwayat ke Google Sheet: {e}")
+                            st.warning(f"Gagal mencatat riwayat prediksi: {e}")
 
                         # Box warna sesuai hasil
                         if predicted_class_label == 'Y':
@@ -681,7 +680,7 @@ elif halaman == '🧪 Prediksi Diabetes':
                             </div>
                             """, unsafe_allow_html=True)
                         st.markdown("<h5 style='color:#0d47a1;'>Probabilitas Prediksi</h5>", unsafe_allow_html=True)
-                        predicted_class_names = model_dt.classes_
+                        predicted_class_names = predictor.classes_
                         for i, prob in enumerate(prediction_proba[0]):
                             st.write(f"{class_description_mapping.get(predicted_class_names[i], predicted_class_names[i])}: {prob:.2%}")
                     else:
@@ -689,7 +688,38 @@ elif halaman == '🧪 Prediksi Diabetes':
                 except Exception as e:
                     st.error(f"Terjadi kesalahan saat memproses data: {e}")
             else:
-                st.error("Preprocessor belum dimuat dengan benar.")
+                st.error(f"Preprocessor belum dimuat dengan benar. {predictor_error}")
+
+    # --- PREDIKSI MASSAL ---
+    with st.expander('📁 Prediksi Massal (CSV/Parquet)'):
+        st.write("Unggah file berisi kolom Gender, AGE, Urea, Cr, HbA1c, Chol, TG, HDL, LDL, VLDL, dan BMI. "
+                 "File diproses per bagian sehingga ribuan data lab dapat diprediksi sekaligus.")
+        uploaded_file = st.file_uploader('File data lab', type=['csv', 'parquet'], key='batch_upload')
+        output_format = st.radio('Format hasil', ['csv', 'parquet'], horizontal=True, key='batch_format')
+        if uploaded_file is not None and predictor is not None and st.button('Prediksi Massal', key='batch_submit'):
+            import tempfile
+            from batch_predict import score_file
+            with tempfile.NamedTemporaryFile(suffix=f'.{output_format}', delete=False) as tmp:
+                result_path = tmp.name
+            try:
+                with st.spinner('Memproses file...'):
+                    batch_stats = score_file(uploaded_file, result_path, predictor=predictor, output_format=output_format)
+                with open(result_path, 'rb') as f:
+                    st.session_state['batch_result'] = (f.read(), output_format, batch_stats)
+            except Exception as e:
+                st.error(f"Gagal memproses file: {e}")
+            finally:
+                os.remove(result_path)
+        if 'batch_result' in st.session_state:
+            result_bytes, result_format, batch_stats = st.session_state['batch_result']
+            st.success(f"✅ {batch_stats['rows']} baris diproses ({batch_stats['valid']} valid, "
+                       f"{batch_stats['invalid']} tidak valid) dalam {batch_stats['seconds']:.2f} detik.")
+            st.download_button(
+                label=f"📥 Download Hasil Prediksi ({result_format.upper()})",
+                data=result_bytes,
+                file_name=f"hasil_prediksi_massal.{result_format}",
+                mime="text/csv" if result_format == 'csv' else "application/octet-stream"
+            )
 
     st.markdown("""
     <div style='margin-top:24px; background: linear-gradient(90deg, #fbc2eb 0%, #a1c4fd 100%); color:#23395d; border-radius:12px; padding:18px 22px; font-size:16px; box-shadow:0 2px 8px #a1c4fd33;'>
@@ -698,90 +728,102 @@ elif halaman == '🧪 Prediksi Diabetes':
     """, unsafe_allow_html=True)
 
 elif halaman == '📊 Riwayat Prediksi':
+    from history import HISTORY_PAGE_SIZES, format_tanggal_prediksi, history_display_frame
+
     st.markdown("<h2 style='color:#0d47a1;'>📊 Riwayat Prediksi Diabetes</h2>", unsafe_allow_html=True)
     st.write("""
     Berikut adalah riwayat hasil prediksi yang telah dilakukan. Data ini dapat digunakan untuk analisis dan pengembangan sistem prediksi.
     """)
 
     try:
-        # Ambil seluruh data dari Sheet "Riwayat"
-        records = riwayat_sheet.get_all_records()
-        df_user_riwayat = pd.DataFrame(records)
-
-        # Pastikan kolom username ada
-        if "username" not in df_user_riwayat.columns:
-            st.error("Kamu Belum Melakukan Prediksi. Silahkan Melakukan Prediksi Dulu Yaaa!!!")
-            st.stop()
-
-        # Filter hanya data milik user yang login (tanpa case sensitive)
+        # Statistik diperbarui setiap ada prediksi baru, sehingga kartu metrik tidak perlu memuat riwayat
         current_user = st.session_state['username']
-        df_user_riwayat = df_user_riwayat[df_user_riwayat['username'].str.lower() == current_user.lower()]
+        user_stats = storage.user_stats(current_user)
 
-        if df_user_riwayat.empty:
+        if user_stats['total'] == 0:
             st.info("📝 Belum ada data prediksi yang tersimpan untuk user Anda.")
         else:
             # Statistik ringkas
             st.markdown("<h4 style='color:#1976d2;'>📈 Statistik Prediksi Anda</h4>", unsafe_allow_html=True)
-            prediksi_counts = df_user_riwayat['Hasil'].value_counts()
-            total_prediksi = len(df_user_riwayat)
-            
-            # Hitung jumlah untuk setiap kategori
-            diabetes_count = prediksi_counts.get('Y', 0)
-            prediabetes_count = prediksi_counts.get('P', 0)
-            non_diabetes_count = prediksi_counts.get('N', 0)
-            
-            # Hitung persentase untuk setiap kategori
-            diabetes_percent = (diabetes_count / total_prediksi * 100) if total_prediksi > 0 else 0
-            prediabetes_percent = (prediabetes_count / total_prediksi * 100) if total_prediksi > 0 else 0
-            non_diabetes_percent = (non_diabetes_count / total_prediksi * 100) if total_prediksi > 0 else 0
-
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Prediksi", total_prediksi)
+                st.metric("Total Prediksi", user_stats['total'])
             with col2:
-                st.metric("Diabetes", prediksi_counts.get('Y', 0))
+                st.metric("Diabetes", user_stats['Y'])
             with col3:
-                st.metric("Prediabetes", prediksi_counts.get('P', 0))
+                st.metric("Prediabetes", user_stats['P'])
             with col4:
-                st.metric("Non Diabetes", prediksi_counts.get('N', 0))
+                st.metric("Non Diabetes", user_stats['N'])
+            latest_tanggal = format_tanggal_prediksi([user_stats['latest_tanggal']]).iloc[0]
+            ringkasan = [f"Prediksi terakhir: {class_description_mapping.get(user_stats['latest_hasil'], user_stats['latest_hasil'])}"
+                         f" ({latest_tanggal})"]
+            if user_stats['mean_HbA1c'] is not None:
+                ringkasan.append(f"rata-rata HbA1c {user_stats['mean_HbA1c']:.1f}")
+            if user_stats['mean_BMI'] is not None:
+                ringkasan.append(f"rata-rata BMI {user_stats['mean_BMI']:.1f}")
+            st.caption(' | '.join(ringkasan))
+
+            # Grafik tren: deret diperkecil dengan LTTB di server dan dipakai ulang sampai ada prediksi baru
+            from trends import HASIL_COLUMN, TREND_COLUMNS
+
+            st.markdown("<h4 style='color:#1976d2;'>📉 Tren Hasil Lab Anda</h4>", unsafe_allow_html=True)
+            tren_pilihan = st.selectbox(
+                "Nilai yang ditampilkan", [*TREND_COLUMNS, HASIL_COLUMN],
+                format_func=lambda kolom: 'Hasil Prediksi' if kolom == HASIL_COLUMN else kolom,
+                key="riwayat_tren"
+            )
+            tren = trend_cache.get(storage, current_user)[tren_pilihan]
+            if len(tren) < 2:
+                st.caption("Grafik tren tersedia setelah ada minimal dua prediksi dengan tanggal yang valid.")
+            else:
+                st.line_chart(tren)
+                if tren_pilihan == HASIL_COLUMN:
+                    st.caption(f"0 = {class_description_mapping['N']}, 1 = {class_description_mapping['P']}, "
+                               f"2 = {class_description_mapping['Y']}")
 
             # Tampilkan Tabel
             st.markdown("<h4 style='color:#1976d2;'>📋 Data Riwayat Prediksi Anda</h4>", unsafe_allow_html=True)
-            df_display = df_user_riwayat.copy()
-            
-            # Ubah index menjadi kolom No dengan urutan dari 1
-            df_display.index = range(1, len(df_display) + 1)
-            df_display.index.name = 'No'
-            
-            df_display['Gender'] = df_display['Gender'].map({'M': 'Laki-laki', 'F': 'Perempuan'})
-            df_display['Hasil'] = df_display['Hasil'].map(class_description_mapping)
-            
-            # Format ulang kolom Tanggal Prediksi jika ada
-            if 'Tanggal Prediksi' in df_display.columns:
-                def format_tanggal_prediksi(tanggal_str):
-                    if pd.isna(tanggal_str) or tanggal_str == '':
-                        return tanggal_str
-                    try:
-                        # Coba format yang sudah benar (1 September 2025)
-                        if ' ' in str(tanggal_str) and not any(char.isdigit() and int(char) > 23 for char in str(tanggal_str).split()):
-                            return tanggal_str
-                        # Format yang lama dengan jam (2025-09-01 12:07:59)
-                        elif ' ' in str(tanggal_str) and ':' in str(tanggal_str):
-                            from datetime import datetime
-                            dt = datetime.strptime(str(tanggal_str), '%Y-%m-%d %H:%M:%S')
-                            return dt.strftime('%d %B %Y')
-                        # Format tanggal saja (2025-09-01)
-                        elif '-' in str(tanggal_str) and len(str(tanggal_str)) == 10:
-                            from datetime import datetime
-                            dt = datetime.strptime(str(tanggal_str), '%Y-%m-%d')
-                            return dt.strftime('%d %B %Y')
-                        else:
-                            return tanggal_str
-                    except:
-                        return tanggal_str
-                
-                df_display['Tanggal Prediksi'] = df_display['Tanggal Prediksi'].apply(format_tanggal_prediksi)
-            
+            # Urutan, rentang tanggal, dan ukuran halaman disimpan di session_state lewat key widget
+            col_urutan, col_rentang, col_ukuran = st.columns([1, 2, 1])
+            with col_urutan:
+                urutan = st.selectbox("Urutan", ["Terbaru", "Terlama"], key="riwayat_urutan")
+            with col_rentang:
+                rentang = st.date_input(
+                    "Rentang Tanggal Prediksi",
+                    value=(),
+                    format="DD/MM/YYYY",
+                    key="riwayat_rentang"
+                )
+            with col_ukuran:
+                page_size = st.selectbox("Baris per halaman", HISTORY_PAGE_SIZES, index=1, key="riwayat_page_size")
+            start_date, end_date = rentang if isinstance(rentang, (tuple, list)) and len(rentang) == 2 else (None, None)
+
+            # Kembali ke halaman pertama setiap kali urutan, filter, atau ukuran halaman berubah
+            tampilan = (urutan, start_date, end_date, page_size)
+            if st.session_state.get('riwayat_tampilan') != tampilan:
+                st.session_state['riwayat_tampilan'] = tampilan
+                st.session_state['riwayat_page'] = 1
+            page = st.session_state.setdefault('riwayat_page', 1)
+
+            # Hanya satu halaman yang dibaca dari penyimpanan (tanpa case sensitive username)
+            def baca_halaman(page):
+                return storage.user_history_page(
+                    current_user, offset=(page - 1) * page_size, limit=page_size,
+                    start=start_date, end=end_date, newest_first=urutan == "Terbaru"
+                )
+            df_page, total_rows = baca_halaman(page)
+            total_pages = max(1, -(-total_rows // page_size))
+            if page > total_pages:
+                page = st.session_state['riwayat_page'] = total_pages
+                df_page, total_rows = baca_halaman(page)
+
+            # Pastikan kolom username ada
+            if "username" not in df_page.columns:
+                st.error("Kamu Belum Melakukan Prediksi. Silahkan Melakukan Prediksi Dulu Yaaa!!!")
+                st.stop()
+
+            df_display = history_display_frame(df_page, number_from=(page - 1) * page_size + 1)
+
             # Tambahkan CSS untuk membuat teks di tabel rata tengah
             st.markdown("""
             <style>
@@ -801,24 +843,139 @@ elif halaman == '📊 Riwayat Prediksi':
             """, unsafe_allow_html=True)
             
             st.dataframe(df_display, use_container_width=True)
-            
-
 
-            # Tombol Download CSV
-            csv = df_display.to_csv(index=False)
+            def pindah_halaman(delta):
+                st.session_state['riwayat_page'] = min(max(st.session_state['riwayat_page'] + delta, 1), total_pages)
+
+            col_prev, col_info, col_next = st.columns([1, 3, 1])
+            with col_prev:
+                st.button("⬅️ Sebelumnya", key="riwayat_prev", disabled=page <= 1,
+                          on_click=pindah_halaman, args=(-1,))
+            with col_info:
+                st.caption(f"Halaman {page} dari {total_pages} ({total_rows} baris)")
+            with col_next:
+                st.button("Berikutnya ➡️", key="riwayat_next", disabled=page >= total_pages,
+                          on_click=pindah_halaman, args=(1,))
+
+            # Tombol Download: file ekspor (sesuai filter tanggal) baru dibuat saat tombol diklik,
+            # ditulis per potongan, dan dipakai ulang sampai riwayat user berubah
+            format_ekspor = st.radio("Format unduhan", list(EXPORT_FORMATS), horizontal=True,
+                                     format_func=lambda fmt: {'csv.gz': 'CSV (.csv.gz)', 'parquet': 'Parquet'}[fmt],
+                                     key="riwayat_format_ekspor")
             st.download_button(
-                label="📥 Download Data Riwayat Anda (CSV)",
-                data=csv,
-                file_name=f"riwayat_prediksi_{current_user}.csv",
-                mime="text/csv"
+                label="📥 Download Data Riwayat Anda",
+                data=lambda: export_cache.read(storage, current_user, format_ekspor, start=start_date, end=end_date),
+                file_name=f"riwayat_prediksi_{current_user}.{format_ekspor}",
+                mime=EXPORT_FORMATS[format_ekspor]
             )
 
     except Exception as e:
         st.error(f"❌ Gagal memuat riwayat: {e}")
 
+elif halaman == '📈 Dashboard Kohort' and admin_session:
+    from cohort_stats import cohort_table
+
+    st.markdown("<h2 style='color:#0d47a1;'>📈 Dashboard Kohort</h2>", unsafe_allow_html=True)
+    st.write("""
+    Distribusi hasil prediksi seluruh user per kelompok umur, gender, dan bulan, serta sebaran nilai HbA1c dan BMI.
+    """)
+
+    try:
+        # Rollup diperbarui setiap ada prediksi baru; halaman ini tidak membaca baris riwayat sama sekali
+        rollup = storage.cohort_rollup()
+        total = cohort_table(rollup, 'total')
+
+        if total.empty:
+            st.info("📝 Belum ada data prediksi yang tersimpan.")
+        else:
+            jumlah = total.iloc[0]
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Total Prediksi", int(jumlah.sum()))
+            with col2:
+                st.metric("Diabetes", int(jumlah[class_description_mapping['Y']]))
+            with col3:
+                st.metric("Prediabetes", int(jumlah[class_description_mapping['P']]))
+            with col4:
+                st.metric("Non Diabetes", int(jumlah[class_description_mapping['N']]))
+
+            col_umur, col_gender = st.columns([2, 1])
+            with col_umur:
+                st.markdown("<h4 style='color:#1976d2;'>👥 Hasil per Kelompok Umur</h4>", unsafe_allow_html=True)
+                st.bar_chart(cohort_table(rollup, 'umur'))
+            with col_gender:
+                st.markdown("<h4 style='color:#1976d2;'>⚧️ Hasil per Gender</h4>", unsafe_allow_html=True)
+                st.bar_chart(cohort_table(rollup, 'gender').rename(index={'M': 'Laki-laki', 'F': 'Perempuan'}))
+
+            st.markdown("<h4 style='color:#1976d2;'>🗓️ Hasil per Bulan</h4>", unsafe_allow_html=True)
+            st.bar_chart(cohort_table(rollup, 'bulan'))
+
+            col_hba1c, col_bmi = st.columns(2)
+            with col_hba1c:
+                st.markdown("<h4 style='color:#1976d2;'>🩸 Sebaran HbA1c</h4>", unsafe_allow_html=True)
+                st.bar_chart(cohort_table(rollup, 'HbA1c'))
+            with col_bmi:
+                st.markdown("<h4 style='color:#1976d2;'>⚖️ Sebaran BMI</h4>", unsafe_allow_html=True)
+                st.bar_chart(cohort_table(rollup, 'BMI'))
+
+    except Exception as e:
+        st.error(f"❌ Gagal memuat dashboard kohort: {e}")
+
+page_timer.stop()
+profiler_finish(st.session_state, page_profile)
+
 # --- FOOTER ---
 st.markdown("""
     <div style='margin-top:40px; background: linear-gradient(90deg, #a18cd1 0%, #fbc2eb 100%); color:#312e81; border-radius:0 0 14px 14px; padding:16px 0; text-align:center; font-size:17px; font-weight:500; letter-spacing:1px;'>
         🌟 <b>Prediksi & Edukasi Diabetes - Bersama Menuju Hidup Sehat!</b> 🌟
     </div>
 """, unsafe_allow_html=True)
+
+rerun_timer.stop()
+profiler_finish(st.session_state, script_profile)
+if metrics_exporter is not None:
+    metrics_exporter.maybe_write()
+
+# Rincian waktu per tahap untuk rerun ini, hanya untuk admin (DIABETES_ADMINS / st.secrets["admin"])
+# yang login dengan password di sesi ini
+if accounts.session_is_admin(st.session_state, st.secrets):
+    with st.sidebar.expander('⏱️ Rincian Rerun (admin)'):
+        trace = current_trace()
+        st.dataframe([{'tahap': '· ' * row['level'] + row['tahap'], 'ms': row['ms']} for row in trace],
+                     hide_index=True, use_container_width=True)
+        st.markdown("**📊 Agregat proses**")
+        st.dataframe(metrics_registry.summary(), hide_index=True, use_container_width=True)
+
+    with st.sidebar.expander('🔬 Profiler (admin)'):
+        import profiling
+        targets = {'Seluruh script': profiling.SCRIPT_TARGET, **{page: page for page in pages}}
+        # Alternatif lewat URL: ?profile=3&profile_page=📊 Riwayat Prediksi&profile_mode=deterministik
+        if 'profile' in st.query_params:
+            try:
+                profiling.arm(st.session_state, int(st.query_params['profile']),
+                              target=st.query_params.get('profile_page', profiling.SCRIPT_TARGET),
+                              mode=st.query_params.get('profile_mode', 'sampling'))
+            except ValueError as e:
+                st.warning(f"Parameter profiler tidak valid: {e}")
+            for key in ('profile', 'profile_page', 'profile_mode'):
+                if key in st.query_params:
+                    del st.query_params[key]
+        profile_target = st.selectbox('Target', list(targets), key='profiler_target')
+        profile_mode = st.selectbox('Mode', profiling.MODES, key='profiler_mode')
+        profile_runs = st.number_input('Jumlah rerun', min_value=1, max_value=20, value=1, key='profiler_runs')
+        col_arm, col_disarm = st.columns(2)
+        if col_arm.button('Rekam', key='profiler_arm'):
+            profiling.arm(st.session_state, profile_runs, target=targets[profile_target], mode=profile_mode)
+        if col_disarm.button('Batal', key='profiler_disarm'):
+            profiling.disarm(st.session_state)
+        status = profiling.profiler_status(st.session_state)
+        if status['remaining']:
+            st.caption(f"Merekam {status['remaining']} rerun berikutnya: {status['target']} ({status['mode']})")
+        if status['results']:
+            st.dataframe([{k: v for k, v in r.items() if k != 'files'} for r in status['results']],
+                         hide_index=True, use_container_width=True)
+            latest = status['results'][-1]
+            for path in latest['files']:
+                with open(path, 'rb') as f:
+                    st.download_button(f"📥 {os.path.basename(path)}", f.read(), file_name=os.path.basename(path),
+                                       key=f"profiler_download_{path}")
@@ -0,0 +1,168 @@
+"""Prediksi massal dari file CSV/Parquet secara bertahap (chunk).
+
+Contoh:
+    python batch_predict.py data_lab.csv hasil.csv --chunksize 20000
+    python batch_predict.py data_lab.parquet hasil.parquet
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_RANGES, GENDER_VALUES, INPUT_FEATURES, NUMERIC_FEATURES
+from predictor import load_predictor
+
+DEFAULT_CHUNKSIZE = 10000
+
+
+def _file_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path if isinstance(path, str) else getattr(path, 'name', '')
+    return 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE, fmt=None):
+    """Baca file input per chunk tanpa memuat seluruh file ke memori"""
+    if _file_format(source, fmt) == 'parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+
+def validate_chunk(chunk):
+    """Validasi vektor untuk satu chunk; kembalikan Series pesan error ('' jika valid)"""
+    errors = pd.Series('', index=chunk.index, dtype=object)
+    missing_columns = [c for c in INPUT_FEATURES if c not in chunk.columns]
+    if missing_columns:
+        errors[:] = f"Kolom tidak ada: {', '.join(missing_columns)}"
+        return errors
+    gender = chunk['Gender'].astype(str).str.strip().str.upper()
+    errors = errors.mask(~gender.isin(GENDER_VALUES), errors + 'Gender tidak valid; ')
+    for column in NUMERIC_FEATURES:
+        low, high = FEATURE_RANGES[column]
+        values = pd.to_numeric(chunk[column], errors='coerce')
+        errors = errors.mask(values.isna(), errors + f"{column} kosong/bukan angka; ")
+        errors = errors.mask(values.notna() & ((values < low) | (values > high)),
+                             errors + f"{column} di luar rentang {low}-{high}; ")
+    return errors.str.rstrip('; ')
+
+
+def score_chunk(predictor, chunk, row_offset=0):
+    """Prediksi satu chunk; baris yang tidak valid diberi pesan error tanpa prediksi"""
+    errors = validate_chunk(chunk)
+    valid = errors == ''
+    result = chunk.copy()
+    result['prediction'] = None
+    for cls in predictor.classes_:
+        result[f'proba_{cls}'] = np.nan
+    if valid.any():
+        features = chunk.loc[valid, INPUT_FEATURES].copy()
+        features['Gender'] = features['Gender'].astype(str).str.strip().str.upper()
+        features[NUMERIC_FEATURES] = features[NUMERIC_FEATURES].apply(pd.to_numeric)
+        # ID dan No_Pation tidak relevan untuk prediksi batch; isi deterministik jika tidak ada
+        features['ID'] = chunk.loc[valid, 'ID'] if 'ID' in chunk.columns else row_offset + np.flatnonzero(valid.to_numpy())
+        features['No_Pation'] = chunk.loc[valid, 'No_Pation'] if 'No_Pation' in chunk.columns else 0
+        labels, proba = predictor.predict(features)
+        result.loc[valid, 'prediction'] = labels
+        for i, cls in enumerate(predictor.classes_):
+            result.loc[valid, f'proba_{cls}'] = proba[:, i]
+    result['error'] = errors
+    return result
+
+
+def _is_float_column(name):
+    return name in NUMERIC_FEATURES or name.startswith('proba_')
+
+
+def _output_schema(columns):
+    """Skema Parquet tetap: fitur numerik dan proba_* float64, kolom lain (termasuk input tambahan) string"""
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.float64() if _is_float_column(name) else pa.string()) for name in columns])
+
+
+def _typed_columns(frame, schema):
+    """Kolom dengan tipe sesuai skema; sel yang bukan angka menjadi null (alasannya ada di kolom error)"""
+    columns = {}
+    for name in schema.names:
+        values = frame[name] if name in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+        if _is_float_column(name):
+            columns[name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            columns[name] = values.astype(object).map(lambda v: v if v is None or isinstance(v, str) else (
+                None if v != v else str(v)))
+    return pd.DataFrame(columns)
+
+
+class _ResultWriter:
+    """Tulis hasil per chunk ke CSV atau Parquet secara inkremental"""
+
+    def __init__(self, target, fmt):
+        self.target = target
+        self.fmt = fmt
+        self._parquet_writer = None
+        self._schema = None
+        self._header_written = False
+
+    def write(self, frame):
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._parquet_writer is None:
+                # Tipe tidak diambil dari chunk pertama: chunk berikutnya bisa berisi sel tidak valid
+                self._schema = _output_schema([str(c) for c in frame.columns])
+                self._parquet_writer = pq.ParquetWriter(self.target, self._schema)
+            table = pa.Table.from_pandas(_typed_columns(frame.rename(columns=str), self._schema),
+                                         schema=self._schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.target, index=False, header=not self._header_written,
+                         mode='a' if self._header_written and isinstance(self.target, str) else 'w')
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(source, target, predictor=None, chunksize=DEFAULT_CHUNKSIZE, input_format=None, output_format=None):
+    """Prediksi seluruh file dengan memori konstan; kembalikan ringkasan statistik"""
+    predictor = predictor or load_predictor()
+    writer = _ResultWriter(target, _file_format(target, output_format))
+    stats = {'rows': 0, 'valid': 0, 'invalid': 0, 'chunks': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(source, chunksize, input_format):
+            result = score_chunk(predictor, chunk, row_offset=stats['rows'])
+            writer.write(result)
+            invalid = int((result['error'] != '').sum())
+            stats['rows'] += len(chunk)
+            stats['invalid'] += invalid
+            stats['valid'] += len(chunk) - invalid
+            stats['chunks'] += 1
+    finally:
+        writer.close()
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediksi diabetes massal dari file CSV/Parquet")
+    parser.add_argument('input', help='File input (.csv atau .parquet)')
+    parser.add_argument('output', help='File output (.csv atau .parquet)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    stats = score_file(args.input, args.output, chunksize=args.chunksize)
+    print(f"{stats['rows']} baris ({stats['valid']} valid, {stats['invalid']} tidak valid) "
+          f"dalam {stats['seconds']:.2f} detik ({stats['rows_per_second']:.0f} baris/detik)")
+
+
+if __name__ == '__main__':
+    main()
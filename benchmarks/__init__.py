@@ -0,0 +1 @@
+"""Benchmark offline; jalankan dengan `python -m benchmarks.run` dari root repo"""
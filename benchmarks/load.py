@@ -0,0 +1,334 @@
+"""Uji beban multi-sesi untuk app.py dalam satu proses (seperti satu `streamlit run app.py`).
+
+Setiap sesi simulasi adalah AppTest Streamlit yang menjalankan alur nyata:
+login lewat `login_form`, pindah halaman lewat radio `pages`, submit form
+"🧪 Prediksi Diabetes", dan membuka "📊 Riwayat Prediksi". Semua sesi berbagi
+resource `st.cache_resource` yang sama (penyimpanan, model, cache ekspor),
+sehingga antrean rerun dan kontensi GIL sama seperti di server.
+
+Penyimpanan memakai Sheets palsu di memori dengan jeda per panggilan
+(`--latency-ms`). Untuk setiap jumlah sesi bersamaan dilaporkan latensi
+p50/p95/p99 per alur, throughput, CPU dan RSS per sesi, lalu titik saturasi:
+jumlah sesi terbesar sebelum throughput berhenti naik (kenaikan < `--min-gain`)
+atau p95 melewati `--p95-factor` kali p95 satu sesi. CPU dan RSS diukur per
+proses (termasuk overhead AppTest sendiri) lalu dibagi jumlah sesi, sehingga
+angkanya sedikit lebih pesimistis daripada server sungguhan.
+
+Contoh (dari root repo):
+    python -m benchmarks.load                                  # 1,2,4,8,16 sesi, 20 detik per level
+    python -m benchmarks.load --sessions 1,4,16,32 --seconds 30 --latency-ms 150
+    python -m benchmarks.load --think-ms 500 --save benchmarks/results/load-main.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.run import RESULTS_DIR, _git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app.py')
+PAGES = ("🏠 Home", "🧪 Prediksi Diabetes", "📊 Riwayat Prediksi")
+FLOWS = ('login', 'navigasi', 'prediksi', 'riwayat')
+# Nilai form prediksi dengan urutan number_input di halaman prediksi
+FORM_VALUES = {'AGE': (20, 80), 'Urea': (1.0, 15.0), 'Cr': (30, 300), 'HbA1c': (4.0, 12.0), 'Chol': (2.0, 8.0),
+               'TG': (0.5, 5.0), 'HDL': (0.5, 2.5), 'LDL': (1.0, 5.0), 'VLDL': (0.2, 2.0), 'BMI': (18.0, 40.0)}
+
+
+def _rss_bytes():
+    """RSS proses saat ini (Linux: /proc), atau RSS puncak dari getrusage sebagai cadangan"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Thread yang mencatat RSS puncak selama satu level beban"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = _rss_bytes()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+        return self.peak
+
+
+def _share_test_runtime():
+    """Sesuaikan AppTest (dirancang untuk satu tes dalam satu waktu) dengan sesi bersamaan.
+
+    - AppTest memasang Runtime tiruan global saat rerun mulai dan melepasnya (None)
+      saat selesai, sehingga rerun yang selesai lebih dulu melepas runtime milik
+      rerun lain; runtime tiruan bersama dipakai sebagai cadangan.
+    - AppTest membuat ScriptCache baru (kompilasi ulang app.py) setiap rerun; server
+      memakai satu cache bytecode, dan kompilasi bersamaan memicu error AST di Python 3.11.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+def _by_label(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+class SimulatedSession:
+    """Satu user simulasi: register sekali, lalu mengulang login -> prediksi -> riwayat -> home"""
+
+    def __init__(self, username, password, rng, timeout=120):
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.timeout = timeout
+        self.at = None
+
+    def _new_app(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        at.secrets['gcp_service_account'] = {}
+        return at
+
+    def _run(self, at):
+        at.run()
+        if at.exception:
+            raise RuntimeError('; '.join(str(e.value) for e in at.exception))
+        return at
+
+    def register(self):
+        at = self._run(self._new_app())
+        _by_label(at.text_input, 'Username Baru').input(self.username)
+        _by_label(at.text_input, 'Password Baru').input(self.password)
+        _by_label(at.selectbox, 'Jenis Kelamin').select(self.rng.choice(['M', 'F']))
+        _by_label(at.date_input, 'Tanggal Lahir').set_value(datetime.date(1980, 1, 1))
+        _by_label(at.button, 'Register').click()
+        self._run(at)
+
+    def login(self):
+        # Sesi browser baru: render halaman login lalu submit login_form
+        at = self._run(self._new_app())
+        _by_label(at.text_input, 'Username').input(self.username)
+        _by_label(at.text_input, 'Password').input(self.password)
+        _by_label(at.button, 'Login').click()
+        self.at = self._run(at)
+
+    def navigate(self, page):
+        self.at.sidebar.radio[0].set_value(page)
+        self._run(self.at)
+
+    def predict(self):
+        self.at.selectbox[0].select(self.rng.choice(['M', 'F']))
+        for widget, (low, high) in zip(self.at.number_input, FORM_VALUES.values()):
+            value = self.rng.randint(low, high) if isinstance(low, int) else round(self.rng.uniform(low, high), 1)
+            widget.set_value(value)
+        _by_label(self.at.button, 'Prediksi').click()
+        self._run(self.at)
+
+    def iteration(self, record, think):
+        """Satu putaran alur; `record(flow, detik)` dipanggil untuk setiap alur yang selesai"""
+        steps = [
+            ('login', self.login),
+            ('navigasi', lambda: self.navigate(PAGES[1])),
+            ('prediksi', self.predict),
+            ('riwayat', lambda: self.navigate(PAGES[2])),
+            ('navigasi', lambda: self.navigate(PAGES[0])),
+        ]
+        for flow, step in steps:
+            start = time.perf_counter()
+            step()
+            record(flow, time.perf_counter() - start)
+            if think:
+                time.sleep(self.rng.uniform(0, 2 * think))
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples)
+    if not len(samples):
+        return {'n': 0}
+    return {
+        'n': int(len(samples)),
+        'p50_ms': round(float(np.percentile(samples, 50) * 1000), 2),
+        'p95_ms': round(float(np.percentile(samples, 95) * 1000), 2),
+        'p99_ms': round(float(np.percentile(samples, 99) * 1000), 2),
+    }
+
+
+def run_level(sessions, seconds, think, seed, timeout, level_index):
+    """Jalankan `sessions` sesi bersamaan selama `seconds` detik; kembalikan ringkasan level"""
+    samples = {flow: [] for flow in FLOWS}
+    errors = []
+    lock = threading.Lock()
+
+    def record(flow, duration):
+        with lock:
+            samples[flow].append(duration)
+
+    users = [SimulatedSession(f"load{level_index:02d}x{i:03d}", 'pw', random.Random(seed + i), timeout=timeout)
+             for i in range(sessions)]
+    # Registrasi di luar jendela pengukuran agar setiap level dimulai dengan user yang sudah ada
+    for user in users:
+        user.register()
+
+    deadline = time.monotonic() + seconds
+
+    def worker(user):
+        while time.monotonic() < deadline:
+            try:
+                user.iteration(record, think)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+    rss_before = _rss_bytes()
+    sampler = RssSampler().start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(user,), name=f'load-session-{i}') for i, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    rss_peak = sampler.stop()
+
+    all_samples = [s for flow in FLOWS for s in samples[flow]]
+    return {
+        'sessions': sessions,
+        'wall_s': round(wall, 2),
+        'flows': {flow: _percentiles(samples[flow]) for flow in FLOWS},
+        'all': _percentiles(all_samples),
+        'throughput': round(len(all_samples) / wall, 2),
+        'cpu_pct': round(cpu / wall * 100, 1),
+        'cpu_pct_per_session': round(cpu / wall * 100 / sessions, 1),
+        'rss_mb': round(rss_peak / 2 ** 20, 1),
+        'rss_per_session_mb': round(max(rss_peak - rss_before, 0) / 2 ** 20 / sessions, 2),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+    }
+
+
+def saturation_point(levels, min_gain=0.10, p95_factor=2.0):
+    """Jumlah sesi terbesar sebelum throughput berhenti naik atau p95 melewati batas; None jika tidak ada level"""
+    if not levels:
+        return None
+    base_p95 = levels[0]['all'].get('p95_ms')
+    saturated = levels[-1]['sessions']
+    for previous, level in zip(levels, levels[1:]):
+        gain = level['throughput'] / previous['throughput'] - 1 if previous['throughput'] else 0
+        too_slow = base_p95 and level['all'].get('p95_ms', 0) > p95_factor * base_p95
+        if gain < min_gain or too_slow:
+            saturated = previous['sessions']
+            break
+    return saturated
+
+
+def _print_level(level):
+    print(f"\n{level['sessions']} sesi: {level['throughput']} alur/detik, CPU {level['cpu_pct']}% "
+          f"({level['cpu_pct_per_session']}%/sesi), RSS {level['rss_mb']} MB "
+          f"(+{level['rss_per_session_mb']} MB/sesi), error {level['errors']}")
+    for flow, row in {**level['flows'], 'semua': level['all']}.items():
+        if row['n']:
+            print(f"  {flow:10s} n={row['n']:5d}  p50={row['p50_ms']:9.1f} ms  p95={row['p95_ms']:9.1f} ms  "
+                  f"p99={row['p99_ms']:9.1f} ms")
+    for error in level['error_samples']:
+        print(f"  ! {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban sesi Streamlit bersamaan terhadap Sheets palsu")
+    parser.add_argument('--sessions', default='1,2,4,8,16', help='Jumlah sesi bersamaan per level, dipisah koma')
+    parser.add_argument('--seconds', type=float, default=20.0, help='Durasi pengukuran per level')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Jeda per panggilan Sheets palsu')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Rata-rata jeda antar alur per sesi')
+    parser.add_argument('--min-gain', type=float, default=0.10, help='Kenaikan throughput minimum antar level')
+    parser.add_argument('--p95-factor', type=float, default=2.0, help='Batas p95 relatif terhadap p95 satu sesi')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Batas waktu satu rerun AppTest (detik)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='Path JSON hasil (default benchmarks/results/load-<waktu>.json)')
+    args = parser.parse_args(argv)
+
+    levels = sorted({int(s) for s in args.sessions.split(',') if s.strip()})
+    # Harus diatur sebelum app.py pertama kali dijalankan: penyimpanan dibuat sekali per proses
+    os.environ['DIABETES_SHEETS_BACKEND'] = 'memory'
+    os.environ['DIABETES_SHEETS_LATENCY'] = str(args.latency_ms / 1000)
+    os.environ.pop('DIABETES_STORAGE', None)
+    os.chdir(ROOT)
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.WARNING)
+    _share_test_runtime()
+
+    # Pemanasan: cold start (impor, model, koneksi) tidak ikut diukur
+    warmup = SimulatedSession('loadwarmup', 'pw', random.Random(args.seed), timeout=args.timeout)
+    warmup.register()
+    warmup.iteration(lambda flow, duration: None, 0)
+
+    results = []
+    for index, sessions in enumerate(levels):
+        level = run_level(sessions, args.seconds, args.think_ms / 1000, args.seed, args.timeout, index)
+        _print_level(level)
+        results.append(level)
+
+    saturation = saturation_point(results, args.min_gain, args.p95_factor)
+    print(f"\nTitik saturasi: {saturation} sesi bersamaan")
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seconds': args.seconds,
+            'latency_ms': args.latency_ms,
+            'think_ms': args.think_ms,
+            'min_gain': args.min_gain,
+            'p95_factor': args.p95_factor,
+            'seed': args.seed,
+        },
+        'levels': results,
+        'saturation_sessions': saturation,
+    }
+    path = args.save or os.path.join(RESULTS_DIR, 'load-' + time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""Benchmark offline untuk jalur prediksi, login, dan halaman riwayat.
+
+Semua tahap berjalan terhadap FakeSpreadsheet (tanpa jaringan) dengan data
+sintetis. Hasil berisi throughput serta latensi p50/p99 per tahap dan
+disimpan sebagai JSON agar bisa dibandingkan antar-run.
+
+Contoh (dari root repo):
+    python -m benchmarks.run                                   # 10k riwayat, 10k user
+    python -m benchmarks.run --history-rows 1000000 --repeat 20
+    python -m benchmarks.run --save benchmarks/baselines/main.json
+    python -m benchmarks.run --baseline benchmarks/baselines/main.json --tolerance 0.25
+    python -m benchmarks.run --stages predict_record,predict_batch
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import accounts
+from benchmarks import synthetic
+from cohort_stats import DIMENSIONS, cohort_table
+from history import TANGGAL_COLUMN, history_display_frame, normalize_tanggal
+from history_export import EXPORT_FORMATS, ExportCache
+from model_registry import ModelRegistry
+from riwayat_cache import RiwayatCache
+from sheets_client import RIWAYAT_HEADER, SheetsConnection, memory_authorizer
+from sheets_quota import QuotaLimiter
+from storage import SheetsStorage
+from trends import TrendCache
+from user_directory import UserDirectory
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+
+def measure(fn, repeat, warmup=1):
+    """Jalankan `fn` sebanyak `warmup` + `repeat` kali; kembalikan durasi (detik) tiap pemanggilan terukur"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples, items_per_call=1, unit='panggilan'):
+    samples = np.asarray(samples)
+    total = samples.sum()
+    return {
+        'n': int(len(samples)),
+        'mean_ms': round(float(samples.mean() * 1000), 4),
+        'p50_ms': round(float(np.percentile(samples, 50) * 1000), 4),
+        'p99_ms': round(float(np.percentile(samples, 99) * 1000), 4),
+        'throughput': round(float(len(samples) * items_per_call / total), 2) if total else None,
+        'unit': f'{unit}/detik',
+    }
+
+
+def _cycle(items):
+    state = {'i': 0}
+
+    def next_item():
+        item = items[state['i'] % len(items)]
+        state['i'] += 1
+        return item
+    return next_item
+
+
+def load_benchmark_predictor(mode, workdir):
+    """Predictor dari artefak repo, atau dari artefak sintetis jika diminta / artefak repo tidak konsisten"""
+    from fast_preprocess import FeatureLayoutError
+    from predictor import load_predictor
+
+    if mode in ('auto', 'repo'):
+        try:
+            return load_predictor(ModelRegistry()), 'repo'
+        except (FeatureLayoutError, FileNotFoundError) as e:
+            if mode == 'repo':
+                raise
+            print(f"Artefak repo tidak bisa dipakai ({e}); memakai artefak sintetis.", file=sys.stderr)
+    preprocessor_path, model_path = synthetic.synthetic_artifacts(workdir)
+    return load_predictor(ModelRegistry(), model_path=model_path, preprocessor_path=preprocessor_path,
+                          engine_path=None), 'synthetic'
+
+
+class BenchmarkSuite:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.results = {}
+        self.rng = np.random.default_rng(args.seed)
+        self.user_rows = synthetic.synthetic_users(args.users, seed=args.seed)
+        self.history_rows = synthetic.synthetic_history(args.history_rows, args.users, seed=args.seed)
+        self.spreadsheet = synthetic.fake_spreadsheet(self.user_rows, self.history_rows, latency=args.latency_ms / 1000)
+        connection = SheetsConnection(memory_authorizer(spreadsheet=self.spreadsheet),
+                                      limiter=QuotaLimiter(read_per_minute=None, write_per_minute=None))
+        self.storage = SheetsStorage(connection, journal_path=os.path.join(workdir, 'journal.db'))
+        self.connection = connection
+        # User yang dibuka di halaman riwayat: campuran user aktif dan user dengan sedikit riwayat
+        counts = pd.Series([row[0] for row in self.history_rows]).value_counts()
+        self.history_users = list(counts.index[:10]) + list(counts.index[-10:])
+        self.predictor = None
+        self.artifacts = None
+
+    def record(self, name, samples, **kwargs):
+        self.results[name] = summarize(samples, **kwargs)
+        row = self.results[name]
+        print(f"{name:26s} n={row['n']:6d}  p50={row['p50_ms']:10.3f} ms  p99={row['p99_ms']:10.3f} ms  "
+              f"{row['throughput']:>12} {row['unit']}")
+
+    def _repeat(self, cost='low'):
+        repeat = self.args.repeat
+        if cost == 'high':
+            # Tahap yang memindai seluruh sheet dibatasi agar 1 juta baris tetap selesai dalam waktu wajar
+            return max(3, min(repeat, 2_000_000 // max(self.args.history_rows, 1)))
+        return repeat
+
+    # --- Login ---
+    def stage_users_sync(self):
+        worksheet = lambda: self.connection.worksheet("Users")
+        self.record('users_sync', measure(lambda: UserDirectory(worksheet).refresh(), self._repeat('high')),
+                    items_per_call=len(self.user_rows), unit='user')
+
+    def stage_verify_user(self):
+        self.storage.warm()
+        next_user = _cycle([(row[0], row[1]) for row in self.user_rows[::max(1, len(self.user_rows) // 1000)]])
+
+        def verify():
+            username, password = next_user()
+            ok, _ = accounts.verify_user(self.storage, username, password)
+            assert ok
+        self.record('verify_user', measure(verify, self._repeat()))
+
+    # --- Riwayat ---
+    def stage_history_sync(self):
+        worksheet = lambda: self.connection.worksheet("Riwayat")
+        self.record('history_sync', measure(lambda: RiwayatCache(worksheet).sync(), self._repeat('high')),
+                    items_per_call=len(self.history_rows), unit='baris')
+        # Migrasi sekali jalan kolom tanggal (campuran format lama dan ISO) secara vektor
+        position = RIWAYAT_HEADER.index(TANGGAL_COLUMN)
+        tanggal = [row[position] for row in self.history_rows]
+        self.record('history_migrate_dates', measure(lambda: normalize_tanggal(tanggal), self._repeat('high')),
+                    items_per_call=len(tanggal), unit='baris')
+
+    def stage_history_page(self):
+        self.storage.warm()
+        users, riwayat = self.storage.users, self.storage.riwayat
+
+        def stale_rerun(read):
+            # Rerun halaman riwayat dengan kedua cache basi (sinkronisasi inkremental, terikat latensi)
+            def run():
+                users.invalidate()
+                riwayat.invalidate()
+                read()
+            return run
+        self.record('history_rerun_serial', measure(stale_rerun(lambda: (users.refresh(), riwayat.sync())),
+                                                    self._repeat()))
+        self.record('history_rerun_prefetch', measure(stale_rerun(lambda: self.storage.prefetch(history=True)),
+                                                      self._repeat()))
+        next_user = _cycle(self.history_users)
+        frames = {}
+
+        def user_frame():
+            username = next_user()
+            frames[username] = self.storage.user_history(username)
+        self.record('history_user_frame', measure(user_frame, self._repeat()))
+
+        next_frame = _cycle(list(frames.values()))
+        self.record('history_format', measure(lambda: history_display_frame(next_frame()), self._repeat()))
+        displays = [history_display_frame(frame) for frame in frames.values()]
+        next_display = _cycle(displays)
+        self.record('history_csv', measure(lambda: next_display().to_csv(index=False), self._repeat()))
+
+        def page():
+            # Satu halaman tabel (25 baris terbaru); CSV lengkap hanya dibuat saat diunduh
+            frame, _ = self.storage.user_history_page(next_user(), limit=25)
+            history_display_frame(frame)
+        self.record('history_page', measure(page, self._repeat()))
+
+        # Ekspor ditulis per potongan ke file; cache baru setiap panggilan agar file selalu dibuat ulang
+        export_dir = os.path.join(self.workdir, 'exports')
+        for fmt in EXPORT_FORMATS:
+            self.record(f'history_export_{fmt}', measure(
+                lambda: ExportCache(directory=export_dir).get(self.storage, next_user(), fmt), self._repeat()))
+
+        # Deret grafik tren (LTTB): dihitung ulang setiap panggilan vs dipakai ulang dari cache per user
+        self.record('history_trends', measure(lambda: TrendCache().get(self.storage, next_user()), self._repeat()))
+        # Cache diisi dulu untuk semua user yang diputar, sehingga tahap ini mengukur hit, bukan miss
+        trend_cache = TrendCache(max_users=max(256, len(self.history_users)))
+        for username in self.history_users:
+            trend_cache.get(self.storage, username)
+        warm_misses = trend_cache.misses
+        self.record('history_trends_cached', measure(lambda: trend_cache.get(self.storage, next_user()),
+                                                     self._repeat()))
+        assert trend_cache.misses == warm_misses, "history_trends_cached memicu miss"
+
+    def stage_cohort_dashboard(self):
+        # Rollup lintas user sudah terisi saat sinkronisasi; tahap ini hanya menyusun tabel chart
+        self.storage.warm()
+        self.record('cohort_dashboard', measure(
+            lambda: [cohort_table(self.storage.cohort_rollup(), dimension) for dimension in DIMENSIONS],
+            self._repeat()))
+
+    def stage_history_page_legacy(self):
+        """Alur lama app.py: get_all_records -> filter username -> format tanggal -> to_csv"""
+        worksheet = self.connection.worksheet("Riwayat")
+        next_user = _cycle(self.history_users)
+
+        def page():
+            df_riwayat = pd.DataFrame(worksheet.get_all_records())
+            username = next_user()
+            df_user = df_riwayat[df_riwayat['username'].astype(str).str.lower() == username.lower()]
+            history_display_frame(df_user).to_csv(index=False)
+        self.record('history_page_legacy', measure(page, self._repeat('high')))
+
+    # --- Prediksi ---
+    def _load_predictor(self):
+        if self.predictor is None:
+            self.predictor, self.artifacts = load_benchmark_predictor(self.args.artifacts, self.workdir)
+        return self.predictor
+
+    def stage_predict_record(self):
+        from predictor import Predictor
+
+        predictor = self._load_predictor()
+        records = synthetic.synthetic_records(max(self.args.repeat, 1000), seed=self.args.seed)
+        uncached = Predictor(predictor.preprocessor, predictor.model, cache_size=0)
+        next_record = _cycle(records)
+        self.record('predict_record_nocache', measure(lambda: uncached.predict_record(next_record()), self._repeat()))
+        next_record = _cycle(records)
+        self.record('predict_record', measure(lambda: predictor.predict_record(next_record()), self._repeat()))
+        if predictor.cache is not None:
+            self.results['predict_record']['cache'] = predictor.cache_stats()
+
+    def stage_predict_batch(self):
+        from batch_predict import score_chunk
+
+        predictor = self._load_predictor()
+        frame = synthetic.synthetic_frame(self.args.batch_rows, seed=self.args.seed)
+        self.record('predict_batch', measure(lambda: score_chunk(predictor, frame), max(3, self._repeat() // 20)),
+                    items_per_call=len(frame), unit='baris')
+
+    STAGES = {
+        'users_sync': stage_users_sync,
+        'verify_user': stage_verify_user,
+        'history_sync': stage_history_sync,
+        'history_page': stage_history_page,
+        'history_page_legacy': stage_history_page_legacy,
+        'cohort_dashboard': stage_cohort_dashboard,
+        'predict_record': stage_predict_record,
+        'predict_batch': stage_predict_batch,
+    }
+
+    def run(self, stages):
+        for name in stages:
+            self.STAGES[name](self)
+        self.storage.close()
+        return self.results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Bandingkan p50 tiap tahap dengan baseline; kembalikan daftar tahap yang melambat melebihi toleransi"""
+    regressions = []
+    print(f"\n{'tahap':26s} {'baseline p50':>14s} {'sekarang p50':>14s} {'rasio':>8s}")
+    for name, row in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or not base.get('p50_ms'):
+            continue
+        ratio = row['p50_ms'] / base['p50_ms']
+        flag = '  <-- lebih lambat' if ratio > 1 + tolerance else ''
+        print(f"{name:26s} {base['p50_ms']:12.3f}ms {row['p50_ms']:12.3f}ms {ratio:8.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline jalur prediksi, login, dan riwayat")
+    parser.add_argument('--history-rows', type=int, default=10_000, help='Jumlah baris sheet Riwayat (1k-1M)')
+    parser.add_argument('--users', type=int, default=10_000, help='Jumlah user di sheet Users')
+    parser.add_argument('--batch-rows', type=int, default=10_000, help='Ukuran DataFrame untuk predict_batch')
+    parser.add_argument('--repeat', type=int, default=200, help='Jumlah pengukuran per tahap')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Jeda per panggilan FakeSpreadsheet')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--artifacts', choices=['auto', 'repo', 'synthetic'], default='auto',
+                        help='Artefak model yang dipakai tahap prediksi')
+    parser.add_argument('--stages', default=','.join(BenchmarkSuite.STAGES), help='Daftar tahap, dipisah koma')
+    parser.add_argument('--save', help='Path JSON hasil (default benchmarks/results/<waktu>.json)')
+    parser.add_argument('--baseline', help='JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Batas perlambatan p50 relatif terhadap baseline')
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in BenchmarkSuite.STAGES]
+    if unknown:
+        parser.error(f"Tahap tidak dikenal: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = BenchmarkSuite(args, workdir)
+        stage_results = suite.run(stages)
+    results = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'history_rows': args.history_rows,
+            'users': args.users,
+            'batch_rows': args.batch_rows,
+            'repeat': args.repeat,
+            'latency_ms': args.latency_ms,
+            'seed': args.seed,
+            'artifacts': suite.artifacts,
+        },
+        'stages': stage_results,
+    }
+
+    path = args.save or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nHasil disimpan ke {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Perlambatan melebihi {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
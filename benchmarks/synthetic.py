@@ -0,0 +1,128 @@
+"""Data sintetis untuk benchmark: user, riwayat prediksi, panel lab, dan artefak model kecil"""
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_RANGES, GENDER_VALUES, NUMERIC_FEATURES, ORIGINAL_COLUMNS_ORDER
+from sheets_client import RIWAYAT_HEADER, USERS_HEADER
+
+CLASSES = ('N', 'P', 'Y')
+
+
+def usernames(n_users):
+    return [f"user{i:06d}" for i in range(n_users)]
+
+
+def synthetic_users(n_users, seed=0):
+    """Baris sheet "Users" dengan urutan USERS_HEADER"""
+    rng = np.random.default_rng(seed)
+    genders = rng.choice(GENDER_VALUES, n_users)
+    start = date(1950, 1, 1)
+    offsets = rng.integers(0, 365 * 50, n_users)
+    return [[name, f"pw{i}", gender, (start + timedelta(days=int(days))).strftime('%Y-%m-%d')]
+            for i, (name, gender, days) in enumerate(zip(usernames(n_users), genders, offsets))]
+
+
+def _date_pool(n_days=1000):
+    """Campuran format tanggal yang ada di sheet: ISO (baris baru) dan format lama"""
+    start = datetime(2023, 1, 1, 8, 30, 0)
+    pool = []
+    for i in range(n_days):
+        moment = start + timedelta(days=i, minutes=i * 7)
+        pool.append(moment.strftime('%Y-%m-%dT%H:%M:%S'))
+        pool.append(moment.strftime('%d %B %Y'))
+        pool.append(moment.strftime('%Y-%m-%d %H:%M:%S'))
+        pool.append(moment.strftime('%Y-%m-%d'))
+    return np.array(pool, dtype=object)
+
+
+def _value_pool(column):
+    low, high = FEATURE_RANGES[column]
+    step = 1 if isinstance(low, int) and isinstance(high, int) else 0.1
+    values = np.round(np.arange(low, high + step / 2, step), 1)
+    return np.array([str(int(v)) if step == 1 else str(v) for v in values], dtype=object)
+
+
+def synthetic_history(n_rows, n_users, seed=0, zipf=1.3):
+    """Baris sheet "Riwayat" dengan urutan RIWAYAT_HEADER.
+
+    Jumlah prediksi per user mengikuti distribusi Zipf sehingga ada user
+    dengan riwayat panjang. Sel diambil dari pool string bersama agar 1 juta
+    baris tetap muat di memori.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(usernames(n_users), dtype=object)
+    dates = _date_pool()
+    ranks = np.minimum(rng.zipf(zipf, n_rows), n_users) - 1
+    columns = {
+        'username': names[ranks],
+        'Gender': rng.choice(np.array(GENDER_VALUES, dtype=object), n_rows),
+        'Tanggal Prediksi': dates[rng.integers(0, len(dates), n_rows)],
+        'Hasil': rng.choice(np.array(CLASSES, dtype=object), n_rows),
+    }
+    for column in NUMERIC_FEATURES:
+        pool = _value_pool(column)
+        columns[column] = pool[rng.integers(0, len(pool), n_rows)]
+    return [list(row) for row in zip(*(columns[name] for name in RIWAYAT_HEADER))]
+
+
+def synthetic_records(n_records, seed=0, distinct=200):
+    """Panel lab untuk prediksi: `distinct` pasien dasar yang berulang dengan sedikit variasi"""
+    rng = np.random.default_rng(seed)
+    base = []
+    for _ in range(distinct):
+        record = {'ID': int(rng.integers(1, 1000)), 'No_Pation': int(rng.integers(10000, 99999)),
+                  'Gender': str(rng.choice(GENDER_VALUES))}
+        for column in NUMERIC_FEATURES:
+            low, high = FEATURE_RANGES[column]
+            record[column] = float(np.round(rng.uniform(low, high), 1))
+        base.append(record)
+    records = []
+    for i in rng.integers(0, distinct, n_records):
+        record = dict(base[i])
+        # Panel yang hampir sama: satu nilai bergeser satu langkah input
+        column = NUMERIC_FEATURES[int(rng.integers(0, len(NUMERIC_FEATURES)))]
+        low, high = FEATURE_RANGES[column]
+        record[column] = float(np.clip(np.round(record[column] + rng.choice([-0.1, 0.0, 0.1]), 1), low, high))
+        records.append(record)
+    return records
+
+
+def synthetic_frame(n_rows, seed=0):
+    """DataFrame input dengan urutan ORIGINAL_COLUMNS_ORDER"""
+    return pd.DataFrame(synthetic_records(n_rows, seed=seed, distinct=max(n_rows, 1)))[ORIGINAL_COLUMNS_ORDER]
+
+
+def fake_spreadsheet(user_rows, history_rows, latency=0.0):
+    """FakeSpreadsheet berisi sheet "Users" dan "Riwayat" yang sudah terisi"""
+    from fake_sheets import FakeSpreadsheet
+
+    spreadsheet = FakeSpreadsheet()
+    spreadsheet.add_worksheet("Users", header=USERS_HEADER).append_rows(user_rows)
+    spreadsheet.add_worksheet("Riwayat", header=RIWAYAT_HEADER).append_rows(history_rows)
+    # Latensi diaktifkan setelah data terisi agar pengisian awal tidak ikut menunggu
+    spreadsheet.latency = latency
+    for worksheet in spreadsheet.worksheets():
+        worksheet.latency = latency
+    return spreadsheet
+
+
+def synthetic_artifacts(directory, n_rows=2000, seed=0):
+    """Latih preprocessor + DecisionTree kecil yang konsisten dan simpan ke `directory`"""
+    import joblib
+    from sklearn.tree import DecisionTreeClassifier
+
+    from features import CATEGORICAL_FEATURES, make_preprocessor
+
+    frame = synthetic_frame(n_rows, seed=seed)
+    labels = np.where(frame['HbA1c'] >= 6.5, 'Y', np.where(frame['HbA1c'] >= 5.7, 'P', 'N'))
+    preprocessor = make_preprocessor().fit(frame[NUMERIC_FEATURES + CATEGORICAL_FEATURES])
+    model = DecisionTreeClassifier(max_depth=6, random_state=seed)
+    model.fit(preprocessor.transform(frame[NUMERIC_FEATURES + CATEGORICAL_FEATURES]), labels)
+    preprocessor_path = os.path.join(directory, 'preprocessor.pkl')
+    model_path = os.path.join(directory, 'decision_tree_model.pkl')
+    joblib.dump(preprocessor, preprocessor_path)
+    joblib.dump(model, model_path)
+    return preprocessor_path, model_path
@@ -0,0 +1,135 @@
+"""Rollup prediksi lintas user (kohort) yang diperbarui secara inkremental setiap ada baris riwayat baru.
+
+Bentuk tersimpan: dict {(dimensi, kunci, hasil): jumlah}, misalnya
+    ('total', 'semua', 'Y'): 120, ('umur', '40-49', 'P'): 12, ('gender', 'F', 'N'): 30,
+    ('bulan', '2025-09', 'Y'): 7, ('HbA1c', '6.5', 'P'): 4, ('BMI', '27.5', 'N'): 9
+Kunci histogram HbA1c/BMI adalah batas bawah bin. Ukuran rollup hanya bergantung
+pada jumlah kategori (kelompok umur, gender, bulan, bin), bukan jumlah baris
+riwayat, sehingga dashboard kohort dirender dalam waktu konstan. Rollup bisa
+disimpan sebagai snapshot Parquet beserta watermark baris terakhir yang sudah dihitung.
+"""
+import os
+import uuid
+from datetime import datetime
+from functools import lru_cache
+
+from features import FEATURE_RANGES, class_description_mapping
+from user_stats import CLASS_LABELS, _number
+
+DIMENSIONS = ('total', 'umur', 'gender', 'bulan', 'HbA1c', 'BMI')
+# Umur input minimal 20 (FEATURE_RANGES); label dipilih agar urutan alfabet sama dengan urutan umur
+AGE_BANDS = ((30, '20-29'), (40, '30-39'), (50, '40-49'), (60, '50-59'), (None, '60+'))
+# Lebar bin histogram; rentang mengikuti FEATURE_RANGES, nilai di luar rentang masuk bin tepi
+HISTOGRAM_WIDTHS = {'HbA1c': 0.5, 'BMI': 2.5}
+SNAPSHOT_COLUMNS = ('dimensi', 'kunci', 'hasil', 'jumlah')
+# (kolom, batas bawah, lebar, label bin) dihitung sekali; update_rollup dipanggil untuk setiap baris saat sinkronisasi
+_HISTOGRAMS = [(column, low, width, [f"{low + i * width:g}" for i in range(int(round((high - low) / width)))])
+               for column, width in HISTOGRAM_WIDTHS.items() for low, high in [FEATURE_RANGES[column]]]
+
+
+def new_rollup():
+    return {}
+
+
+def _age_band(value):
+    age = _number(value)
+    if age is None:
+        return None
+    for upper, label in AGE_BANDS:
+        if upper is None or age < upper:
+            return label
+
+
+@lru_cache(maxsize=1024)
+def _display_month(text):
+    # Format tampilan lama, mis. '1 September 2025' (jumlah nilainya kecil, strptime cukup sekali per nilai)
+    try:
+        return datetime.strptime(text, '%d %B %Y').strftime('%Y-%m')
+    except ValueError:
+        return None
+
+
+def _month(value):
+    text = '' if value is None else str(value).strip()
+    # ISO dan format lama berawalan YYYY-MM-DD
+    if text[4:5] == '-' and text[:4].isdigit():
+        return text[:7]
+    return _display_month(text)
+
+
+def _histogram_bin(value, low, width, labels):
+    number = _number(value)
+    if number is None:
+        return None
+    return labels[min(max(int((number - low) // width), 0), len(labels) - 1)]
+
+
+def record_keys(record):
+    """Pasangan (dimensi, kunci) yang dihitung untuk satu baris riwayat"""
+    keys = [('total', 'semua'), ('umur', _age_band(record.get('AGE'))),
+            ('gender', str(record.get('Gender') or '') or None), ('bulan', _month(record.get('Tanggal Prediksi')))]
+    keys += [(column, _histogram_bin(record.get(column), low, width, labels))
+             for column, low, width, labels in _HISTOGRAMS]
+    return [(dimension, key) for dimension, key in keys if key is not None]
+
+
+def update_rollup(rollup, record):
+    """Tambahkan satu baris riwayat (dict dengan kolom RIWAYAT_HEADER) ke rollup, O(1)"""
+    hasil = str(record.get('Hasil', ''))
+    if hasil not in CLASS_LABELS:
+        return rollup
+    for dimension, key in record_keys(record):
+        rollup[(dimension, key, hasil)] = rollup.get((dimension, key, hasil), 0) + 1
+    return rollup
+
+
+def rollup_rows(rollup):
+    """Baris (dimensi, kunci, hasil, jumlah) untuk disimpan sebagai tabel"""
+    return [(dimension, key, hasil, count) for (dimension, key, hasil), count in sorted(rollup.items())]
+
+
+def rollup_from_rows(rows):
+    return {(dimension, key, hasil): int(count) for dimension, key, hasil, count in rows}
+
+
+def write_snapshot(rollup, path, watermark):
+    """Simpan rollup sebagai Parquet (ditulis atomik); `watermark` menandai baris terakhir yang sudah dihitung"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = rollup_rows(rollup)
+    columns = list(zip(*rows)) if rows else [[] for _ in SNAPSHOT_COLUMNS]
+    schema = pa.schema([('dimensi', pa.string()), ('kunci', pa.string()), ('hasil', pa.string()),
+                        ('jumlah', pa.int64())], metadata={'watermark': str(watermark)})
+    table = pa.Table.from_arrays([pa.array(list(values), type=field.type) for values, field in zip(columns, schema)],
+                                 schema=schema)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """(rollup, watermark) dari snapshot Parquet, atau (None, None) jika belum ada"""
+    import pyarrow.parquet as pq
+
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    watermark = (table.schema.metadata or {}).get(b'watermark', b'0').decode()
+    return rollup_from_rows(zip(*(table.column(name).to_pylist() for name in SNAPSHOT_COLUMNS))), int(watermark)
+
+
+def cohort_table(rollup, dimension):
+    """DataFrame jumlah prediksi per kunci `dimensi` (baris) dan kelas hasil (kolom), siap untuk chart"""
+    import pandas as pd
+
+    counts = {}
+    for (dim, key, hasil), count in rollup.items():
+        if dim == dimension:
+            counts.setdefault(key, dict.fromkeys(CLASS_LABELS, 0))[hasil] = count
+    # Kunci histogram menjadi angka agar sumbu chart berurutan secara numerik
+    keys = sorted(counts, key=float) if dimension in HISTOGRAM_WIDTHS else sorted(counts)
+    index = [float(key) for key in keys] if dimension in HISTOGRAM_WIDTHS else keys
+    frame = pd.DataFrame([counts[key] for key in keys], index=pd.Index(index, name=dimension),
+                         columns=list(CLASS_LABELS))
+    return frame.rename(columns=class_description_mapping)
@@ -0,0 +1,233 @@
+"""Pengganti Google Sheets di memori untuk pengujian lokal tanpa jaringan.
+
+Hanya meniru sebagian kecil API gspread yang dipakai aplikasi. Parameter
+`latency` menambahkan jeda per panggilan untuk mensimulasikan round trip HTTPS.
+`error_rate` dan `quota_per_minute` membuat panggilan gagal dengan 503 acak
+atau 429 (kuota terlampaui) untuk menguji retry dan rate limiter secara offline.
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from sheets_client import numericise
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index
+
+
+def parse_range(range_name):
+    """Ubah notasi A1 ('A2:N', 'A2:N100', 'B:B') menjadi (row_start, row_end, col_start, col_end)"""
+    if '!' in range_name:
+        range_name = range_name.split('!', 1)[1]
+    parts = range_name.split(':')
+    bounds = []
+    for part in parts:
+        match = re.fullmatch(r'([A-Za-z]*)(\d*)', part)
+        if not match:
+            raise ValueError(f"Range tidak valid: {range_name}")
+        col = _column_index(match.group(1)) if match.group(1) else None
+        row = int(match.group(2)) if match.group(2) else None
+        bounds.append((row, col))
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+    (row_start, col_start), (row_end, col_end) = bounds
+    return row_start or 1, row_end, col_start or 1, col_end
+
+
+def _cell_text(value):
+    return '' if value is None else str(value)
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeAPIError(Exception):
+    """Meniru gspread.exceptions.APIError: kode status di `.code` dan `.response.status_code`"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.response = _Response(code)
+
+
+class FaultInjector:
+    """Kegagalan buatan bersama untuk satu spreadsheet: 429 di atas kuota per menit, 503 acak, atau terjadwal"""
+
+    def __init__(self, error_rate=0.0, quota_per_minute=None, seed=None, clock=time.monotonic):
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._window = deque()
+        self._scheduled = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def fail_next(self, count=1, code=429):
+        """Gagalkan `count` panggilan berikutnya dengan kode `code`"""
+        with self._lock:
+            self._scheduled.extend([code] * count)
+
+    def check(self):
+        with self._lock:
+            code = self._scheduled.popleft() if self._scheduled else None
+            if code is None and self.quota_per_minute is not None:
+                now = self._clock()
+                while self._window and now - self._window[0] >= 60.0:
+                    self._window.popleft()
+                if len(self._window) >= self.quota_per_minute:
+                    code = 429
+                else:
+                    self._window.append(now)
+            if code is None and self.error_rate and self._rng.random() < self.error_rate:
+                code = 503
+            if code is not None:
+                self.rejected += 1
+        if code is not None:
+            raise FakeAPIError(code, {429: 'Quota exceeded', 503: 'Service unavailable'}.get(code, 'Error'))
+
+
+class FakeWorksheet:
+    def __init__(self, title, header=None, latency=0.0, faults=None):
+        self.title = title
+        self.latency = latency
+        self.faults = faults or FaultInjector()
+        self._rows = [list(header)] if header else []
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _tick(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self.faults.check()
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    def row_values(self, row):
+        self._tick()
+        with self._lock:
+            if row > len(self._rows):
+                return []
+            return [_cell_text(v) for v in self._rows[row - 1]]
+
+    def get_all_values(self):
+        self._tick()
+        with self._lock:
+            return [[_cell_text(v) for v in r] for r in self._rows]
+
+    def get_values(self, range_name=None):
+        self._tick()
+        with self._lock:
+            if range_name is None:
+                return [[_cell_text(v) for v in r] for r in self._rows]
+            row_start, row_end, col_start, col_end = parse_range(range_name)
+            rows = self._rows[row_start - 1:row_end]
+            return [[_cell_text(v) for v in r[col_start - 1:col_end]] for r in rows]
+
+    get = get_values
+
+    def get_all_records(self):
+        self._tick()
+        with self._lock:
+            if not self._rows:
+                return []
+            header = self._rows[0]
+            records = []
+            for r in self._rows[1:]:
+                padded = list(r) + [''] * (len(header) - len(r))
+                records.append({h: numericise(_cell_text(v)) for h, v in zip(header, padded)})
+            return records
+
+    def append_row(self, values, value_input_option='RAW'):
+        self._tick()
+        with self._lock:
+            self._rows.append(list(values))
+
+    def append_rows(self, values, value_input_option='RAW'):
+        self._tick()
+        with self._lock:
+            self._rows.extend(list(r) for r in values)
+
+    def update(self, range_name, values):
+        self._tick()
+        with self._lock:
+            row_start, _, col_start, _ = parse_range(range_name)
+            for offset, row in enumerate(values):
+                index = row_start - 1 + offset
+                while len(self._rows) <= index:
+                    self._rows.append([])
+                target = self._rows[index]
+                needed = col_start - 1 + len(row)
+                if len(target) < needed:
+                    target.extend([''] * (needed - len(target)))
+                target[col_start - 1:needed] = row
+
+
+class FakeSpreadsheet:
+    def __init__(self, latency=0.0, error_rate=0.0, quota_per_minute=None, seed=None):
+        self.latency = latency
+        self.faults = FaultInjector(error_rate=error_rate, quota_per_minute=quota_per_minute, seed=seed)
+        self._worksheets = {}
+
+    def add_worksheet(self, title, header=None, rows=None, cols=None):
+        ws = FakeWorksheet(title, header=header, latency=self.latency, faults=self.faults)
+        self._worksheets[title] = ws
+        return ws
+
+    def worksheet(self, title):
+        if self.latency:
+            time.sleep(self.latency)
+        self.faults.check()
+        if title not in self._worksheets:
+            raise KeyError(f"Worksheet '{title}' tidak ditemukan")
+        return self._worksheets[title]
+
+    def worksheets(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self.faults.check()
+        return list(self._worksheets.values())
+
+    def values_batch_get(self, ranges, params=None):
+        """Beberapa range ("'Sheet'!A2:N" atau "'Sheet'") dalam satu panggilan, bentuk respons seperti Sheets API"""
+        if self.latency:
+            time.sleep(self.latency)
+        self.faults.check()
+        value_ranges = []
+        for range_name in ranges:
+            title, _, cells = range_name.partition('!')
+            worksheet = self._worksheets[title.strip("'")]
+            with worksheet._lock:
+                rows = worksheet._rows
+                if cells:
+                    row_start, row_end, col_start, col_end = parse_range(cells)
+                    rows = [r[col_start - 1:col_end] for r in rows[row_start - 1:row_end]]
+                values = [[_cell_text(v) for v in r] for r in rows]
+            entry = {'range': range_name, 'majorDimension': 'ROWS'}
+            # Seperti API asli, range kosong tidak memiliki key 'values'
+            if values:
+                entry['values'] = values
+            value_ranges.append(entry)
+        return {'spreadsheetId': 'memory', 'valueRanges': value_ranges}
+
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_url(self, url):
+        if self.spreadsheet.latency:
+            time.sleep(self.spreadsheet.latency)
+        self.spreadsheet.faults.check()
+        return self.spreadsheet
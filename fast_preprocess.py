@@ -0,0 +1,320 @@
+"""Kompilasi preprocessor (ColumnTransformer) yang sudah di-fit menjadi jalur cepat NumPy.
+
+Bagian numerik dikompilasi menjadi operasi vektor (isi nilai kosong, kurangi
+mean, bagi scale) dengan urutan operasi yang sama seperti scikit-learn
+sehingga hasilnya identik. Bagian kategorikal menjadi tabel lookup one-hot;
+seperti SimpleImputer, hanya NaN yang diisi modus, sedangkan None diperlakukan
+sebagai kategori tidak dikenal (one-hot nol semua dengan handle_unknown='ignore').
+Input satu pasien ditulis langsung ke buffer NumPy yang sudah dialokasikan,
+tanpa membangun DataFrame.
+
+Layout fitur dicek sekali saat dimuat terhadap `model_dt.n_features_in_` dan
+manifest `feature_manifest.json` (jika ada):
+    python fast_preprocess.py --write-manifest
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+MANIFEST_PATH = 'feature_manifest.json'
+MANIFEST_VERSION = 1
+
+
+class FeatureLayoutError(ValueError):
+    """Layout fitur preprocessor tidak cocok dengan model atau manifest"""
+
+
+class UnsupportedPreprocessor(ValueError):
+    """Preprocessor berisi langkah yang belum bisa dikompilasi"""
+
+
+def _is_missing(value):
+    return value is None or _is_nan(value)
+
+
+def _is_nan(value):
+    return isinstance(value, float) and value != value
+
+
+def _plain(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _steps(transformer):
+    if transformer == 'passthrough':
+        return []
+    if hasattr(transformer, 'steps'):
+        return [step for _, step in transformer.steps if step != 'passthrough']
+    return [transformer]
+
+
+class _NumericBlock:
+    def __init__(self, columns, steps):
+        self.columns = list(columns)
+        self.ops = []
+        for step in steps:
+            name = type(step).__name__
+            if name == 'SimpleImputer':
+                if not (isinstance(step.missing_values, float) and np.isnan(step.missing_values)):
+                    raise UnsupportedPreprocessor("SimpleImputer dengan missing_values selain NaN")
+                if getattr(step, 'add_indicator', False):
+                    raise UnsupportedPreprocessor("SimpleImputer dengan add_indicator")
+                self.ops.append(('fill', np.asarray(step.statistics_, dtype=np.float64)))
+            elif name == 'StandardScaler':
+                if step.with_mean and step.mean_ is not None:
+                    self.ops.append(('sub', np.asarray(step.mean_, dtype=np.float64)))
+                if step.with_std and step.scale_ is not None:
+                    self.ops.append(('div', np.asarray(step.scale_, dtype=np.float64)))
+            elif name == 'FunctionTransformer' and step.func is None:
+                continue
+            else:
+                raise UnsupportedPreprocessor(f"Langkah numerik tidak didukung: {name}")
+        self.width = len(self.columns)
+
+    @classmethod
+    def from_ops(cls, columns, ops):
+        block = cls(columns, [])
+        block.ops = [(op, np.asarray(values, dtype=np.float64)) for op, values in ops]
+        return block
+
+    def apply(self, block):
+        # Urutan operasi sama dengan SimpleImputer lalu StandardScaler (X -= mean_; X /= scale_)
+        for op, values in self.ops:
+            if op == 'fill':
+                mask = np.isnan(block)
+                if mask.any():
+                    block[mask] = np.broadcast_to(values, block.shape)[mask]
+            elif op == 'sub':
+                block -= values
+            else:
+                block /= values
+        return block
+
+
+class _CategoricalBlock:
+    def __init__(self, columns, steps):
+        self.columns = list(columns)
+        self.fill = [None] * len(self.columns)
+        encoder = None
+        for step in steps:
+            name = type(step).__name__
+            if name == 'SimpleImputer' and encoder is None:
+                self.fill = list(step.statistics_)
+            elif name == 'OneHotEncoder' and encoder is None:
+                encoder = step
+            else:
+                raise UnsupportedPreprocessor(f"Langkah kategorikal tidak didukung: {name}")
+        if encoder is None:
+            raise UnsupportedPreprocessor("Kolom kategorikal tanpa OneHotEncoder")
+        if getattr(encoder, 'drop_idx_', None) is not None:
+            raise UnsupportedPreprocessor("OneHotEncoder dengan parameter drop")
+        if getattr(encoder, '_infrequent_enabled', False):
+            raise UnsupportedPreprocessor("OneHotEncoder dengan kategori infrequent")
+        self.handle_unknown = encoder.handle_unknown
+        self.lookup = []
+        offset = 0
+        for categories in encoder.categories_:
+            self.lookup.append({category: offset + i for i, category in enumerate(categories)})
+            offset += len(categories)
+        self.width = offset
+
+    @classmethod
+    def from_categories(cls, columns, categories, fill, handle_unknown):
+        block = cls.__new__(cls)
+        block.columns = list(columns)
+        block.fill = list(fill)
+        block.handle_unknown = handle_unknown
+        block.lookup = []
+        offset = 0
+        for values in categories:
+            block.lookup.append({category: offset + i for i, category in enumerate(values)})
+            offset += len(values)
+        block.width = offset
+        return block
+
+    def positions(self, values):
+        """Posisi kolom one-hot yang bernilai 1 untuk satu baris input"""
+        result = []
+        for i, value in enumerate(values):
+            # Seperti SimpleImputer pada kolom object: hanya NaN yang diisi, None menjadi kategori tidak dikenal
+            if _is_nan(value) and self.fill[i] is not None:
+                value = self.fill[i]
+            position = self.lookup[i].get(value)
+            if position is None:
+                if self.handle_unknown == 'error':
+                    raise ValueError(f"Kategori tidak dikenal pada kolom {self.columns[i]}: {value!r}")
+                continue
+            result.append(position)
+        return result
+
+
+class FusedPreprocessor:
+    """Versi terkompilasi dari ColumnTransformer yang sudah di-fit"""
+
+    def __init__(self, preprocessor):
+        if not hasattr(preprocessor, 'transformers_'):
+            raise UnsupportedPreprocessor("Preprocessor bukan ColumnTransformer yang sudah di-fit")
+        blocks = []
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            steps = _steps(transformer)
+            if any(type(step).__name__ == 'OneHotEncoder' for step in steps):
+                blocks.append(_CategoricalBlock(columns, steps))
+            else:
+                blocks.append(_NumericBlock(columns, steps))
+        try:
+            feature_names_out = [str(n) for n in preprocessor.get_feature_names_out()]
+        except Exception:
+            feature_names_out = None
+        self._init_blocks(blocks, feature_names_out)
+
+    def _init_blocks(self, blocks, feature_names_out=None):
+        self.blocks = []
+        offset = 0
+        for block in blocks:
+            self.blocks.append((offset, block))
+            offset += block.width
+        self.n_features_out = offset
+        self.input_columns = [c for _, block in self.blocks for c in block.columns]
+        self.feature_names_out = feature_names_out or [f'x{i}' for i in range(offset)]
+        self._local = threading.local()
+
+    def spec(self):
+        """Parameter terkompilasi dalam bentuk (spec JSON, dict array) untuk diekspor tanpa pickle"""
+        blocks = []
+        arrays = {}
+        for index, (_, block) in enumerate(self.blocks):
+            if isinstance(block, _NumericBlock):
+                ops = []
+                for op_index, (op, values) in enumerate(block.ops):
+                    name = f'pre{index}_{op_index}_{op}'
+                    arrays[name] = values
+                    ops.append([op, name])
+                blocks.append({'kind': 'numeric', 'columns': block.columns, 'ops': ops})
+            else:
+                categories = [sorted(lookup, key=lookup.get) for lookup in block.lookup]
+                blocks.append({'kind': 'categorical', 'columns': block.columns,
+                               'categories': [[_plain(c) for c in values] for values in categories],
+                               'fill': [_plain(v) for v in block.fill], 'handle_unknown': block.handle_unknown})
+        return {'blocks': blocks, 'feature_names_out': self.feature_names_out}, arrays
+
+    @classmethod
+    def from_spec(cls, spec, arrays):
+        """Bangun ulang FusedPreprocessor dari hasil `spec()` tanpa scikit-learn"""
+        blocks = []
+        for item in spec['blocks']:
+            if item['kind'] == 'numeric':
+                blocks.append(_NumericBlock.from_ops(item['columns'], [(op, arrays[name]) for op, name in item['ops']]))
+            else:
+                blocks.append(_CategoricalBlock.from_categories(item['columns'], item['categories'],
+                                                                item['fill'], item['handle_unknown']))
+        fused = cls.__new__(cls)
+        fused._init_blocks(blocks, spec.get('feature_names_out'))
+        return fused
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.zeros((1, self.n_features_out), dtype=np.float64)
+            self._local.buffer = buffer
+        return buffer
+
+    def transform_record(self, record):
+        """Ubah satu dict input menjadi buffer (1, n_fitur) yang dipakai ulang per thread.
+
+        Buffer ditimpa pada pemanggilan berikutnya dari thread yang sama.
+        """
+        out = self._buffer()
+        out.fill(0.0)
+        for offset, block in self.blocks:
+            if isinstance(block, _NumericBlock):
+                values = out[:, offset:offset + block.width]
+                for i, column in enumerate(block.columns):
+                    value = record.get(column)
+                    values[0, i] = np.nan if _is_missing(value) else float(value)
+                block.apply(values)
+            else:
+                for position in block.positions([record.get(c) for c in block.columns]):
+                    out[0, offset + position] = 1.0
+        return out
+
+    def transform_frame(self, frame):
+        """Transformasi vektor untuk banyak baris (DataFrame)"""
+        out = np.zeros((len(frame), self.n_features_out), dtype=np.float64)
+        for offset, block in self.blocks:
+            if isinstance(block, _NumericBlock):
+                values = frame[block.columns].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+                out[:, offset:offset + block.width] = block.apply(values)
+            else:
+                for i, column in enumerate(block.columns):
+                    series = frame[column]
+                    missing = series.isna().to_numpy(copy=True)
+                    if block.fill[i] is not None and missing.any():
+                        # isna() juga menandai None/pd.NA; yang diisi hanya NaN, sama seperti positions()
+                        values = series.to_numpy(dtype=object)
+                        missing[missing] = [_is_nan(value) for value in values[missing]]
+                        series = series.where(~missing, block.fill[i])
+                    codes = series.map(block.lookup[i])
+                    known = codes.notna().to_numpy()
+                    if not known.all() and block.handle_unknown == 'error':
+                        unknown = series[~known].iloc[0]
+                        raise ValueError(f"Kategori tidak dikenal pada kolom {column}: {unknown!r}")
+                    rows = np.flatnonzero(known)
+                    out[rows, offset + codes[known].to_numpy(dtype=np.int64)] = 1.0
+        return out
+
+    def layout(self):
+        return {
+            'version': MANIFEST_VERSION,
+            'input_columns': self.input_columns,
+            'output_features': self.feature_names_out,
+            'n_features': self.n_features_out,
+        }
+
+
+def check_layout(layout, model, manifest_path=MANIFEST_PATH):
+    """Cek layout fitur terhadap model dan manifest tersimpan; raise FeatureLayoutError jika tidak cocok"""
+    expected = getattr(model, 'n_features_in_', None)
+    if expected is not None and layout['n_features'] != expected:
+        raise FeatureLayoutError(
+            f"Preprocessor menghasilkan {layout['n_features']} fitur, "
+            f"sedangkan model_dt membutuhkan {expected} fitur. Latih ulang atau perbarui artefak."
+        )
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for key in ('input_columns', 'output_features', 'n_features'):
+            if manifest.get(key) != layout[key]:
+                raise FeatureLayoutError(f"Layout fitur tidak cocok dengan {manifest_path} pada '{key}'.")
+
+
+def write_manifest(fused, model, manifest_path=MANIFEST_PATH):
+    layout = fused.layout()
+    check_layout(layout, model, manifest_path=None)
+    with open(manifest_path, 'w') as f:
+        json.dump(layout, f, indent=2)
+    return layout
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from model_registry import default_registry
+    from predictor import MODEL_PATH, PREPROCESSOR_PATH
+
+    parser = argparse.ArgumentParser(description="Kompilasi preprocessor dan kelola manifest layout fitur")
+    parser.add_argument('--write-manifest', action='store_true', help=f'Tulis {MANIFEST_PATH} dari artefak saat ini')
+    args = parser.parse_args()
+
+    registry = default_registry()
+    fused = FusedPreprocessor(registry.get(PREPROCESSOR_PATH))
+    model = registry.get(MODEL_PATH)
+    if args.write_manifest:
+        write_manifest(fused, model)
+        print(f"Manifest ditulis ke {MANIFEST_PATH}")
+    else:
+        check_layout(fused.layout(), model)
+        print(json.dumps(fused.layout(), indent=2))
@@ -0,0 +1,51 @@
+"""Skema fitur input model yang dipakai bersama oleh app, batch, dan service"""
+
+ORIGINAL_COLUMNS_ORDER = ['ID', 'No_Pation', 'Gender', 'AGE', 'Urea', 'Cr', 'HbA1c', 'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI']
+NUMERIC_FEATURES = ['AGE', 'Urea', 'Cr', 'HbA1c', 'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI']
+CATEGORICAL_FEATURES = ['Gender']
+INPUT_FEATURES = CATEGORICAL_FEATURES + NUMERIC_FEATURES
+
+# Rentang nilai yang sama dengan st.number_input pada user_input_features()
+FEATURE_RANGES = {
+    'AGE': (20, 80),
+    'Urea': (1.0, 40.0),
+    'Cr': (10, 1500),
+    'HbA1c': (3.0, 15.0),
+    'Chol': (1.0, 10.0),
+    'TG': (0.1, 10.0),
+    'HDL': (0.1, 3.0),
+    'LDL': (0.1, 7.0),
+    'VLDL': (0.0, 5.0),
+    'BMI': (15.0, 50.0),
+}
+GENDER_VALUES = ('M', 'F')
+
+class_description_mapping = {
+    'N': 'No Diabetes',
+    'P': 'Prediabetes',
+    'Y': 'Diabetes'
+}
+
+
+def make_preprocessor():
+    """ColumnTransformer standar (belum di-fit): imputasi + scaling numerik, imputasi + one-hot Gender"""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),
+        ('scaler', StandardScaler())
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, NUMERIC_FEATURES),
+            ('cat', categorical_transformer, CATEGORICAL_FEATURES)
+        ],
+        remainder='drop'
+    )
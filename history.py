@@ -0,0 +1,125 @@
+"""Penyiapan tabel riwayat prediksi untuk ditampilkan dan diunduh.
+
+Kolom "Tanggal Prediksi" untuk baris baru disimpan dalam format ISO
+(TANGGAL_FORMAT) agar bisa diurutkan dan difilter per rentang tanggal.
+Baris lama masih bisa berformat LEGACY_FORMATS; semuanya diparse per kolom
+(bukan per baris) dan bisa dimigrasikan sekali lewat `python startup.py --migrate-dates`.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from features import class_description_mapping
+
+TANGGAL_COLUMN = 'Tanggal Prediksi'
+TANGGAL_FORMAT = '%Y-%m-%dT%H:%M:%S'
+DISPLAY_FORMAT = '%d %B %Y'
+# Format lama: dengan jam (2025-09-01 12:07:59), tanggal saja (2025-09-01), dan tampilan (1 September 2025)
+LEGACY_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d', DISPLAY_FORMAT)
+HISTORY_PAGE_SIZES = (10, 25, 50, 100)
+MONTH_NAMES = np.array(['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                        'August', 'September', 'October', 'November', 'December'], dtype=object)
+
+
+def tanggal_sekarang():
+    """Timestamp kanonik untuk baris riwayat baru"""
+    return datetime.now().strftime(TANGGAL_FORMAT)
+
+
+def parse_tanggal(values):
+    """Series datetime64 dari kolom tanggal; NaT untuk nilai kosong atau tidak dikenali"""
+    text = pd.Series(values, dtype=object).astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    # Format dipilih dari bentuk string sekali per kolom, lalu setiap kelompok diparse dengan format eksplisit
+    length, separator = text.str.len(), text.str[10:11]
+    shapes = {
+        TANGGAL_FORMAT: (length == 19) & (separator == 'T'),
+        '%Y-%m-%d %H:%M:%S': (length == 19) & (separator == ' '),
+        '%Y-%m-%d': (length == 10) & (text.str[4:5] == '-'),
+    }
+    remaining = pd.Series(True, index=text.index)
+    for fmt, mask in shapes.items():
+        if mask.any():
+            parsed[mask] = pd.to_datetime(text[mask], format=fmt, errors='coerce')
+        remaining &= ~mask
+    remaining &= text.str.contains(' ', regex=False)
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(text[remaining], format=DISPLAY_FORMAT, errors='coerce')
+    return parsed
+
+
+def normalize_tanggal(values):
+    """Nilai tanggal dalam format kanonik; nilai yang tidak dikenali dibiarkan apa adanya"""
+    original = pd.Series(values, dtype=object)
+    parsed = parse_tanggal(original)
+    return _where_parsed(parsed, _iso_strings(parsed), original)
+
+
+def format_tanggal_prediksi(values, parsed=None):
+    """Format tampilan ('01 September 2025') untuk satu kolom tanggal sekaligus"""
+    original = pd.Series(values, dtype=object)
+    if parsed is None:
+        parsed = parse_tanggal(original)
+    # Disusun dari potongan string ISO (jauh lebih cepat daripada Series.dt.strftime)
+    iso = pd.Series(_iso_strings(parsed), index=parsed.index)
+    month = MONTH_NAMES[parsed.dt.month.fillna(1).to_numpy(dtype=int) - 1]
+    formatted = (iso.str[8:10] + ' ' + month + ' ' + iso.str[:4]).to_numpy(dtype=object)
+    return _where_parsed(parsed, formatted, original)
+
+
+def _iso_strings(parsed):
+    return np.datetime_as_string(parsed.to_numpy(dtype='datetime64[s]'), unit='s').astype(object)
+
+
+def _where_parsed(parsed, formatted, original):
+    # np.where (bukan Series.where) agar None/'' pada nilai asli tidak berubah menjadi NaN
+    values = np.where(parsed.notna().to_numpy(), formatted, original.to_numpy())
+    return pd.Series(values, index=original.index, dtype=object)
+
+
+def tanggal_bounds(start=None, end=None):
+    """Batas string [bawah, atas) untuk filter rentang tanggal (inklusif) langsung di penyimpanan.
+
+    Perbandingan string benar untuk nilai ISO dan format lama berawalan
+    YYYY-MM-DD; baris berformat '1 September 2025' perlu dimigrasikan dulu.
+    """
+    lower = start.isoformat() if start is not None else None
+    upper = (end + timedelta(days=1)).isoformat() if end is not None else None
+    return lower, upper
+
+
+def history_display_frame(df_user_riwayat, tanggal=None, start=None, end=None, number_from=1):
+    """Salinan riwayat user dengan kolom No, label Gender/Hasil, dan tanggal yang sudah diformat.
+
+    `tanggal` adalah hasil parse_tanggal yang sudah dihitung (opsional). Jika
+    `start`/`end` (date) diberikan, hanya baris dalam rentang tersebut (inklusif)
+    yang diambil; baris tanpa tanggal yang valid ikut tersaring. `number_from`
+    adalah nomor baris pertama (untuk halaman selain halaman pertama).
+    """
+    df_display = df_user_riwayat.reset_index(drop=True)
+    has_tanggal = TANGGAL_COLUMN in df_display.columns
+    if has_tanggal:
+        tanggal = parse_tanggal(df_display[TANGGAL_COLUMN]) if tanggal is None else tanggal.reset_index(drop=True)
+        if start is not None or end is not None:
+            mask = tanggal.notna()
+            if start is not None:
+                mask &= tanggal >= pd.Timestamp(start)
+            if end is not None:
+                mask &= tanggal < pd.Timestamp(end) + timedelta(days=1)
+            df_display, tanggal = df_display[mask], tanggal[mask]
+    df_display = df_display.copy()
+
+    # Ubah index menjadi kolom No dengan urutan dari number_from
+    df_display.index = range(number_from, number_from + len(df_display))
+    df_display.index.name = 'No'
+
+    df_display['Gender'] = df_display['Gender'].map({'M': 'Laki-laki', 'F': 'Perempuan'})
+    df_display['Hasil'] = df_display['Hasil'].map(class_description_mapping)
+
+    # Format ulang kolom Tanggal Prediksi jika ada
+    if has_tanggal:
+        df_display[TANGGAL_COLUMN] = format_tanggal_prediksi(
+            df_display[TANGGAL_COLUMN].to_numpy(), parsed=tanggal.reset_index(drop=True)
+        ).to_numpy()
+    return df_display
@@ -0,0 +1,144 @@
+"""Ekspor riwayat prediksi per user (CSV ter-gzip atau Parquet) yang dibuat hanya saat diminta.
+
+Riwayat dibaca dari penyimpanan per potongan (StorageBackend.iter_user_history)
+dan langsung ditulis ke file, sehingga memori tidak bergantung pada panjang
+riwayat. File hasil dipakai ulang sampai `history_version` user berubah.
+"""
+import gzip
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+from metrics import span
+from sheets_client import RIWAYAT_HEADER
+from storage import NUMERIC_COLUMNS
+
+EXPORT_FORMATS = {
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _write_csv_gz(chunks, path):
+    import pandas as pd
+
+    from history import history_display_frame
+
+    rows = 0
+    # Level 6 (bukan 9, bawaan gzip.open): ukuran hampir sama dengan kompresi yang lebih cepat
+    with gzip.open(path, 'wt', compresslevel=6, encoding='utf-8', newline='') as f:
+        for chunk in chunks:
+            display = history_display_frame(chunk, number_from=rows + 1)
+            display.to_csv(f, index=False, header=rows == 0)
+            rows += len(display)
+        if rows == 0:
+            history_display_frame(pd.DataFrame(columns=RIWAYAT_HEADER)).to_csv(f, index=False)
+    return rows
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.float64() if name in NUMERIC_COLUMNS else pa.string()) for name in RIWAYAT_HEADER])
+
+
+def _typed_columns(display):
+    """Kolom dengan tipe tetap agar setiap potongan cocok dengan skema Parquet"""
+    import pandas as pd
+
+    columns = {}
+    for name in RIWAYAT_HEADER:
+        values = display[name] if name in display.columns else pd.Series(None, index=display.index, dtype=object)
+        if name in NUMERIC_COLUMNS:
+            columns[name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            columns[name] = values.astype(object).map(lambda v: v if v is None or isinstance(v, str) else (
+                None if v != v else str(v)))
+    return pd.DataFrame(columns)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from history import history_display_frame
+
+    rows = 0
+    schema = _arrow_schema()
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            display = history_display_frame(chunk, number_from=rows + 1)
+            writer.write_table(pa.Table.from_pandas(_typed_columns(display), schema=schema, preserve_index=False))
+            rows += len(display)
+    return rows
+
+
+def write_export(chunks, fmt, path):
+    """Tulis potongan DataFrame riwayat ke `path` dalam format `fmt`; kembalikan jumlah baris"""
+    if fmt == 'csv.gz':
+        return _write_csv_gz(chunks, path)
+    if fmt == 'parquet':
+        return _write_parquet(chunks, path)
+    raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+
+
+class ExportCache:
+    """File ekspor terakhir per (user, format, rentang tanggal), dibuat ulang saat riwayat user berubah"""
+
+    def __init__(self, directory=None, max_entries=64):
+        self.directory = directory or tempfile.mkdtemp(prefix='riwayat-export-')
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, storage, username, fmt='csv.gz', start=None, end=None):
+        """Path file ekspor yang sesuai dengan riwayat user saat ini"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+        key = (str(username).lower(), fmt, start, end)
+        version = storage.history_version(username)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Klik bersamaan untuk ekspor yang sama menunggu satu proses pembuatan file
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version and os.path.exists(entry[1]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+            path = os.path.join(self.directory, f"{uuid.uuid4().hex}.{fmt}")
+            tmp_path = f"{path}.tmp"
+            try:
+                with span(f'history_export:{fmt}'):
+                    write_export(storage.iter_user_history(username, start=start, end=end), fmt, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            with self._lock:
+                self.misses += 1
+                stale = [self._entries.pop(key)[1]] if key in self._entries else []
+                self._entries[key] = (version, path)
+                while len(self._entries) > self.max_entries:
+                    evicted, (_, evicted_path) = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+                    stale.append(evicted_path)
+        for stale_path in stale:
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        return path
+
+    def read(self, storage, username, fmt='csv.gz', start=None, end=None):
+        with open(self.get(storage, username, fmt, start=start, end=end), 'rb') as f:
+            return f.read()
+
+    def stats(self):
+        with self._lock:
+            return {'entri': len(self._entries), 'maks': self.max_entries, 'hits': self.hits, 'misses': self.misses}
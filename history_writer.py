@@ -0,0 +1,182 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from metrics import span
+
+JOURNAL_PATH = os.environ.get('DIABETES_JOURNAL_PATH', 'riwayat_journal.db')
+
+
+class HistoryWriter:
+    """Antrean tulis-belakang (write-behind) untuk baris riwayat prediksi.
+
+    Setiap baris dicatat dulu ke jurnal SQLite lokal, lalu thread latar
+    belakang mengirimkannya ke sheet secara batch dengan `append_rows`.
+    Baris baru dihapus dari jurnal setelah batch berhasil dikirim, sehingga
+    baris yang tertunda ketika proses mati akan dikirim ulang saat writer
+    berikutnya berjalan (semantik at-least-once).
+
+    Jurnal bisa dipakai bersama beberapa proses (Streamlit dan serve dari
+    checkout yang sama). Sebelum dikirim, setiap batch diklaim dalam satu
+    transaksi (`claimed_by`, `claimed_at`) sehingga hanya satu proses yang
+    mengirim baris tersebut. Klaim yang lebih tua dari `claim_timeout` detik
+    dianggap milik proses yang sudah mati dan boleh diambil alih. Jurnal yang
+    sedang dikunci proses lain ditunggu `busy_timeout` detik; jika masih
+    terkunci, thread mundur (backoff) seperti saat `append_rows` gagal.
+    """
+
+    def __init__(self, get_worksheet, journal_path=JOURNAL_PATH, batch_size=100,
+                 flush_interval=1.0, base_backoff=1.0, max_backoff=60.0, on_flush=None, claim_timeout=300.0,
+                 busy_timeout=5.0):
+        self._get_worksheet = get_worksheet
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._on_flush = on_flush
+        self.claim_timeout = claim_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(journal_path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL, "
+            "claimed_by TEXT, claimed_at REAL)"
+        )
+        # Jurnal lama dibuat sebelum ada kolom klaim
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(journal)")}
+        for column, kind in (('claimed_by', 'TEXT'), ('claimed_at', 'REAL')):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE journal ADD COLUMN {column} {kind}")
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._thread = None
+        self.flushed_rows = 0
+        self.failed_attempts = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, row):
+        """Catat satu baris ke jurnal lalu bangunkan thread pengirim"""
+        payload = json.dumps(list(row), default=str)
+        with self._db_lock:
+            self._db.execute("INSERT INTO journal (payload, created_at) VALUES (?, ?)", (payload, time.time()))
+        self._idle.clear()
+        # Thread yang mati karena error tak terduga dihidupkan lagi agar baris tidak tertahan di jurnal
+        if self._thread is not None and not self._thread.is_alive() and not self._stopping.is_set():
+            self.start()
+        self._wakeup.set()
+
+    def depth(self):
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def _next_batch(self):
+        """Klaim batch berikutnya untuk proses ini: baris tanpa klaim, klaim sendiri, atau klaim yang kedaluwarsa"""
+        now = time.time()
+        with self._db_lock:
+            # BEGIN IMMEDIATE mengambil lock tulis sebelum SELECT agar dua proses tidak mengklaim baris yang sama
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                batch = self._db.execute(
+                    "SELECT id, payload FROM journal WHERE claimed_by IS NULL OR claimed_by = ? OR claimed_at < ? "
+                    "ORDER BY id LIMIT ?", (self.owner, now - self.claim_timeout, self.batch_size)
+                ).fetchall()
+                self._db.executemany("UPDATE journal SET claimed_by = ?, claimed_at = ? WHERE id = ?",
+                                     [(self.owner, now, row_id) for row_id, _ in batch])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return batch
+
+    def _forget(self, batch):
+        """Hapus batch yang sudah terkirim dari jurnal"""
+        with self._db_lock:
+            # Hanya baris yang diklaim proses ini; baris proses lain bisa berada di antaranya
+            self._db.executemany("DELETE FROM journal WHERE id = ? AND claimed_by = ?",
+                                 [(row_id, self.owner) for row_id, _ in batch])
+        self.flushed_rows += len(batch)
+        if self._on_flush is not None:
+            self._on_flush(len(batch))
+
+    def _backoff(self, failures, error):
+        self.failed_attempts += 1
+        self.last_error = str(error)
+        # Exponential backoff dengan jitter agar tidak membanjiri kuota Sheets maupun jurnal yang terkunci
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (failures - 1)))
+        self._stopping.wait(delay * random.uniform(0.5, 1.0))
+
+    def _run(self):
+        failures = 0
+        sent = None
+        while not self._stopping.is_set():
+            try:
+                # Batch yang sudah terkirim dihapus dulu; jika tidak, klaim berikutnya akan mengirimnya lagi
+                if sent is not None:
+                    self._forget(sent)
+                    sent = None
+                batch = self._next_batch()
+            except sqlite3.Error as e:
+                # Misalnya "database is locked" saat proses lain memegang jurnal lebih lama dari busy_timeout
+                failures += 1
+                self._backoff(failures, e)
+                continue
+            if not batch:
+                self._idle.set()
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                with span('append_rows'):
+                    self._get_worksheet().append_rows([json.loads(payload) for _, payload in batch])
+            except Exception as e:
+                failures += 1
+                self._backoff(failures, e)
+                continue
+            failures = 0
+            sent = batch
+        if sent is not None:
+            try:
+                self._forget(sent)
+            except sqlite3.Error as e:
+                # Tetap tercatat dan akan dikirim ulang oleh writer berikutnya (at-least-once)
+                self.last_error = str(e)
+
+    def flush(self, timeout=10.0):
+        """Tunggu hingga jurnal kosong; True jika berhasil dalam batas waktu"""
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.depth() == 0:
+                return True
+            self._idle.wait(0.05)
+        return self.depth() == 0
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'flushed_rows': self.flushed_rows,
+            'failed_attempts': self.failed_attempts,
+            'last_error': self.last_error,
+        }
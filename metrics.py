@@ -0,0 +1,213 @@
+"""Timing span per tahap dengan histogram agregat dan ekspor format teks Prometheus.
+
+Pemakaian:
+    from metrics import span
+
+    with span('model_predict'):
+        ...
+
+Setiap span dicatat ke histogram `diabetes_stage_seconds{stage=...}` milik
+proses. Jika thread sedang merekam trace rerun (`begin_trace()`), span juga
+masuk ke rincian rerun tersebut untuk panel admin.
+
+Ekspor (opsional):
+    DIABETES_METRICS_PATH=metrics.prom   # ditulis ulang berkala oleh app.py
+    DIABETES_METRICS_PORT=9464           # endpoint HTTP GET /metrics
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+METRIC_NAME = 'diabetes_stage_seconds'
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PATH = os.environ.get('DIABETES_METRICS_PATH')
+METRICS_PORT = os.environ.get('DIABETES_METRICS_PORT')
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus untuk satu label tahap"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Perkiraan kuantil dari batas bucket (batas atas bucket yang memuat kuantil)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace.append({'tahap': stage, 'ms': round(seconds * 1000, 3), 'level': self._local.depth})
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        local = self._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            self.observe(stage, time.perf_counter() - start)
+
+    def start(self, stage):
+        """Span manual untuk blok yang tidak praktis dibungkus `with`; panggil `.stop()` di akhir blok"""
+        return _Timer(self, stage)
+
+    def begin_trace(self):
+        """Mulai merekam span di thread ini (satu rerun Streamlit berjalan di satu thread)"""
+        self._local.trace = []
+        self._local.depth = 0
+
+    def current_trace(self):
+        """Span rerun saat ini sesuai urutan selesai; tahap bersarang memiliki level lebih besar"""
+        return list(getattr(self._local, 'trace', None) or [])
+
+    def summary(self):
+        """Ringkasan agregat per tahap untuk ditampilkan di UI"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            rows = []
+            for stage, histogram in items:
+                rows.append({
+                    'tahap': stage,
+                    'jumlah': histogram.count,
+                    'rata2_ms': round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+                    'p50_ms<=': _bound_ms(histogram.quantile(0.5)),
+                    'p99_ms<=': _bound_ms(histogram.quantile(0.99)),
+                })
+            return rows
+
+    def render_prometheus(self):
+        lines = [f"# HELP {METRIC_NAME} Durasi tiap tahap aplikasi dalam detik",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                running = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    running += count
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound:g}"}} {running}')
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {histogram.sum:.9f}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Tulis ekspor ke file secara atomik (untuk textfile collector node_exporter)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+class _Timer:
+    def __init__(self, registry, stage):
+        self._registry = registry
+        self.stage = stage
+        local = registry._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        self._start = time.perf_counter()
+        self._stopped = False
+
+    def stop(self):
+        if not self._stopped:
+            self._stopped = True
+            self._registry._local.depth -= 1
+            self._registry.observe(self.stage, time.perf_counter() - self._start)
+
+
+def _bound_ms(seconds):
+    if seconds is None:
+        return None
+    return 'inf' if seconds == float('inf') else round(seconds * 1000, 3)
+
+
+registry = MetricsRegistry()
+span = registry.span
+start_span = registry.start
+begin_trace = registry.begin_trace
+current_trace = registry.current_trace
+
+
+class _FileExporter:
+    """Tulis ulang file ekspor paling sering sekali per `interval` detik"""
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._written_at = 0.0
+        self._lock = threading.Lock()
+
+    def maybe_write(self):
+        now = time.monotonic()
+        if now - self._written_at < self.interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            registry.write_prometheus(self.path)
+            self._written_at = now
+        finally:
+            self._lock.release()
+
+
+def start_http_exporter(port, host='0.0.0.0'):
+    """Endpoint GET /metrics di thread latar belakang"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
+
+
+def exporter_from_env():
+    """File exporter dan/atau endpoint HTTP sesuai env; None jika tidak dikonfigurasi"""
+    if METRICS_PORT:
+        start_http_exporter(METRICS_PORT)
+    return _FileExporter(METRICS_PATH) if METRICS_PATH else None
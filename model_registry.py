@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import time
+
+from metrics import span
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hitung hash SHA-256 sebuah file secara bertahap"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactEntry:
+    """Satu artefak yang sudah dimuat beserta metadata integritasnya"""
+
+    def __init__(self, path, obj, mtime, size, sha256, load_seconds):
+        self.path = path
+        self.obj = obj
+        self.mtime = mtime
+        self.size = size
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.hits = 0
+
+
+class ModelRegistry:
+    """Registry artefak (model/preprocessor) yang dimuat sekali per proses server.
+
+    Setiap `get()` hanya melakukan `os.stat`. Artefak dimuat ulang jika mtime
+    atau ukuran file berubah; hash SHA-256 dipakai untuk memastikan isi file
+    benar-benar berubah sebelum unpickle ulang. Pergantian objek dilakukan
+    secara atomik di bawah lock sehingga sesi lain tidak pernah melihat
+    artefak setengah jadi.
+    """
+
+    def __init__(self, loader=None):
+        self._loader = loader
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, path, loader=None):
+        """Objek artefak di `path`; `loader` menggantikan loader default untuk artefak ini"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+            entry.hits += 1
+            return entry.obj
+        with self._lock:
+            # Cek ulang setelah mendapat lock, mungkin thread lain sudah memuat
+            entry = self._entries.get(path)
+            stat = os.stat(path)
+            if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                entry.hits += 1
+                return entry.obj
+            sha256 = file_sha256(path)
+            if entry is not None and entry.sha256 == sha256:
+                # File disentuh tanpa perubahan isi, cukup perbarui metadata
+                entry.mtime = stat.st_mtime
+                entry.size = stat.st_size
+                entry.hits += 1
+                return entry.obj
+            start = time.perf_counter()
+            if loader is None and self._loader is None:
+                # joblib (dan numpy) baru diimpor saat artefak pertama dimuat
+                import joblib
+                self._loader = joblib.load
+            with span(f'artifact_load:{os.path.basename(path)}'):
+                obj = (loader or self._loader)(path)
+            load_seconds = time.perf_counter() - start
+            # Pastikan file tidak berubah selama proses pemuatan
+            if file_sha256(path) != sha256:
+                raise RuntimeError(f"Artefak {path} berubah saat sedang dimuat, coba lagi.")
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._entries[path] = ArtifactEntry(path, obj, stat.st_mtime, stat.st_size, sha256, load_seconds)
+            return obj
+
+    def fingerprint(self, path):
+        """SHA-256 artefak yang sedang dimuat (None jika belum dimuat)"""
+        entry = self._entries.get(os.path.abspath(path))
+        return entry.sha256 if entry is not None else None
+
+    def stats(self):
+        """Ringkasan status setiap artefak untuk ditampilkan di UI"""
+        rows = []
+        for entry in list(self._entries.values()):
+            rows.append({
+                'artefak': os.path.basename(entry.path),
+                'sha256': entry.sha256[:12],
+                'waktu_muat_ms': round(entry.load_seconds * 1000, 2),
+                'cache_hits': entry.hits,
+                'dimuat_pada': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.loaded_at)),
+            })
+        return rows
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """Registry bersama untuk proses non-Streamlit (CLI, service)"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
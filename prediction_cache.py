@@ -0,0 +1,88 @@
+"""Cache prediksi berbasis region keputusan pohon (decision tree).
+
+Pohon hanya membandingkan fitur dengan threshold split (`X[:, f] <= t`,
+dengan X dikonversi ke float32 seperti di scikit-learn). Dua input yang
+berada di sel threshold yang sama pasti jatuh ke leaf yang sama dan
+mendapat `predict_proba` yang identik. Kunci cache adalah indeks sel
+tersebut per fitur, sehingga panel lab yang berulang atau hampir sama
+dilayani tanpa memanggil model.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _trees(model):
+    """Daftar `tree_` dari model pohon tunggal atau ensemble pohon; None jika bukan model pohon"""
+    if hasattr(model, 'tree_'):
+        return [model.tree_]
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        return None
+    trees = [getattr(estimator, 'tree_', None) for estimator in np.ravel(np.asarray(estimators, dtype=object))]
+    if not trees or any(tree is None for tree in trees):
+        return None
+    return trees
+
+
+class TreePredictionCache:
+    """Cache LRU terbatas untuk hasil prediksi, dengan kunci sel threshold pohon"""
+
+    def __init__(self, model, maxsize=4096):
+        trees = _trees(model)
+        if trees is None:
+            raise ValueError("Model bukan pohon keputusan atau ensemble pohon")
+        thresholds = {}
+        for tree in trees:
+            internal = tree.feature >= 0
+            for feature, threshold in zip(tree.feature[internal], tree.threshold[internal]):
+                thresholds.setdefault(int(feature), set()).add(float(threshold))
+        self.features = np.array(sorted(thresholds), dtype=np.intp)
+        self.thresholds = [np.array(sorted(thresholds[f]), dtype=np.float64) for f in self.features]
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, X):
+        """Indeks sel threshold per fitur untuk satu baris hasil preprocessing (1, n_fitur)"""
+        row = np.asarray(X[0, self.features], dtype=np.float32).astype(np.float64)
+        key = []
+        for thresholds, value in zip(self.thresholds, row):
+            # searchsorted 'left': t[i-1] < nilai <= t[i], sama dengan aturan `X <= threshold` pohon.
+            # NaN diberi sel tersendiri karena arahnya ditentukan per node, bukan oleh threshold.
+            key.append(-1 if value != value else int(np.searchsorted(thresholds, value, side='left')))
+        return tuple(key)
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entri': len(self._entries),
+            'maks': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
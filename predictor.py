@@ -0,0 +1,170 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from fast_preprocess import MANIFEST_PATH, FusedPreprocessor, UnsupportedPreprocessor, check_layout
+from features import ORIGINAL_COLUMNS_ORDER
+from metrics import span
+from model_registry import default_registry
+from prediction_cache import TreePredictionCache
+from tree_engine import ENGINE_PATH, TreeEngine
+
+MODEL_PATH = 'decision_tree_model.pkl'
+PREPROCESSOR_PATH = 'preprocessor.pkl'
+# Versi artefak aktif (nama direktori di models/) ditulis train.py --promote; tanpa file ini dipakai artefak root
+MODELS_DIR = 'models'
+CURRENT_POINTER = os.path.join(MODELS_DIR, 'CURRENT')
+
+
+class Predictor:
+    """Gabungan preprocessor dan model_dt untuk prediksi satu baris maupun batch.
+
+    Preprocessor dikompilasi ke jalur cepat NumPy (FusedPreprocessor) bila
+    memungkinkan; jika tidak, dipakai `preprocessor.transform` biasa. Layout
+    fitur dicek sekali di sini dan FeatureLayoutError dilempar jika tidak cocok
+    dengan model, alih-alih menambal kolom kosong saat prediksi.
+
+    Prediksi satu baris pada model pohon melewati TreePredictionCache; hasil
+    yang dikembalikan dari cache bersifat read-only.
+    """
+
+    def __init__(self, preprocessor, model, manifest_path='feature_manifest.json', cache_size=4096):
+        self.preprocessor = preprocessor
+        self.model = model
+        self.classes_ = model.classes_
+        try:
+            self.fused = preprocessor if isinstance(preprocessor, FusedPreprocessor) else FusedPreprocessor(preprocessor)
+            layout = self.fused.layout()
+        except UnsupportedPreprocessor:
+            self.fused = None
+            names = [str(n) for n in preprocessor.get_feature_names_out()]
+            layout = {'input_columns': list(getattr(preprocessor, 'feature_names_in_', [])),
+                      'output_features': names, 'n_features': len(names)}
+        check_layout(layout, model, manifest_path=manifest_path if self.fused is not None else None)
+        self.layout = layout
+        try:
+            self.cache = TreePredictionCache(model, maxsize=cache_size) if self.fused is not None and cache_size else None
+        except ValueError:
+            self.cache = None
+
+    def transform(self, frame):
+        with span('preprocess'):
+            if self.fused is not None:
+                return self.fused.transform_frame(frame)
+            return self.preprocessor.transform(frame[ORIGINAL_COLUMNS_ORDER])
+
+    def _proba_to_labels(self, proba):
+        return self.classes_[np.argmax(proba, axis=1)]
+
+    def predict(self, frame):
+        """Kembalikan (label kelas, probabilitas per kelas) untuk setiap baris"""
+        X = self.transform(frame)
+        with span('model_predict'):
+            proba = self.model.predict_proba(X)
+        return self._proba_to_labels(proba), proba
+
+    def predict_record(self, record):
+        """Prediksi satu pasien (dict) lewat buffer yang sudah dialokasikan, tanpa DataFrame"""
+        if self.fused is None:
+            return self.predict(pd.DataFrame(record, index=[0]))
+        with span('preprocess'):
+            X = self.fused.transform_record(record)
+        if self.cache is None:
+            with span('model_predict'):
+                proba = self.model.predict_proba(X)
+            return self._proba_to_labels(proba), proba
+        key = self.cache.key(X)
+        result = self.cache.get(key)
+        if result is None:
+            with span('model_predict'):
+                proba = self.model.predict_proba(X)
+            labels = self._proba_to_labels(proba)
+            proba.setflags(write=False)
+            labels.setflags(write=False)
+            result = (labels, proba)
+            self.cache.put(key, result)
+        return result
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def predict_records(self, records):
+        return self.predict(pd.DataFrame(list(records)))
+
+
+def engine_is_current(engine_path, *source_paths):
+    """True jika artefak tree engine ada dan tidak lebih tua dari artefak pkl sumbernya"""
+    if not engine_path or not os.path.exists(engine_path):
+        return False
+    engine_mtime = os.stat(engine_path).st_mtime
+    return all(not os.path.exists(p) or os.stat(p).st_mtime <= engine_mtime for p in source_paths)
+
+
+def active_artifacts(pointer_path=CURRENT_POINTER):
+    """Path (model, preprocessor, engine, manifest) aktif.
+
+    Jika `models/CURRENT` ada, semua path diambil dari direktori versi yang
+    ditunjuknya. Pointer dibaca sekali per pemanggilan, sehingga keempat path
+    selalu berasal dari versi yang sama walaupun pointer sedang diganti.
+    """
+    try:
+        with open(pointer_path) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        version = ''
+    if not version:
+        return MODEL_PATH, PREPROCESSOR_PATH, ENGINE_PATH, MANIFEST_PATH
+    directory = os.path.join(os.path.dirname(pointer_path), version)
+    return tuple(os.path.join(directory, os.path.basename(path))
+                 for path in (MODEL_PATH, PREPROCESSOR_PATH, ENGINE_PATH, MANIFEST_PATH))
+
+
+def _resolve(model_path, preprocessor_path, engine_path):
+    """Path eksplisit dipakai apa adanya (tanpa manifest); tanpa path, set artefak aktif"""
+    if model_path is None and preprocessor_path is None:
+        return active_artifacts()
+    return model_path or MODEL_PATH, preprocessor_path or PREPROCESSOR_PATH, engine_path, None
+
+
+def _load_artifacts(registry, model_path, preprocessor_path, engine_path):
+    """(preprocessor, model, kunci versi); artefak tree engine dipakai jika ada dan tidak usang"""
+    if engine_is_current(engine_path, model_path, preprocessor_path):
+        engine = registry.get(engine_path, loader=TreeEngine)
+        return engine.fused, engine, (registry.fingerprint(engine_path),)
+    preprocessor = registry.get(preprocessor_path)
+    model = registry.get(model_path)
+    return preprocessor, model, (registry.fingerprint(preprocessor_path), registry.fingerprint(model_path))
+
+
+def load_predictor(registry=None, model_path=None, preprocessor_path=None, engine_path=None):
+    registry = registry or default_registry()
+    model_path, preprocessor_path, engine_path, manifest_path = _resolve(model_path, preprocessor_path, engine_path)
+    preprocessor, model, _ = _load_artifacts(registry, model_path, preprocessor_path, engine_path)
+    return Predictor(preprocessor, model, manifest_path=manifest_path)
+
+
+_predictor_cache = {}
+_predictor_lock = threading.Lock()
+
+
+def cached_predictor(registry=None, model_path=None, preprocessor_path=None, engine_path=None):
+    """Predictor bersama per proses; dikompilasi ulang hanya jika artefak di registry (atau versi aktif) berubah"""
+    registry = registry or default_registry()
+    model_path, preprocessor_path, engine_path, manifest_path = _resolve(model_path, preprocessor_path, engine_path)
+    preprocessor, model, key = _load_artifacts(registry, model_path, preprocessor_path, engine_path)
+    with _predictor_lock:
+        predictor = _predictor_cache.get(key)
+        if predictor is None:
+            predictor = Predictor(preprocessor, model, manifest_path=manifest_path)
+            _predictor_cache.clear()
+            _predictor_cache[key] = predictor
+        return predictor
+
+
+def prediction_cache_stats():
+    """Statistik cache prediksi dari Predictor yang sedang aktif (None jika belum ada)"""
+    with _predictor_lock:
+        predictor = next(iter(_predictor_cache.values()), None)
+    return predictor.cache_stats() if predictor is not None else None
@@ -0,0 +1,212 @@
+"""Profiling on-demand untuk rerun Streamlit tertentu.
+
+Admin mempersenjatai profiler untuk N rerun berikutnya di sesinya, untuk
+seluruh script atau satu halaman saja. Selama tidak dipersenjatai,
+`profiler_begin` hanya membaca satu key di session_state dan tidak ada
+profiler, thread sampling, maupun tracemalloc yang aktif.
+
+Mode:
+- 'sampling'      : thread latar belakang mengambil stack thread script setiap
+                    `interval` detik dan menulis collapsed stacks (`.collapsed`)
+                    yang siap untuk flamegraph.pl / speedscope.
+- 'deterministik' : cProfile pada thread script, ditulis sebagai `.pstats`.
+
+Setiap capture juga menulis statistik alokasi tracemalloc (`.alloc.txt`).
+Lokasi output: env DIABETES_PROFILE_DIR (default `profiles/`).
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.environ.get('DIABETES_PROFILE_DIR', 'profiles')
+SCRIPT_TARGET = 'script'
+MODES = ('sampling', 'deterministik')
+STATE_KEY = 'profiler'
+MAX_RESULTS = 10
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Sampling profiler untuk satu thread lewat `sys._current_frames()`"""
+
+    def __init__(self, thread_id, interval=0.005, max_seconds=120.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopping.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileCapture:
+    """Satu capture profiler untuk thread pemanggil, dimulai saat dibuat"""
+
+    def __init__(self, label, mode='sampling', output_dir=PROFILE_DIR, interval=0.005):
+        import tracemalloc
+
+        self.label = label
+        self.mode = mode
+        self.output_dir = output_dir
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self.finished = False
+        if mode == 'deterministik':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident(), interval=interval).start()
+
+    def finish(self):
+        """Hentikan capture dan tulis file output; kembalikan ringkasan capture"""
+        import tracemalloc
+
+        if self.finished:
+            return None
+        self.finished = True
+        seconds = time.perf_counter() - self._start
+        if self.mode == 'deterministik':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        # Alokasi milik profiler sendiri (stack sampler, snapshot) tidak ikut dilaporkan
+        own = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot = tracemalloc.take_snapshot().filter_traces(own)
+        self._baseline = self._baseline.filter_traces(own)
+        _, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in self.label).strip('_') or 'rerun'
+        base = os.path.join(self.output_dir, f"{stamp}-{safe_label}-{threading.get_ident() % 100000}")
+        files = []
+        if self.mode == 'deterministik':
+            self._profiler.dump_stats(f"{base}.pstats")
+            files.append(f"{base}.pstats")
+        else:
+            self._profiler.write_collapsed(f"{base}.collapsed")
+            files.append(f"{base}.collapsed")
+        self._write_allocations(f"{base}.alloc.txt", snapshot, peak, seconds)
+        files.append(f"{base}.alloc.txt")
+        return {
+            'target': self.label,
+            'mode': self.mode,
+            'ms': round(seconds * 1000, 1),
+            'samples': getattr(self._profiler, 'samples', None),
+            'peak_kb': round(peak / 1024, 1),
+            'files': files,
+        }
+
+    def _write_allocations(self, path, snapshot, peak, seconds, limit=30):
+        with open(path, 'w') as f:
+            f.write(f"# {self.label} ({self.mode}), durasi {seconds * 1000:.1f} ms, puncak memori {peak / 1024:.1f} KiB\n")
+            f.write("# tracemalloc bersifat per proses: alokasi sesi lain pada saat yang sama ikut tercatat\n\n")
+            f.write("## Alokasi bersih selama capture (per baris)\n")
+            for stat in snapshot.compare_to(self._baseline, 'lineno')[:limit]:
+                f.write(f"{stat}\n")
+            f.write("\n## Memori teralokasi terbesar saat capture selesai (per baris)\n")
+            for stat in snapshot.statistics('lineno')[:limit]:
+                f.write(f"{stat}\n")
+
+
+def arm(state, runs, target=SCRIPT_TARGET, mode='sampling'):
+    """Profil `runs` rerun berikutnya pada sesi ini untuk `target` (SCRIPT_TARGET atau nama halaman)"""
+    if mode not in MODES:
+        raise ValueError(f"Mode profiler tidak dikenal: {mode}")
+    profiler = state.setdefault(STATE_KEY, {'results': []})
+    profiler.update({'remaining': max(int(runs), 0), 'target': target, 'mode': mode})
+
+
+def disarm(state):
+    if STATE_KEY in state:
+        state[STATE_KEY]['remaining'] = 0
+
+
+def profiler_begin(state, target):
+    """Mulai capture jika sesi dipersenjatai untuk `target`; None (tanpa overhead) jika tidak"""
+    profiler = state.get(STATE_KEY)
+    if not profiler:
+        return None
+    active = profiler.setdefault('active', {})
+    # Capture target yang sama dari rerun sebelumnya yang terputus oleh st.stop() / st.rerun()
+    dangling = active.pop(target, None)
+    if dangling is not None:
+        try:
+            _store(profiler, dangling.finish())
+        except Exception:
+            pass
+    if not profiler.get('remaining') or profiler.get('target') != target:
+        return None
+    profiler['remaining'] -= 1
+    capture = ProfileCapture(target, mode=profiler['mode'])
+    active[target] = capture
+    return capture
+
+
+def profiler_finish(state, capture):
+    if capture is None:
+        return None
+    profiler = state.get(STATE_KEY, {})
+    active = profiler.get('active', {})
+    if active.get(capture.label) is capture:
+        del active[capture.label]
+    result = capture.finish()
+    _store(profiler, result)
+    return result
+
+
+def _store(profiler, result):
+    if result is not None:
+        results = profiler.setdefault('results', [])
+        results.append(result)
+        del results[:-MAX_RESULTS]
+
+
+def profiler_status(state):
+    profiler = state.get(STATE_KEY) or {}
+    return {
+        'remaining': profiler.get('remaining', 0),
+        'target': profiler.get('target'),
+        'mode': profiler.get('mode'),
+        'results': list(profiler.get('results', [])),
+    }
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from cohort_stats import new_rollup, update_rollup
+from metrics import span
+from sheets_client import numericise
+from user_directory import column_letter
+from user_stats import new_stats, summarize, update_stats
+
+
+class RiwayatCache:
+    """Salinan lokal sheet "Riwayat" dalam bentuk kolom, disinkronkan secara delta.
+
+    Cache menyimpan nomor baris terakhir yang sudah disinkronkan sehingga
+    setiap sinkronisasi hanya mengambil baris yang baru ditambahkan. Indeks
+    per username (huruf kecil) berisi posisi baris milik user tersebut,
+    sehingga membuka halaman riwayat sebanding dengan jumlah baris user,
+    bukan total seluruh prediksi. Statistik per user (user_stats) ikut
+    diperbarui untuk setiap baris baru yang disinkronkan.
+    """
+
+    def __init__(self, get_worksheet, ttl=10, title="Riwayat"):
+        self._get_worksheet = get_worksheet
+        self.title = title
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        """Kosongkan cache; sinkronisasi berikutnya membaca ulang seluruh sheet"""
+        self.header = None
+        self._columns = {}
+        self._user_index = {}
+        self._stats = {}
+        self._cohort = new_rollup()
+        self._row_count = 0
+        self._synced_at = 0.0
+        self.fetched_rows = 0
+
+    def _append_rows(self, rows):
+        width = len(self.header)
+        username_pos = self.header.index('username') if 'username' in self.header else None
+        for row in rows:
+            if not any(cell != '' for cell in row):
+                self._row_count += 1
+                continue
+            padded = list(row) + [''] * (width - len(row))
+            position = len(self._columns[self.header[0]]) if width else 0
+            values = [numericise(value) for value in padded]
+            for name, value in zip(self.header, values):
+                self._columns[name].append(value)
+            if username_pos is not None:
+                key = str(padded[username_pos]).lower()
+                self._user_index.setdefault(key, []).append(position)
+                record = dict(zip(self.header, values))
+                update_stats(self._stats.setdefault(key, new_stats()), record)
+                update_rollup(self._cohort, record)
+            self._row_count += 1
+        self.fetched_rows += len(rows)
+
+    def _apply_full(self, values):
+        self.header = values[0] if values else []
+        self._columns = {name: [] for name in self.header}
+        self._append_rows(values[1:])
+
+    def _plan(self, force):
+        """None jika cache masih segar, '' untuk pemuatan penuh, atau range A1 baris baru"""
+        if not force and time.monotonic() - self._synced_at < self.ttl:
+            return None
+        if self.header is None:
+            return ''
+        if not self.header:
+            # Sheet tanpa header: tidak ada kolom yang bisa dibaca
+            return None
+        # Baris 1 adalah header, data ke-n berada di baris n + 1
+        return f"A{self._row_count + 2}:{column_letter(len(self.header))}"
+
+    def sync_range(self, force=False):
+        """Range A1 (dengan nama sheet) yang perlu dibaca untuk sinkronisasi, atau None (lihat UserDirectory)"""
+        plan = self._plan(force)
+        if plan is None:
+            return None
+        return f"'{self.title}'!{plan}" if plan else f"'{self.title}'"
+
+    def apply_range(self, range_name, values, generation=None):
+        """Terapkan hasil pembacaan `sync_range`; diabaikan (False) jika cache berubah sejak range dibuat"""
+        with self._lock:
+            if range_name != self.sync_range(force=True):
+                return False
+            if '!' in range_name:
+                self._append_rows(values)
+            else:
+                self._apply_full(values)
+            # invalidate() selama pembacaan berjalan: baris tetap dipakai, tetapi tetap dianggap basi
+            if generation is None or generation == self.generation:
+                self._synced_at = time.monotonic()
+            return True
+
+    def sync(self, force=False):
+        with self._lock:
+            plan = self._plan(force)
+            if plan is None:
+                return
+            with span('load_riwayat'):
+                worksheet = self._get_worksheet()
+                if plan:
+                    self._append_rows(worksheet.get_values(plan))
+                else:
+                    self._apply_full(worksheet.get_all_values())
+            self._synced_at = time.monotonic()
+
+    def invalidate(self, full=False):
+        """Paksa sinkronisasi berikutnya; `full` membaca ulang seluruh sheet (setelah baris lama diubah)"""
+        with self._lock:
+            if full:
+                self.reset()
+            self._synced_at = 0.0
+            self.generation += 1
+
+    @property
+    def total_rows(self):
+        return len(self._columns[self.header[0]]) if self.header else 0
+
+    def user_positions(self, username):
+        self.sync()
+        return list(self._user_index.get(str(username).lower(), []))
+
+    def user_stats(self, username):
+        self.sync()
+        return summarize(self._stats.get(str(username).lower()))
+
+    def cohort_rollup(self):
+        self.sync()
+        with self._lock:
+            return dict(self._cohort)
+
+    def column_values(self, name, positions):
+        values = self._columns.get(name, [])
+        return [values[i] for i in positions]
+
+    def frame(self, positions):
+        """DataFrame dari baris pada `positions` saja (urutan sesuai `positions`)"""
+        import pandas as pd
+
+        data = {name: [values[i] for i in positions] for name, values in self._columns.items()}
+        return pd.DataFrame(data, columns=self.header or None)
+
+    def user_frame(self, username):
+        """DataFrame riwayat milik satu user, dibangun hanya dari baris user tersebut"""
+        return self.frame(self.user_positions(username))
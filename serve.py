@@ -0,0 +1,211 @@
+"""Service HTTP JSON untuk prediksi tanpa Streamlit.
+
+Contoh:
+    python serve.py --port 8502 --max-batch 64 --max-wait-ms 5
+
+    curl -X POST localhost:8502/predict -d '{"Gender": "M", "AGE": 50, "Urea": 5.0, "Cr": 80,
+        "HbA1c": 6.0, "Chol": 5.0, "TG": 1.5, "HDL": 1.0, "LDL": 3.0, "VLDL": 1.0, "BMI": 25.0}'
+
+Body boleh berupa satu objek pasien, list objek, atau {"records": [...]}.
+Body lebih besar dari --max-body-bytes atau lebih dari --max-records pasien
+ditolak dengan 413. Permintaan yang datang bersamaan digabung menjadi satu
+micro-batch. Model diambil dari ModelRegistry di setiap batch, sehingga
+artefak baru (mis. `python train.py --promote`) dipakai tanpa restart.
+GET /metrics mengembalikan histogram waktu per tahap dalam format Prometheus.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from batch_predict import score_chunk
+from features import class_description_mapping
+from metrics import registry as metrics_registry
+from model_registry import default_registry
+from predictor import cached_predictor
+
+MAX_BODY_BYTES = int(os.environ.get('DIABETES_SERVE_MAX_BODY_BYTES', str(1 << 20)))
+MAX_RECORDS = int(os.environ.get('DIABETES_SERVE_MAX_RECORDS', '1000'))
+
+
+class MicroBatcher:
+    """Gabungkan permintaan yang datang bersamaan menjadi satu panggilan predict_proba.
+
+    Batch dikirim ketika jumlah baris mencapai `max_batch` atau setelah
+    `max_wait_ms` sejak permintaan pertama dalam batch diterima. `predictor`
+    boleh berupa Predictor atau fungsi tanpa argumen yang mengembalikan
+    Predictor aktif (dipanggil sekali per batch). Hasil setiap permintaan
+    adalah (DataFrame hasil, kelas model yang dipakai).
+    """
+
+    def __init__(self, predictor, max_batch=64, max_wait_ms=5.0):
+        self._get_predictor = predictor if callable(predictor) else (lambda: predictor)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, records):
+        future = Future()
+        self._queue.put((records, future))
+        return future
+
+    def _collect(self):
+        items = [self._queue.get()]
+        size = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            records = [record for batch, _ in items for record in batch]
+            try:
+                predictor = self._get_predictor()
+                result = score_chunk(predictor, pd.DataFrame(records))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(records)
+            offset = 0
+            for batch, future in items:
+                future.set_result((result.iloc[offset:offset + len(batch)], predictor.classes_))
+                offset += len(batch)
+
+
+def format_result(result, classes):
+    output = []
+    for row in result.to_dict('records'):
+        if row['error']:
+            output.append({'error': row['error']})
+            continue
+        output.append({
+            'class': row['prediction'],
+            'description': class_description_mapping.get(row['prediction'], row['prediction']),
+            'proba': {str(cls): float(row[f'proba_{cls}']) for cls in classes},
+        })
+    return output
+
+
+def make_handler(batcher, timeout=30.0, max_body_bytes=MAX_BODY_BYTES, max_records=MAX_RECORDS):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'batches': batcher.batches, 'rows': batcher.rows})
+            elif self.path == '/metrics':
+                body = metrics_registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                length = -1
+            if length < 0 or length > max_body_bytes:
+                # Body tidak dibaca sama sekali; koneksi ditutup agar sisa body tidak dianggap request berikutnya
+                self.close_connection = True
+                status, message = (413, f'Body melebihi {max_body_bytes} byte') if length > 0 else (
+                    400, 'Content-Length tidak valid')
+                self._send_json(status, {'error': message})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b'null')
+            except (ValueError, json.JSONDecodeError):
+                self._send_json(400, {'error': 'Body harus berupa JSON'})
+                return
+            single = isinstance(payload, dict) and 'records' not in payload
+            records = [payload] if single else (payload.get('records') if isinstance(payload, dict) else payload)
+            if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                self._send_json(400, {'error': 'Kirim satu objek pasien, list objek, atau {"records": [...]}'})
+                return
+            if len(records) > max_records:
+                self._send_json(413, {'error': f'Maksimal {max_records} pasien per permintaan'})
+                return
+            try:
+                result, classes = batcher.submit(records).result(timeout=timeout)
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+            predictions = format_result(result, classes)
+            status = 400 if all('error' in p for p in predictions) else 200
+            self._send_json(status, predictions[0] if single else {'predictions': predictions})
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # Antrean listen bawaan socketserver (5) terlalu kecil untuk uji beban
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP JSON untuk prediksi diabetes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--max-batch', type=int, default=64, help='Jumlah baris maksimum per micro-batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Waktu tunggu maksimum untuk mengisi batch')
+    parser.add_argument('--max-body-bytes', type=int, default=MAX_BODY_BYTES, help='Ukuran body maksimum (413 jika lebih)')
+    parser.add_argument('--max-records', type=int, default=MAX_RECORDS, help='Jumlah pasien maksimum per permintaan')
+    args = parser.parse_args(argv)
+
+    registry = default_registry()
+    # Dimuat sekali di awal agar artefak rusak langsung ketahuan; batch berikutnya mengikuti registry
+    cached_predictor(registry)
+    batcher = MicroBatcher(lambda: cached_predictor(registry), max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    server = PredictionServer((args.host, args.port),
+                              make_handler(batcher, max_body_bytes=args.max_body_bytes, max_records=args.max_records))
+    print(f"Service prediksi berjalan di http://{args.host}:{args.port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import span
+from sheets_quota import LimitedWorksheet, QuotaLimiter
+
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1em8HcKtX5pCy53S2_4wc9JBPVkXC3NiVznwvTsDsMpU/edit"
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+USERS_HEADER = ['username', 'password', 'Gender', 'Date']
+RIWAYAT_HEADER = ['username', 'AGE', 'Gender', 'Tanggal Prediksi', 'Urea', 'Cr', 'HbA1c',
+                  'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI', 'Hasil']
+
+# Access token service account Google berlaku 1 jam
+TOKEN_LIFETIME = 3600
+REFRESH_MARGIN = 300
+FAN_OUT_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def fan_out(*calls):
+    """Jalankan beberapa fungsi tanpa argumen yang saling independen secara bersamaan.
+
+    gspread bersifat sinkron (satu request HTTPS per panggilan), jadi
+    pembacaan independen dijalankan di thread pool bersama; hasil dikembalikan
+    sesuai urutan `calls` dan error pertama diteruskan ke pemanggil.
+    """
+    global _executor
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix='sheets-fan-out')
+    futures = [_executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
+
+
+def numericise(value):
+    """Konversi string angka menjadi int/float seperti gspread.utils.numericise"""
+    if isinstance(value, str):
+        if value == '':
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+def google_authorizer(credentials_dict):
+    """Buat fungsi otorisasi gspread dari kredensial service account"""
+    def authorize():
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, SCOPE)
+        return gspread.authorize(credentials)
+    return authorize
+
+
+def memory_authorizer(latency=0.0, spreadsheet=None, error_rate=0.0, quota_per_minute=None):
+    """Fungsi otorisasi untuk spreadsheet di memori (tanpa jaringan)"""
+    from fake_sheets import FakeClient, FakeSpreadsheet
+    if spreadsheet is None:
+        spreadsheet = FakeSpreadsheet(latency=latency, error_rate=error_rate, quota_per_minute=quota_per_minute)
+        spreadsheet.add_worksheet("Users", header=USERS_HEADER)
+        spreadsheet.add_worksheet("Riwayat", header=RIWAYAT_HEADER)
+    client = FakeClient(spreadsheet)
+    return lambda: client
+
+
+class SheetsConnection:
+    """Koneksi Google Sheets yang dipakai bersama oleh semua sesi dalam satu proses.
+
+    Client, spreadsheet, dan handle worksheet disimpan dan dipakai ulang.
+    Koneksi dibuat saat pertama kali dibutuhkan dan diperbarui sebelum
+    access token kedaluwarsa, sehingga rerun Streamlit tidak lagi membayar
+    round trip otorisasi. Semua panggilan API (termasuk open_by_url dan
+    worksheet) melewati satu QuotaLimiter bersama (lihat sheets_quota).
+    """
+
+    def __init__(self, authorize, url=SPREADSHEET_URL, token_lifetime=TOKEN_LIFETIME,
+                 refresh_margin=REFRESH_MARGIN, limiter=None):
+        self._authorize = authorize
+        self.limiter = limiter or QuotaLimiter()
+        self.url = url
+        self.token_lifetime = token_lifetime
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._connected_at = 0.0
+        self.connects = 0
+        self.last_connect_seconds = 0.0
+
+    def _expired(self):
+        age = time.monotonic() - self._connected_at
+        return age >= self.token_lifetime - self.refresh_margin
+
+    def _connect(self):
+        start = time.perf_counter()
+        with span('sheets_auth'):
+            self._client = self._authorize()
+            self._spreadsheet = self.limiter.call('read', self._client.open_by_url, self.url)
+        self._worksheets = {}
+        self._connected_at = time.monotonic()
+        self.connects += 1
+        self.last_connect_seconds = time.perf_counter() - start
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._client is None or self._expired():
+                self._connect()
+            return self._spreadsheet
+
+    def _load_worksheets(self, spreadsheet):
+        # Satu panggilan metadata mengambil semua handle sekaligus, bukan satu panggilan per worksheet
+        worksheets = self.limiter.call('read', spreadsheet.worksheets)
+        self._worksheets = {ws.title: LimitedWorksheet(ws, self.limiter) for ws in worksheets}
+
+    def worksheet(self, title):
+        with self._lock:
+            spreadsheet = self.spreadsheet()
+            if not self._worksheets:
+                self._load_worksheets(spreadsheet)
+            if title not in self._worksheets:
+                worksheet = self.limiter.call('read', spreadsheet.worksheet, title)
+                self._worksheets[title] = LimitedWorksheet(worksheet, self.limiter)
+            return self._worksheets[title]
+
+    def batch_get(self, ranges):
+        """Nilai beberapa range A1 (dengan nama sheet) dalam satu request values_batch_get, sesuai urutan"""
+        ranges = list(ranges)
+        spreadsheet = self.spreadsheet()
+        with span('sheets_batch_get'):
+            response = self.limiter.call('read', spreadsheet.values_batch_get, ranges,
+                                         key=('values_batch_get', tuple(ranges)))
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    def invalidate(self):
+        """Paksa koneksi dibuat ulang pada pemanggilan berikutnya"""
+        with self._lock:
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def stats(self):
+        return {
+            'connects': self.connects,
+            'last_connect_ms': round(self.last_connect_seconds * 1000, 2),
+            'token_age_s': round(time.monotonic() - self._connected_at, 1) if self._client else None,
+            'kuota': self.limiter.stats(),
+        }
+
+
+def connection_from_config(secrets=None):
+    """Pilih backend Sheets berdasarkan env DIABETES_SHEETS_BACKEND ('google' atau 'memory')"""
+    backend = os.environ.get('DIABETES_SHEETS_BACKEND', 'google')
+    if backend == 'memory':
+        latency = float(os.environ.get('DIABETES_SHEETS_LATENCY', '0'))
+        error_rate = float(os.environ.get('DIABETES_SHEETS_ERROR_RATE', '0'))
+        # Kuota palsu (429 di atas N request/menit) hanya jika diminta; tanpa itu limiter tidak membatasi laju
+        quota = os.environ.get('DIABETES_SHEETS_QUOTA')
+        limiter = QuotaLimiter() if quota else QuotaLimiter(read_per_minute=None, write_per_minute=None)
+        authorize = memory_authorizer(latency=latency, error_rate=error_rate,
+                                      quota_per_minute=int(quota) if quota else None)
+        return SheetsConnection(authorize, limiter=limiter)
+    return SheetsConnection(google_authorizer(dict(secrets["gcp_service_account"])))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bandingkan latensi rerun: koneksi per rerun vs koneksi bersama")
+    parser.add_argument('--latency', type=float, default=0.15, help='Jeda per panggilan Sheets (detik)')
+    parser.add_argument('--reruns', type=int, default=10)
+    args = parser.parse_args()
+
+    authorize = memory_authorizer(latency=args.latency)
+
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        conn = SheetsConnection(authorize)
+        conn.worksheet("Users")
+        conn.worksheet("Riwayat")
+    per_rerun = (time.perf_counter() - start) / args.reruns
+
+    pooled_conn = SheetsConnection(authorize)
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        pooled_conn.worksheet("Users")
+        pooled_conn.worksheet("Riwayat")
+    pooled = (time.perf_counter() - start) / args.reruns
+
+    print(f"Koneksi per rerun : {per_rerun * 1000:.1f} ms/rerun")
+    print(f"Koneksi bersama   : {pooled * 1000:.1f} ms/rerun")
@@ -0,0 +1,273 @@
+"""Pembatas kuota bersama untuk semua panggilan Google Sheets API.
+
+Google Sheets membatasi request baca dan tulis per menit (per project dan per
+user; service account aplikasi ini dihitung sebagai satu user). Semua sesi
+dalam satu proses memakai satu QuotaLimiter milik SheetsConnection:
+
+- token bucket terpisah untuk baca dan tulis, diisi ulang merata sepanjang menit;
+- retry dengan exponential backoff + full jitter: baca untuk 429, 5xx, dan error
+  jaringan; tulis (append/update, tidak idempoten) hanya untuk 429 karena request
+  pasti ditolak, sedangkan 5xx/timeout bisa saja sudah diterapkan sehingga
+  retry menggandakan baris. Kegagalan tulis lain diserahkan ke pemanggil
+  (HistoryWriter punya jurnal dan retry sendiri);
+- total jeda retry per panggilan dibatasi (DIABETES_SHEETS_MAX_RETRY_SECONDS,
+  default 10 detik) agar thread script Streamlit tidak tertahan lama;
+- baca identik yang sedang berjalan digabung: pemanggil berikutnya menunggu dan
+  menerima hasil yang sama (hasil dibagi, jangan diubah);
+- counter panggilan, tertahan (menunggu token), diulang, gagal, dan digabung.
+  Lama menunggu token dan jeda backoff juga masuk histogram metrics
+  (`sheets_quota_wait`, `sheets_retry_backoff`).
+
+Kuota bisa diatur lewat env DIABETES_SHEETS_READ_PER_MINUTE dan
+DIABETES_SHEETS_WRITE_PER_MINUTE (default 60, kuota per user Sheets API).
+
+Simulasi offline terhadap FakeSpreadsheet yang menolak request di atas kuota:
+    python sheets_quota.py --sessions 8 --seconds 10 --quota 120 --error-rate 0.02
+"""
+import os
+import random
+import threading
+import time
+
+from metrics import registry
+
+READ_PER_MINUTE = int(os.environ.get('DIABETES_SHEETS_READ_PER_MINUTE', '60'))
+WRITE_PER_MINUTE = int(os.environ.get('DIABETES_SHEETS_WRITE_PER_MINUTE', '60'))
+MAX_RETRY_SECONDS = float(os.environ.get('DIABETES_SHEETS_MAX_RETRY_SECONDS', '10'))
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+READ_METHODS = frozenset({'get_all_values', 'get_values', 'get', 'row_values', 'col_values',
+                          'get_all_records', 'batch_get'})
+WRITE_METHODS = frozenset({'append_row', 'append_rows', 'update', 'batch_update'})
+COUNTERS = ('panggilan', 'tertahan', 'diulang', 'gagal', 'digabung')
+
+
+def status_code(exc):
+    """Kode status HTTP dari error gspread (APIError.code / .response.status_code) atau None"""
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int):
+        return code
+    return getattr(getattr(exc, 'response', None), 'status_code', None)
+
+
+_transient = None
+
+
+def _transient_errors():
+    global _transient
+    if _transient is None:
+        errors = [ConnectionError, TimeoutError]
+        try:
+            import requests
+            errors += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+        except ImportError:
+            pass
+        _transient = tuple(errors)
+    return _transient
+
+
+def is_retryable(exc, kind='read'):
+    """Baca boleh diulang untuk RETRY_STATUS dan error jaringan; tulis hanya untuk 429 (pasti belum diterapkan)"""
+    if kind == 'write':
+        return status_code(exc) == 429
+    return status_code(exc) in RETRY_STATUS or isinstance(exc, _transient_errors())
+
+
+class TokenBucket:
+    """Token bucket dengan reservasi: token boleh negatif, pemanggil menunggu sampai gilirannya (FIFO).
+    `per_minute=None` berarti tanpa batas (retry dan penggabungan baca tetap berlaku)."""
+
+    def __init__(self, per_minute, burst=None, clock=time.monotonic):
+        self.per_minute = per_minute
+        if per_minute is None:
+            return
+        self.rate = per_minute / 60.0
+        # Burst default 10 detik kuota: dalam jendela satu menit paling banyak per_minute + burst request
+        self.capacity = float(burst if burst is not None else max(1, per_minute // 6))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Ambil satu token; kembalikan berapa detik pemanggil harus menunggu sebelum memakainya"""
+        if self.per_minute is None:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class _InFlight:
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+
+    def finish(self, result=None, error=None):
+        self._result, self._error = result, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class QuotaLimiter:
+    def __init__(self, read_per_minute=READ_PER_MINUTE, write_per_minute=WRITE_PER_MINUTE, max_retries=5,
+                 base_backoff=1.0, max_backoff=32.0, max_retry_seconds=MAX_RETRY_SECONDS, sleep=time.sleep,
+                 rng=None, clock=time.monotonic):
+        self.buckets = {'read': TokenBucket(read_per_minute), 'write': TokenBucket(write_per_minute)}
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_retry_seconds = max_retry_seconds
+        self._sleep = sleep
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def call(self, kind, fn, *args, key=None, **kwargs):
+        """Jalankan `fn` dengan token kuota `kind` ('read'/'write') dan retry; baca dengan `key` yang sama digabung"""
+        if key is None or kind != 'read':
+            return self._execute(kind, fn, args, kwargs)
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = _InFlight()
+            else:
+                self.counters['digabung'] += 1
+        if not owner:
+            return pending.wait()
+        try:
+            result = self._execute(kind, fn, args, kwargs)
+        except Exception as e:
+            pending.finish(error=e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        pending.finish(result=result)
+        return result
+
+    def _execute(self, kind, fn, args, kwargs):
+        attempt = 0
+        deadline = None
+        while True:
+            wait = self.buckets[kind].reserve()
+            self._count('panggilan')
+            if wait > 0:
+                self._count('tertahan')
+                registry.observe('sheets_quota_wait', wait)
+                self._sleep(wait)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if deadline is None:
+                    deadline = self._clock() + self.max_retry_seconds
+                remaining = deadline - self._clock()
+                if not is_retryable(e, kind) or attempt >= self.max_retries or remaining <= 0:
+                    self._count('gagal')
+                    raise
+                attempt += 1
+                self._count('diulang')
+                # Full jitter: jeda acak 0..batas agar sesi yang gagal bersamaan tidak mencoba ulang serempak
+                delay = min(remaining, self._rng.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))))
+                registry.observe('sheets_retry_backoff', delay)
+                self._sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+class LimitedWorksheet:
+    """Pembungkus worksheet gspread: panggilan API baca/tulis lewat QuotaLimiter, atribut lain diteruskan"""
+
+    def __init__(self, worksheet, limiter):
+        self._worksheet = worksheet
+        self._limiter = limiter
+        self.title = worksheet.title
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        if name in READ_METHODS:
+            kind = 'read'
+        elif name in WRITE_METHODS:
+            kind = 'write'
+        else:
+            return attr
+
+        def call(*args, **kwargs):
+            key = None
+            if kind == 'read':
+                key = (self.title, name, args, tuple(sorted(kwargs.items())))
+                try:
+                    hash(key)
+                except TypeError:
+                    key = None
+            return self._limiter.call(kind, attr, *args, key=key, **kwargs)
+        return call
+
+
+def simulate(sessions=8, seconds=10.0, quota=120, error_rate=0.02, limited=True, seed=0):
+    """Sesi bersamaan membaca/menulis FakeSpreadsheet berkuota; kembalikan ringkasan hasil"""
+    from fake_sheets import FakeSpreadsheet
+    from sheets_client import RIWAYAT_HEADER
+
+    spreadsheet = FakeSpreadsheet(error_rate=error_rate, quota_per_minute=quota, seed=seed)
+    raw = spreadsheet.add_worksheet("Riwayat", header=RIWAYAT_HEADER)
+    # Kuota limiter sedikit di bawah kuota fake, sama seperti konfigurasi produksi
+    limiter = QuotaLimiter(read_per_minute=quota * 0.9 / 2, write_per_minute=quota * 0.9 / 2, base_backoff=0.05)
+    worksheet = LimitedWorksheet(raw, limiter) if limited else raw
+    results = {'ok': 0, 'error': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def session(index):
+        rng = random.Random(seed + index)
+        while time.monotonic() < deadline:
+            try:
+                if rng.random() < 0.3:
+                    worksheet.append_rows([[f"user{index}"] + [''] * (len(RIWAYAT_HEADER) - 1)])
+                else:
+                    worksheet.get_values("A1:N")
+                outcome = 'ok'
+            except Exception:
+                outcome = 'error'
+            with lock:
+                results[outcome] += 1
+            time.sleep(rng.uniform(0.01, 0.1))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {**results, 'ditolak_fake': spreadsheet.faults.rejected, **(limiter.stats() if limited else {})}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulasi sesi bersamaan terhadap Sheets palsu berkuota")
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--quota', type=int, default=120, help='Kuota request per menit milik fake')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Peluang 503 acak per panggilan')
+    args = parser.parse_args()
+
+    for limited in (False, True):
+        summary = simulate(args.sessions, args.seconds, args.quota, args.error_rate, limited=limited)
+        print(f"{'Dengan limiter' if limited else 'Tanpa limiter '}: {summary}")
@@ -0,0 +1,195 @@
+"""Pengukuran waktu startup, prewarm, dan pra-komputasi artefak.
+
+Contoh:
+    python startup.py --report                # waktu import modul berat (proses baru per modul)
+    python startup.py --precompute            # ekspor model_engine.dtree, muat & cek artefak, tulis feature_manifest.json
+    python startup.py --rebuild-preprocessor  # fit ulang preprocessor.pkl dari Dataset secara offline
+    python startup.py --migrate-dates         # ubah Tanggal Prediksi riwayat lama ke format ISO
+"""
+import contextlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+HEAVY_MODULES = ['numpy', 'pandas', 'joblib', 'sklearn.tree', 'sklearn.compose', 'gspread',
+                 'oauth2client.service_account', 'pyarrow']
+DATASET_PATH = 'Dataset/Dataset of Diabetes .csv'
+SECRETS_PATH = os.path.join('.streamlit', 'secrets.toml')
+
+
+class StartupReport:
+    """Catatan durasi tiap tahap startup; hanya kemunculan pertama per tahap yang disimpan"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, note=''):
+        with self._lock:
+            self.stages.setdefault(stage, {'tahap': stage, 'ms': round(seconds * 1000, 2), 'catatan': note})
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        note = ''
+        try:
+            yield
+        except Exception as e:
+            note = f"gagal: {e}"
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, note)
+
+    def rows(self):
+        with self._lock:
+            return list(self.stages.values())
+
+
+startup_report = StartupReport()
+timed = startup_report.timed
+
+
+def prewarm(storage=None, registry=None):
+    """Impor modul berat, muat artefak model, dan isi cache penyimpanan.
+
+    Dijalankan di thread latar belakang saat proses server pertama kali
+    mengeksekusi app.py sehingga sesi berikutnya tidak membayar cold start.
+    """
+    # Cache penyimpanan (menunggu jaringan) diisi bersamaan dengan impor dan pemuatan model (CPU)
+    storage_thread = None
+    if storage is not None:
+        storage_thread = threading.Thread(target=_warm_storage, args=(storage,), name='prewarm-storage', daemon=True)
+        storage_thread.start()
+    with timed('prewarm: import numpy/pandas'):
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+    from predictor import active_artifacts, engine_is_current
+    model_path, preprocessor_path, engine_path, _ = active_artifacts()
+    if not engine_is_current(engine_path, model_path, preprocessor_path):
+        # Tanpa artefak tree engine, model dimuat lewat unpickle yang membutuhkan sklearn
+        with timed('prewarm: import sklearn'):
+            import sklearn.compose  # noqa: F401
+            import sklearn.tree  # noqa: F401
+    if registry is not None:
+        from fast_preprocess import FeatureLayoutError
+        from predictor import cached_predictor
+        try:
+            with timed('prewarm: muat & kompilasi model'):
+                cached_predictor(registry)
+        except FeatureLayoutError:
+            pass
+    if storage_thread is not None:
+        storage_thread.join()
+
+
+def _warm_storage(storage):
+    try:
+        with timed(f'prewarm: cache penyimpanan ({storage.name})'):
+            storage.warm()
+    except Exception:
+        pass
+
+
+def start_prewarm(storage=None, registry=None):
+    thread = threading.Thread(target=_safe_prewarm, args=(storage, registry), name='prewarm', daemon=True)
+    thread.start()
+    return thread
+
+
+def _safe_prewarm(storage, registry):
+    try:
+        prewarm(storage, registry)
+    except Exception:
+        # Kegagalan prewarm tidak boleh menjatuhkan server; tercatat di startup_report
+        pass
+
+
+def import_times(modules=HEAVY_MODULES):
+    """Ukur waktu import setiap modul di proses Python baru (cold import)"""
+    results = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        results[module] = float(proc.stdout.strip()) if proc.returncode == 0 else None
+    return results
+
+
+def rebuild_preprocessor(dataset_path=DATASET_PATH, output_path='preprocessor.pkl'):
+    """Fit ulang preprocessor dari dataset secara offline (pengganti refit saat runtime)"""
+    import joblib
+    import pandas as pd
+
+    from features import CATEGORICAL_FEATURES, NUMERIC_FEATURES, make_preprocessor
+
+    df_train = pd.read_csv(dataset_path)
+    preprocessor = make_preprocessor()
+    preprocessor.fit(df_train[NUMERIC_FEATURES + CATEGORICAL_FEATURES])
+    joblib.dump(preprocessor, output_path)
+    return preprocessor
+
+
+def load_secrets(path=SECRETS_PATH):
+    """Isi secrets.toml untuk perintah di luar Streamlit (pengganti st.secrets); {} jika tidak ada"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import toml
+        return toml.load(path)
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Laporan startup dan pra-komputasi artefak")
+    parser.add_argument('--report', action='store_true', help='Tampilkan waktu import modul berat')
+    parser.add_argument('--precompute', action='store_true', help='Muat dan cek artefak, tulis manifest fitur')
+    parser.add_argument('--rebuild-preprocessor', action='store_true', help=f'Fit ulang preprocessor dari {DATASET_PATH}')
+    parser.add_argument('--migrate-dates', action='store_true',
+                        help='Ubah Tanggal Prediksi riwayat lama ke format ISO (sekali jalan)')
+    args = parser.parse_args(argv)
+
+    if args.report:
+        for module, seconds in import_times().items():
+            print(f"{module:32s} {'tidak terpasang' if seconds is None else f'{seconds * 1000:8.1f} ms'}")
+    if args.rebuild_preprocessor:
+        with timed('rebuild preprocessor'):
+            rebuild_preprocessor()
+    if args.precompute:
+        from fast_preprocess import MANIFEST_PATH, write_manifest
+        from model_registry import default_registry
+        from predictor import CURRENT_POINTER, MODEL_PATH, PREPROCESSOR_PATH, cached_predictor, engine_is_current
+        from tree_engine import ENGINE_PATH
+        from tree_engine import main as export_engine
+
+        # Versi hasil train.py sudah lengkap (engine dan manifest ditulis saat pelatihan)
+        if not os.path.exists(CURRENT_POINTER) and not engine_is_current(ENGINE_PATH, MODEL_PATH, PREPROCESSOR_PATH):
+            with timed('ekspor tree engine'):
+                export_engine(['--export'])
+        prewarm(registry=default_registry())
+        predictor = cached_predictor(default_registry())
+        if predictor.fused is not None and not os.path.exists(CURRENT_POINTER) and not os.path.exists(MANIFEST_PATH):
+            write_manifest(predictor.fused, predictor.model)
+            print(f"Manifest fitur ditulis ke {MANIFEST_PATH}")
+    if args.migrate_dates:
+        from storage import storage_from_config
+
+        storage = storage_from_config(load_secrets())
+        try:
+            with timed(f'migrasi tanggal riwayat ({storage.name})'):
+                changed = storage.migrate_tanggal()
+        finally:
+            storage.close()
+        print(f"{changed} baris riwayat dimigrasikan ke format ISO")
+    for row in startup_report.rows():
+        print(f"{row['tahap']:40s} {row['ms']:10.1f} ms {row['catatan']}")
+
+
+if __name__ == '__main__':
+    main()
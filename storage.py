@@ -0,0 +1,726 @@
+"""Lapisan penyimpanan data user dan riwayat prediksi.
+
+Backend dipilih lewat env DIABETES_STORAGE atau `st.secrets["storage"]["backend"]`:
+- 'sheets'  : Google Sheets (default), lewat UserDirectory, RiwayatCache, dan HistoryWriter
+- 'sqlite'  : database SQLite lokal dengan indeks per username
+- 'parquet' : dataset Parquet yang dipartisi per bucket username
+"""
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from functools import partial
+
+from cohort_stats import new_rollup, read_snapshot, rollup_from_rows, update_rollup, write_snapshot
+from history_writer import JOURNAL_PATH, HistoryWriter
+from riwayat_cache import RiwayatCache
+from sheets_client import RIWAYAT_HEADER, USERS_HEADER, connection_from_config, fan_out
+from user_directory import UserDirectory, column_letter
+from user_stats import new_stats, summarize, update_stats
+
+EXPORT_CHUNK_ROWS = 5000
+# Snapshot rollup kohort Parquet ditulis ulang setiap N baris riwayat baru (dan saat close)
+COHORT_SNAPSHOT_EVERY = 100
+NUMERIC_COLUMNS = ['AGE', 'Urea', 'Cr', 'HbA1c', 'Chol', 'TG', 'HDL', 'LDL', 'VLDL', 'BMI']
+
+
+class StorageBackend:
+    """Antarmuka penyimpanan yang dipakai app.py"""
+
+    name = 'base'
+
+    def get_user(self, username):
+        """Data user (dict dengan kolom USERS_HEADER) atau None"""
+        raise NotImplementedError
+
+    def add_user(self, username, password, gender, birth_date_str):
+        """Tambah user baru; False jika username sudah terdaftar"""
+        raise NotImplementedError
+
+    def append_history(self, row):
+        """Simpan satu baris riwayat dengan urutan kolom RIWAYAT_HEADER"""
+        raise NotImplementedError
+
+    def user_history(self, username):
+        """DataFrame riwayat milik satu user (tanpa case sensitive)"""
+        raise NotImplementedError
+
+    def user_history_page(self, username, offset=0, limit=25, start=None, end=None, newest_first=True):
+        """(DataFrame satu halaman riwayat user, jumlah seluruh baris yang cocok dengan filter).
+
+        Baris diurutkan sesuai urutan penyimpanan (terbaru dulu jika `newest_first`)
+        dan disaring ke rentang tanggal `start`..`end` (date, inklusif).
+        Implementasi bawaan memuat seluruh riwayat; backend menimpanya dengan
+        pembacaan terbatas pada satu halaman.
+        """
+        from history import TANGGAL_COLUMN, tanggal_bounds
+
+        frame = self.user_history(username)
+        lower, upper = tanggal_bounds(start, end)
+        if (lower or upper) and TANGGAL_COLUMN in frame.columns:
+            frame = frame[[_in_bounds(value, lower, upper) for value in frame[TANGGAL_COLUMN]]]
+        if newest_first:
+            frame = frame.iloc[::-1]
+        return frame.iloc[offset:offset + limit].reset_index(drop=True), len(frame)
+
+    def iter_user_history(self, username, start=None, end=None, chunk_size=EXPORT_CHUNK_ROWS):
+        """Riwayat user (terlama dulu) sebagai potongan DataFrame berukuran paling banyak `chunk_size` baris"""
+        offset = 0
+        while True:
+            chunk, total = self.user_history_page(username, offset=offset, limit=chunk_size,
+                                                  start=start, end=end, newest_first=False)
+            if len(chunk):
+                yield chunk
+            offset += chunk_size
+            if offset >= total:
+                return
+
+    def history_version(self, username):
+        """Penanda yang berubah setiap kali riwayat user berubah (untuk invalidasi cache ekspor)"""
+        stats = self.user_stats(username)
+        return f"{stats['total']}:{stats['latest_tanggal']}"
+
+    def user_stats(self, username):
+        """Ringkasan statistik prediksi user (lihat user_stats.summarize) tanpa memuat seluruh riwayat"""
+        stats = new_stats()
+        for record in self.user_history(username).to_dict('records'):
+            update_stats(stats, record)
+        return summarize(stats)
+
+    def cohort_rollup(self):
+        """Rollup prediksi semua user (lihat cohort_stats), ukurannya tidak bergantung pada jumlah baris riwayat"""
+        raise NotImplementedError
+
+    def migrate_tanggal(self):
+        """Ubah "Tanggal Prediksi" baris lama ke format kanonik history.TANGGAL_FORMAT; kembalikan jumlah baris yang berubah"""
+        raise NotImplementedError
+
+    def pending_writes(self):
+        """Jumlah baris yang belum tersimpan permanen"""
+        return 0
+
+    def quota_stats(self):
+        """Counter pembatas kuota API (lihat sheets_quota) atau None jika backend tidak memakai kuota"""
+        return None
+
+    def prefetch(self, history=False, force=False):
+        """Segarkan cache lokal yang akan dipakai rerun ini sekaligus (termasuk riwayat jika `history`).
+        Backend tanpa cache jarak jauh tidak perlu melakukan apa-apa."""
+        pass
+
+    def warm(self):
+        """Isi cache lokal lebih awal (dipanggil saat prewarm server)"""
+        pass
+
+    def close(self):
+        pass
+
+
+class SheetsStorage(StorageBackend):
+    name = 'sheets'
+
+    def __init__(self, connection, journal_path=JOURNAL_PATH):
+        self.connection = connection
+        self.users = UserDirectory(lambda: connection.worksheet("Users"))
+        self.riwayat = RiwayatCache(lambda: connection.worksheet("Riwayat"))
+        self.writer = HistoryWriter(
+            lambda: connection.worksheet("Riwayat"),
+            journal_path=journal_path,
+            on_flush=lambda n: self.riwayat.invalidate()
+        ).start()
+
+    def get_user(self, username):
+        return self.users.get(username)
+
+    def add_user(self, username, password, gender, birth_date_str):
+        if self.users.exists(username):
+            return False
+        self.connection.worksheet("Users").append_row([username, password, gender, birth_date_str])
+        self.users.invalidate()
+        return True
+
+    def append_history(self, row):
+        self.writer.submit(row)
+
+    def user_history(self, username):
+        return self.riwayat.user_frame(username)
+
+    def _user_positions(self, username, start, end):
+        from history import TANGGAL_COLUMN, tanggal_bounds
+
+        positions = self.riwayat.user_positions(username)
+        lower, upper = tanggal_bounds(start, end)
+        if lower or upper:
+            tanggal = self.riwayat.column_values(TANGGAL_COLUMN, positions)
+            positions = [p for p, value in zip(positions, tanggal) if _in_bounds(value, lower, upper)]
+        return positions
+
+    def user_history_page(self, username, offset=0, limit=25, start=None, end=None, newest_first=True):
+        # Hanya posisi baris (dari indeks per user) yang disaring; DataFrame dibangun untuk satu halaman saja
+        positions = self._user_positions(username, start, end)
+        if newest_first:
+            positions.reverse()
+        return self.riwayat.frame(positions[offset:offset + limit]), len(positions)
+
+    def iter_user_history(self, username, start=None, end=None, chunk_size=EXPORT_CHUNK_ROWS):
+        positions = self._user_positions(username, start, end)
+        for i in range(0, len(positions), chunk_size):
+            yield self.riwayat.frame(positions[i:i + chunk_size])
+
+    def user_stats(self, username):
+        # Dihitung dari baris yang sudah disinkronkan ke RiwayatCache; tidak ditulis balik ke Sheets
+        # agar setiap prediksi tetap hanya satu append_rows
+        return self.riwayat.user_stats(username)
+
+    def cohort_rollup(self):
+        return self.riwayat.cohort_rollup()
+
+    def migrate_tanggal(self):
+        from history import TANGGAL_COLUMN, normalize_tanggal
+
+        # Baris di antrean ditulis dulu agar ikut termigrasi
+        self.writer.flush()
+        worksheet = self.connection.worksheet("Riwayat")
+        values = worksheet.get_all_values()
+        if not values or TANGGAL_COLUMN not in values[0]:
+            return 0
+        position = values[0].index(TANGGAL_COLUMN)
+        old = [row[position] if position < len(row) else '' for row in values[1:]]
+        new = normalize_tanggal(old).tolist()
+        changed = sum(a != b for a, b in zip(old, new))
+        if changed:
+            # Satu kolom ditulis ulang dengan satu panggilan update
+            letter = column_letter(position + 1)
+            worksheet.update(range_name=f"{letter}2:{letter}{len(old) + 1}", values=[[value] for value in new])
+            self.riwayat.invalidate(full=True)
+        return changed
+
+    def pending_writes(self):
+        return self.writer.depth()
+
+    def quota_stats(self):
+        return self.connection.limiter.stats()
+
+    def prefetch(self, history=False, force=False):
+        # Cache yang kedaluwarsa dibaca dalam satu values_batch_get, bukan satu request per worksheet
+        caches = [(self.users, self.users.refresh)]
+        if history:
+            caches.append((self.riwayat, self.riwayat.sync))
+        plans = [(cache, sync, cache.generation, cache.sync_range(force)) for cache, sync in caches]
+        plans = [plan for plan in plans if plan[3] is not None]
+        if not plans:
+            return
+        try:
+            values = self.connection.batch_get([range_name for *_, range_name in plans])
+        except Exception:
+            # Tanpa batch read, setiap cache membaca worksheet-nya sendiri secara bersamaan;
+            # error tetap diteruskan seperti saat cache dibaca langsung
+            fan_out(*(partial(sync, force) for _, sync, _, _ in plans))
+            return
+        for (cache, _, generation, range_name), rows in zip(plans, values):
+            cache.apply_range(range_name, rows, generation)
+
+    def warm(self):
+        self.prefetch(history=True, force=True)
+
+    def close(self):
+        self.writer.stop()
+
+
+def _in_bounds(value, lower, upper):
+    text = str(value)
+    return (lower is None or text >= lower) and (upper is None or text < upper)
+
+
+def _plain(value):
+    """Ubah skalar NumPy (mis. label hasil model_dt.predict) menjadi tipe Python biasa"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteStorage(StorageBackend):
+    name = 'sqlite'
+
+    def __init__(self, path='diabetes.db'):
+        import sqlite3
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "username TEXT PRIMARY KEY, password TEXT, Gender TEXT, Date TEXT)"
+        )
+        columns = ', '.join(
+            f"{_quote(name)} {'REAL' if name in NUMERIC_COLUMNS else 'TEXT'}" for name in RIWAYAT_HEADER
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS riwayat ("
+            f"id INTEGER PRIMARY KEY AUTOINCREMENT, username_lower TEXT NOT NULL, {columns})"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_riwayat_user ON riwayat (username_lower, id)")
+        self._insert_sql = (
+            f"INSERT INTO riwayat (username_lower, {', '.join(_quote(n) for n in RIWAYAT_HEADER)}) "
+            f"VALUES (?, {', '.join('?' for _ in RIWAYAT_HEADER)})"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS user_stats (username_lower TEXT PRIMARY KEY, stats TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cohort_rollup ("
+            "dimensi TEXT NOT NULL, kunci TEXT NOT NULL, hasil TEXT NOT NULL, jumlah INTEGER NOT NULL, "
+            "PRIMARY KEY (dimensi, kunci, hasil))"
+        )
+        self._backfill_stats()
+        self._backfill_cohort()
+
+    def _backfill_stats(self):
+        """Bangun user_stats dari riwayat yang sudah ada (database dari versi sebelum tabel ini ada)"""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM user_stats LIMIT 1").fetchone():
+                return
+            stats = self._compute_stats()
+            if stats:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.executemany("INSERT OR REPLACE INTO user_stats VALUES (?, ?)",
+                                     [(key, json.dumps(value)) for key, value in stats.items()])
+                self._db.execute("COMMIT")
+
+    def _backfill_cohort(self):
+        """Bangun cohort_rollup dari riwayat yang sudah ada (database dari versi sebelum tabel ini ada)"""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM cohort_rollup LIMIT 1").fetchone():
+                return
+            rollup = new_rollup()
+            cursor = self._db.execute(f"SELECT {', '.join(_quote(n) for n in RIWAYAT_HEADER)} FROM riwayat")
+            for row in cursor:
+                update_rollup(rollup, dict(zip(RIWAYAT_HEADER, row)))
+            if rollup:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.executemany("INSERT OR REPLACE INTO cohort_rollup VALUES (?, ?, ?, ?)",
+                                     [(*key, count) for key, count in rollup.items()])
+                self._db.execute("COMMIT")
+
+    def _compute_stats(self):
+        stats = {}
+        cursor = self._db.execute(
+            f"SELECT username_lower, {', '.join(_quote(n) for n in RIWAYAT_HEADER)} FROM riwayat ORDER BY id"
+        )
+        for row in cursor:
+            update_stats(stats.setdefault(row[0], new_stats()), dict(zip(RIWAYAT_HEADER, row[1:])))
+        return stats
+
+    def migrate_tanggal(self):
+        from history import TANGGAL_COLUMN, normalize_tanggal
+
+        column = _quote(TANGGAL_COLUMN)
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, {column} FROM riwayat").fetchall()
+            if not rows:
+                return 0
+            ids, old = zip(*rows)
+            new = normalize_tanggal(list(old)).tolist()
+            changed = [(value, row_id) for row_id, before, value in zip(ids, old, new) if value != before]
+            if not changed:
+                return 0
+            # Tanggal dan user_stats (yang menyimpan tanggal prediksi terakhir) diganti dalam satu transaksi
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(f"UPDATE riwayat SET {column} = ? WHERE id = ?", changed)
+                self._db.execute("DELETE FROM user_stats")
+                self._db.executemany("INSERT INTO user_stats VALUES (?, ?)",
+                                     [(key, json.dumps(value)) for key, value in self._compute_stats().items()])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(changed)
+
+    def get_user(self, username):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT username, password, Gender, Date FROM users WHERE username = ?", (str(username),)
+            ).fetchone()
+        return dict(zip(USERS_HEADER, row)) if row else None
+
+    def add_user(self, username, password, gender, birth_date_str):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO users (username, password, Gender, Date) VALUES (?, ?, ?, ?)",
+                (username, password, gender, birth_date_str)
+            )
+        return cursor.rowcount == 1
+
+    def append_history(self, row):
+        row = [_plain(v) for v in row]
+        key = str(row[0]).lower()
+        with self._lock:
+            # Baris riwayat dan statistik user diperbarui dalam satu transaksi
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(self._insert_sql, [key, *row])
+                found = self._db.execute("SELECT stats FROM user_stats WHERE username_lower = ?", (key,)).fetchone()
+                stats = update_stats(json.loads(found[0]) if found else new_stats(), dict(zip(RIWAYAT_HEADER, row)))
+                self._db.execute("INSERT OR REPLACE INTO user_stats VALUES (?, ?)", (key, json.dumps(stats)))
+                self._db.executemany(
+                    "INSERT INTO cohort_rollup VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (dimensi, kunci, hasil) DO UPDATE SET jumlah = jumlah + excluded.jumlah",
+                    [(*key, count) for key, count in update_rollup({}, dict(zip(RIWAYAT_HEADER, row))).items()]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def user_stats(self, username):
+        with self._lock:
+            found = self._db.execute(
+                "SELECT stats FROM user_stats WHERE username_lower = ?", (str(username).lower(),)
+            ).fetchone()
+        return summarize(json.loads(found[0]) if found else None)
+
+    def cohort_rollup(self):
+        with self._lock:
+            return rollup_from_rows(self._db.execute("SELECT dimensi, kunci, hasil, jumlah FROM cohort_rollup"))
+
+    def user_history(self, username):
+        sql = (
+            f"SELECT {', '.join(_quote(n) for n in RIWAYAT_HEADER)} FROM riwayat "
+            "WHERE username_lower = ? ORDER BY id"
+        )
+        import pandas as pd
+
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=(str(username).lower(),))
+
+    def user_history_page(self, username, offset=0, limit=25, start=None, end=None, newest_first=True):
+        import pandas as pd
+
+        condition, params = self._history_condition(username, start, end)
+        sql = (
+            f"SELECT {', '.join(_quote(n) for n in RIWAYAT_HEADER)} FROM riwayat WHERE {condition} "
+            f"ORDER BY id {'DESC' if newest_first else 'ASC'} LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM riwayat WHERE {condition}", params).fetchone()[0]
+            page = pd.read_sql_query(sql, self._db, params=(*params, int(limit), int(offset)))
+        return page, total
+
+    def _history_condition(self, username, start, end):
+        from history import TANGGAL_COLUMN, tanggal_bounds
+
+        where, params = ["username_lower = ?"], [str(username).lower()]
+        for operator, bound in zip(('>=', '<'), tanggal_bounds(start, end)):
+            if bound is not None:
+                where.append(f"{_quote(TANGGAL_COLUMN)} {operator} ?")
+                params.append(bound)
+        return ' AND '.join(where), params
+
+    def iter_user_history(self, username, start=None, end=None, chunk_size=EXPORT_CHUNK_ROWS):
+        import pandas as pd
+
+        condition, params = self._history_condition(username, start, end)
+        sql = (
+            f"SELECT id, {', '.join(_quote(n) for n in RIWAYAT_HEADER)} FROM riwayat "
+            f"WHERE {condition} AND id > ? ORDER BY id LIMIT ?"
+        )
+        # Keyset pagination: lock hanya dipegang selama satu potongan dibaca, bukan selama ekspor
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(sql, (*params, last_id, int(chunk_size))).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield pd.DataFrame([row[1:] for row in rows], columns=RIWAYAT_HEADER)
+            if len(rows) < chunk_size:
+                return
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ParquetStorage(StorageBackend):
+    """Riwayat disimpan sebagai dataset Parquet yang dipartisi ke N bucket berdasarkan
+    hash username, sehingga query per user hanya membaca satu direktori bucket.
+    Setiap append menulis file kecil; file dalam satu bucket digabung otomatis
+    setelah melewati `compact_threshold`. Statistik user disimpan per bucket di
+    `stats/bucket=NNN.json` dan diperbarui pada setiap append. Rollup kohort
+    disimpan di memori dan sebagai snapshot `stats/cohort.parquet`; saat dimuat
+    ulang hanya baris dengan `seq` setelah watermark snapshot yang dihitung.
+    """
+
+    name = 'parquet'
+
+    def __init__(self, root='data_parquet', buckets=64, compact_threshold=32):
+        import pyarrow  # noqa: F401  (gagal lebih awal jika pyarrow tidak terpasang)
+        self.root = root
+        self.buckets = buckets
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, 'riwayat'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'stats'), exist_ok=True)
+        self._bucket_stats = {}
+        self._cohort = None
+        self._cohort_watermark = 0
+        self._cohort_pending = 0
+        self._cohort_path = os.path.join(root, 'stats', 'cohort.parquet')
+        self._users_path = os.path.join(root, 'users.parquet')
+        if os.path.exists(self._users_path):
+            import pandas as pd
+            users = pd.read_parquet(self._users_path)
+            self._users = {str(r['username']): r for r in users.to_dict('records')}
+        else:
+            self._users = {}
+
+    def _bucket_dir(self, username):
+        bucket = zlib.crc32(str(username).lower().encode('utf-8')) % self.buckets
+        return os.path.join(self.root, 'riwayat', f"bucket={bucket:03d}")
+
+    def _schema(self):
+        import pyarrow as pa
+        fields = [pa.field('username_lower', pa.string()), pa.field('seq', pa.int64())]
+        for name in RIWAYAT_HEADER:
+            fields.append(pa.field(name, pa.float64() if name in NUMERIC_COLUMNS else pa.string()))
+        return pa.schema(fields)
+
+    def get_user(self, username):
+        user = self._users.get(str(username))
+        return dict(user) if user is not None else None
+
+    def add_user(self, username, password, gender, birth_date_str):
+        import pandas as pd
+
+        with self._lock:
+            if str(username) in self._users:
+                return False
+            self._users[str(username)] = dict(zip(USERS_HEADER, [username, password, gender, birth_date_str]))
+            frame = pd.DataFrame(list(self._users.values()), columns=USERS_HEADER)
+            tmp_path = self._users_path + '.tmp'
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._users_path)
+        return True
+
+    def append_history(self, row):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        record = {'username_lower': str(row[0]).lower(), 'seq': time.time_ns()}
+        for name, value in zip(RIWAYAT_HEADER, map(_plain, row)):
+            record[name] = float(value) if name in NUMERIC_COLUMNS and value is not None else (
+                None if value is None else str(value))
+        table = pa.Table.from_pylist([record], schema=self._schema())
+        bucket_dir = self._bucket_dir(row[0])
+        with self._lock:
+            os.makedirs(bucket_dir, exist_ok=True)
+            # Statistik dimuat sebelum file baru ditulis agar backfill tidak menghitung baris ini dua kali
+            stats = self._load_bucket_stats(bucket_dir)
+            pq.write_table(table, os.path.join(bucket_dir, f"part-{record['seq']}-{uuid.uuid4().hex[:8]}.parquet"))
+            update_stats(stats.setdefault(record['username_lower'], new_stats()), record)
+            self._write_bucket_stats(bucket_dir, stats)
+            # Rollup yang belum dimuat tidak perlu diubah: baris ini dihitung saat snapshot dimuat ulang
+            if self._cohort is not None:
+                update_rollup(self._cohort, record)
+                self._cohort_watermark = max(self._cohort_watermark, record['seq'])
+                self._cohort_pending += 1
+                if self._cohort_pending >= COHORT_SNAPSHOT_EVERY:
+                    self._write_cohort_snapshot()
+            if len(os.listdir(bucket_dir)) > self.compact_threshold:
+                self._compact(bucket_dir)
+
+    def _stats_path(self, bucket_dir):
+        return os.path.join(self.root, 'stats', f"{os.path.basename(bucket_dir)}.json")
+
+    def _load_bucket_stats(self, bucket_dir):
+        """Statistik semua user dalam satu bucket; dibangun dari file Parquet jika belum ada"""
+        stats = self._bucket_stats.get(bucket_dir)
+        if stats is not None:
+            return stats
+        path = self._stats_path(bucket_dir)
+        if os.path.exists(path):
+            with open(path) as f:
+                stats = json.load(f)
+        else:
+            import pyarrow.parquet as pq
+            stats = {}
+            files = sorted(f for f in os.listdir(bucket_dir) if f.endswith('.parquet')) if os.path.isdir(bucket_dir) else []
+            if files:
+                table = pq.read_table([os.path.join(bucket_dir, f) for f in files], schema=self._schema())
+                for record in table.sort_by([('seq', 'ascending')]).to_pylist():
+                    update_stats(stats.setdefault(record['username_lower'], new_stats()), record)
+                self._write_bucket_stats(bucket_dir, stats)
+        self._bucket_stats[bucket_dir] = stats
+        return stats
+
+    def _write_bucket_stats(self, bucket_dir, stats):
+        path = self._stats_path(bucket_dir)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, path)
+
+    def user_stats(self, username):
+        with self._lock:
+            stats = self._load_bucket_stats(self._bucket_dir(username)).get(str(username).lower())
+        return summarize(stats)
+
+    def _riwayat_files(self):
+        riwayat_dir = os.path.join(self.root, 'riwayat')
+        return [os.path.join(riwayat_dir, name, f) for name in sorted(os.listdir(riwayat_dir))
+                for f in sorted(os.listdir(os.path.join(riwayat_dir, name))) if f.endswith('.parquet')]
+
+    def _load_cohort(self):
+        """Rollup kohort dari snapshot ditambah baris riwayat yang lebih baru dari watermark-nya"""
+        if self._cohort is not None:
+            return self._cohort
+        import pyarrow.parquet as pq
+
+        rollup, watermark = read_snapshot(self._cohort_path)
+        if rollup is None:
+            rollup, watermark = new_rollup(), -1
+        files = self._riwayat_files()
+        replayed = 0
+        if files:
+            table = pq.read_table(files, schema=self._schema(), filters=[('seq', '>', watermark)])
+            for record in table.sort_by([('seq', 'ascending')]).to_pylist():
+                update_rollup(rollup, record)
+                watermark = max(watermark, record['seq'])
+            replayed = table.num_rows
+        self._cohort, self._cohort_watermark = rollup, watermark
+        if replayed or not os.path.exists(self._cohort_path):
+            self._write_cohort_snapshot()
+        return rollup
+
+    def _write_cohort_snapshot(self):
+        write_snapshot(self._cohort, self._cohort_path, self._cohort_watermark)
+        self._cohort_pending = 0
+
+    def cohort_rollup(self):
+        with self._lock:
+            return dict(self._load_cohort())
+
+    def close(self):
+        with self._lock:
+            if self._cohort is not None and self._cohort_pending:
+                self._write_cohort_snapshot()
+
+    def _compact(self, bucket_dir, transform=None):
+        """Gabung semua file bucket menjadi satu; `transform(table)` opsional mengubah isi tabel"""
+        import pyarrow.parquet as pq
+        files = sorted(f for f in os.listdir(bucket_dir) if f.endswith('.parquet'))
+        table = pq.read_table([os.path.join(bucket_dir, f) for f in files], schema=self._schema())
+        table = table.sort_by([('username_lower', 'ascending'), ('seq', 'ascending')])
+        if transform is not None:
+            table = transform(table)
+        tmp_path = os.path.join(bucket_dir, f".compact-{uuid.uuid4().hex[:8]}.tmp")
+        pq.write_table(table, tmp_path, row_group_size=8192)
+        os.replace(tmp_path, os.path.join(bucket_dir, f"part-{time.time_ns()}-compact.parquet"))
+        for f in files:
+            os.remove(os.path.join(bucket_dir, f))
+
+    def migrate_tanggal(self):
+        import pyarrow as pa
+
+        from history import TANGGAL_COLUMN, normalize_tanggal
+
+        changed = 0
+
+        def normalize(table):
+            nonlocal changed
+            old = table.column(TANGGAL_COLUMN).to_pylist()
+            new = normalize_tanggal(old).tolist()
+            changed += sum(a != b for a, b in zip(old, new))
+            position = table.schema.get_field_index(TANGGAL_COLUMN)
+            return table.set_column(position, TANGGAL_COLUMN, pa.array(new, type=pa.string()))
+
+        riwayat_dir = os.path.join(self.root, 'riwayat')
+        with self._lock:
+            for name in sorted(os.listdir(riwayat_dir)):
+                bucket_dir = os.path.join(riwayat_dir, name)
+                if not any(f.endswith('.parquet') for f in os.listdir(bucket_dir)):
+                    continue
+                self._compact(bucket_dir, transform=normalize)
+                # Statistik bucket dibangun ulang dari file yang sudah dimigrasi saat dibutuhkan
+                self._bucket_stats.pop(bucket_dir, None)
+                if os.path.exists(self._stats_path(bucket_dir)):
+                    os.remove(self._stats_path(bucket_dir))
+        return changed
+
+    def _history_filters(self, username, start, end):
+        from history import TANGGAL_COLUMN, tanggal_bounds
+
+        filters = [('username_lower', '=', str(username).lower())]
+        for operator, bound in zip(('>=', '<'), tanggal_bounds(start, end)):
+            if bound is not None:
+                filters.append((TANGGAL_COLUMN, operator, bound))
+        return filters
+
+    def user_history_page(self, username, offset=0, limit=25, start=None, end=None, newest_first=True):
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        bucket_dir = self._bucket_dir(username)
+        filters = self._history_filters(username, start, end)
+        with self._lock:
+            files = sorted(f for f in os.listdir(bucket_dir) if f.endswith('.parquet')) if os.path.isdir(bucket_dir) else []
+            if not files:
+                return pd.DataFrame(columns=RIWAYAT_HEADER), 0
+            # Filter user dan tanggal didorong ke pembaca Parquet; hanya potongan halaman yang diubah ke pandas
+            table = pq.read_table([os.path.join(bucket_dir, f) for f in files], schema=self._schema(), filters=filters)
+        table = table.sort_by([('seq', 'descending' if newest_first else 'ascending')])
+        page = table.slice(offset, limit).select(RIWAYAT_HEADER).to_pandas()
+        return page, table.num_rows
+
+    def iter_user_history(self, username, start=None, end=None, chunk_size=EXPORT_CHUNK_ROWS):
+        import pyarrow.parquet as pq
+
+        bucket_dir = self._bucket_dir(username)
+        filters = self._history_filters(username, start, end)
+        with self._lock:
+            files = sorted(f for f in os.listdir(bucket_dir) if f.endswith('.parquet')) if os.path.isdir(bucket_dir) else []
+            if not files:
+                return
+            # Snapshot kolumnar milik user dibaca di bawah lock (compaction bisa menghapus file);
+            # konversi ke pandas, bagian yang paling boros memori, dilakukan per potongan
+            table = pq.read_table([os.path.join(bucket_dir, f) for f in files], schema=self._schema(), filters=filters)
+        table = table.sort_by([('seq', 'ascending')]).select(RIWAYAT_HEADER)
+        for offset in range(0, table.num_rows, chunk_size):
+            yield table.slice(offset, chunk_size).to_pandas()
+
+    def user_history(self, username):
+        import pandas as pd
+        import pyarrow.parquet as pq
+        bucket_dir = self._bucket_dir(username)
+        with self._lock:
+            files = sorted(f for f in os.listdir(bucket_dir) if f.endswith('.parquet')) if os.path.isdir(bucket_dir) else []
+            if not files:
+                return pd.DataFrame(columns=RIWAYAT_HEADER)
+            table = pq.read_table(
+                [os.path.join(bucket_dir, f) for f in files],
+                schema=self._schema(),
+                filters=[('username_lower', '=', str(username).lower())]
+            )
+        frame = table.to_pandas().sort_values('seq', kind='stable')
+        return frame[RIWAYAT_HEADER].reset_index(drop=True)
+
+
+def storage_from_config(secrets=None):
+    """Bangun backend penyimpanan sesuai konfigurasi"""
+    config = {}
+    try:
+        if secrets is not None and 'storage' in secrets:
+            config = dict(secrets['storage'])
+    except Exception:
+        config = {}
+    backend = os.environ.get('DIABETES_STORAGE', config.get('backend', 'sheets'))
+    if backend == 'sqlite':
+        return SQLiteStorage(os.environ.get('DIABETES_SQLITE_PATH', config.get('path', 'diabetes.db')))
+    if backend == 'parquet':
+        return ParquetStorage(os.environ.get('DIABETES_PARQUET_ROOT', config.get('path', 'data_parquet')))
+    if backend == 'sheets':
+        return SheetsStorage(connection_from_config(secrets))
+    raise ValueError(f"Backend penyimpanan tidak dikenal: {backend}")
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# Modul aplikasi berada di root repo (tanpa paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def artifacts(tmp_path_factory):
+    """(preprocessor_path, model_path) hasil latih kecil yang konsisten"""
+    from benchmarks.synthetic import synthetic_artifacts
+
+    return synthetic_artifacts(str(tmp_path_factory.mktemp('artifacts')), n_rows=1000)
+
+
+@pytest.fixture(scope='session')
+def fitted(artifacts):
+    """(preprocessor, model) yang sudah di-fit"""
+    import joblib
+
+    preprocessor_path, model_path = artifacts
+    return joblib.load(preprocessor_path), joblib.load(model_path)
+
+
+@pytest.fixture
+def predictor(fitted):
+    from predictor import Predictor
+
+    preprocessor, model = fitted
+    return Predictor(preprocessor, model, manifest_path=None)
@@ -0,0 +1,46 @@
+import accounts
+from storage import SQLiteStorage
+
+
+def test_url_username_alone_is_not_admin(monkeypatch):
+    monkeypatch.setenv('DIABETES_ADMINS', 'budi')
+    # Sesi yang hanya memulihkan ?logged_in=true&username=budi dari URL
+    session = {'user_logged_in': True, 'username': 'budi'}
+    assert accounts.is_admin('budi')
+    assert not accounts.session_is_admin(session)
+
+
+def test_password_login_grants_admin_for_same_user_only(monkeypatch):
+    monkeypatch.setenv('DIABETES_ADMINS', 'budi')
+    session = {'user_logged_in': True, 'username': 'budi'}
+    accounts.mark_verified_login(session, 'budi')
+    assert accounts.session_is_admin(session)
+
+    session['username'] = 'ani'
+    assert not accounts.session_is_admin(session)
+    session['username'] = 'budi'
+    accounts.clear_verified_login(session)
+    assert not accounts.session_is_admin(session)
+
+
+def test_verified_non_admin_is_not_admin(monkeypatch):
+    monkeypatch.setenv('DIABETES_ADMINS', 'budi')
+    session = {'username': 'ani'}
+    accounts.mark_verified_login(session, 'ani')
+    assert not accounts.session_is_admin(session)
+
+
+def test_case_variant_of_admin_name_is_not_admin(monkeypatch, tmp_path):
+    monkeypatch.setenv('DIABETES_ADMINS', 'budi')
+    storage = SQLiteStorage(str(tmp_path / 'users.db'))
+    try:
+        assert accounts.register_user(storage, 'budi', 'rahasia', 'M', None)[0]
+        # Username peka huruf besar/kecil, jadi kembarannya bisa didaftarkan oleh siapa saja
+        assert accounts.register_user(storage, 'BUDI', 'milikku', 'M', None)[0]
+        assert accounts.verify_user(storage, 'BUDI', 'milikku')[0]
+    finally:
+        storage.close()
+    session = {'user_logged_in': True, 'username': 'BUDI'}
+    accounts.mark_verified_login(session, 'BUDI')
+    assert not accounts.is_admin('BUDI')
+    assert not accounts.session_is_admin(session)
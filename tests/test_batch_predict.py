@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from batch_predict import score_file
+from benchmarks.synthetic import synthetic_frame
+
+
+@pytest.fixture
+def csv_with_invalid_row(tmp_path):
+    frame = synthetic_frame(30, seed=1).astype({'AGE': object})
+    frame.loc[25, 'AGE'] = 'abc'
+    frame.loc[3, 'Gender'] = 'X'
+    path = tmp_path / 'input.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_parquet_output_keeps_invalid_cells_in_later_chunks(predictor, csv_with_invalid_row, tmp_path):
+    # Chunk pertama bertipe int64 untuk AGE; 'abc' di chunk ketiga dulu memicu ArrowInvalid
+    target = str(tmp_path / 'hasil.parquet')
+    stats = score_file(csv_with_invalid_row, target, predictor=predictor, chunksize=10)
+    assert stats['rows'] == 30 and stats['invalid'] == 2
+
+    result = pd.read_parquet(target)
+    assert len(result) == 30
+    assert result['AGE'].dtype == 'float64'
+    assert pd.isna(result.loc[25, 'AGE']) and pd.isna(result.loc[25, 'prediction'])
+    assert 'AGE kosong/bukan angka' in result.loc[25, 'error']
+    assert 'Gender tidak valid' in result.loc[3, 'error']
+
+
+def test_csv_and_parquet_outputs_agree(predictor, csv_with_invalid_row, tmp_path):
+    csv_target, parquet_target = str(tmp_path / 'hasil.csv'), str(tmp_path / 'hasil.parquet')
+    score_file(csv_with_invalid_row, csv_target, predictor=predictor, chunksize=7)
+    score_file(csv_with_invalid_row, parquet_target, predictor=predictor, chunksize=7)
+    from_csv, from_parquet = pd.read_csv(csv_target, keep_default_na=False), pd.read_parquet(parquet_target)
+    assert list(from_csv.columns) == list(from_parquet.columns)
+    assert from_csv['prediction'].tolist() == from_parquet['prediction'].fillna('').tolist()
+    assert from_csv['error'].tolist() == from_parquet['error'].tolist()
+    proba = [c for c in from_csv.columns if c.startswith('proba_')]
+    pd.testing.assert_frame_equal(from_csv[proba].replace('', float('nan')).astype(float), from_parquet[proba])
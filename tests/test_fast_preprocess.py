@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_frame
+from fast_preprocess import FeatureLayoutError, FusedPreprocessor, check_layout
+from features import ORIGINAL_COLUMNS_ORDER
+
+GENDER_CASES = [None, np.nan, 'X', 'm', 'M', 'F', np.str_('F')]
+
+
+@pytest.fixture
+def frame():
+    frame = synthetic_frame(300, seed=7)
+    rng = np.random.default_rng(7)
+    # Nilai numerik kosong di sebagian sel agar imputasi ikut teruji
+    for column in ('Urea', 'HbA1c', 'BMI'):
+        frame.loc[rng.random(len(frame)) < 0.1, column] = np.nan
+    return frame
+
+
+def test_frame_matches_sklearn(fitted, frame):
+    preprocessor, _ = fitted
+    fused = FusedPreprocessor(preprocessor)
+    np.testing.assert_array_equal(fused.transform_frame(frame), preprocessor.transform(frame))
+
+
+def test_records_match_sklearn(fitted, frame):
+    preprocessor, _ = fitted
+    fused = FusedPreprocessor(preprocessor)
+    expected = preprocessor.transform(frame)
+    for i, record in enumerate(frame.head(50).to_dict('records')):
+        np.testing.assert_array_equal(fused.transform_record(record)[0], expected[i])
+
+
+@pytest.mark.parametrize('gender', GENDER_CASES, ids=repr)
+def test_missing_and_unknown_gender_match_sklearn(fitted, gender):
+    preprocessor, _ = fitted
+    fused = FusedPreprocessor(preprocessor)
+    record = dict(synthetic_frame(1, seed=3).iloc[0].to_dict(), Gender=gender)
+    single = pd.DataFrame(record, index=[0])[ORIGINAL_COLUMNS_ORDER]
+    expected = preprocessor.transform(single)
+    np.testing.assert_array_equal(fused.transform_record(record), expected)
+    np.testing.assert_array_equal(fused.transform_frame(single), expected)
+
+    # Kolom object campuran: None tetap None (tidak dianggap kosong oleh SimpleImputer)
+    mixed = pd.DataFrame([dict(record, Gender='M'), record])[ORIGINAL_COLUMNS_ORDER].astype({'Gender': object})
+    mixed.loc[1, 'Gender'] = gender
+    np.testing.assert_array_equal(fused.transform_frame(mixed), preprocessor.transform(mixed))
+
+
+def test_none_gender_is_unknown_not_imputed(fitted):
+    preprocessor, _ = fitted
+    fused = FusedPreprocessor(preprocessor)
+    record = dict(synthetic_frame(1, seed=3).iloc[0].to_dict(), Gender=None)
+    assert not fused.transform_record(record)[0, -2:].any()
+
+
+def test_spec_round_trip(fitted, frame):
+    preprocessor, _ = fitted
+    fused = FusedPreprocessor(preprocessor)
+    rebuilt = FusedPreprocessor.from_spec(*fused.spec())
+    np.testing.assert_array_equal(rebuilt.transform_frame(frame), fused.transform_frame(frame))
+    assert rebuilt.layout() == fused.layout()
+
+
+def test_layout_mismatch_raises(fitted, tmp_path):
+    preprocessor, model = fitted
+    layout = FusedPreprocessor(preprocessor).layout()
+    check_layout(layout, model, manifest_path=None)
+    with pytest.raises(FeatureLayoutError):
+        check_layout(dict(layout, n_features=layout['n_features'] + 1), model, manifest_path=None)
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text('{"input_columns": [], "output_features": [], "n_features": 0}')
+    with pytest.raises(FeatureLayoutError):
+        check_layout(layout, model, manifest_path=str(manifest))
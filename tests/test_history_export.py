@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.synthetic import synthetic_history, usernames
+from history import history_display_frame
+from history_export import ExportCache, write_export
+from sheets_client import RIWAYAT_HEADER
+from storage import NUMERIC_COLUMNS, SQLiteStorage
+
+USER = usernames(1)[0]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'riwayat.db'))
+    for row in synthetic_history(60, 1, seed=3):
+        storage.append_history(row)
+    yield storage
+    storage.close()
+
+
+def _expected(storage):
+    return history_display_frame(storage.user_history(USER)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 1000])
+def test_chunked_exports_match_single_frame(storage, tmp_path, chunk_size):
+    expected = _expected(storage)
+    csv_path, parquet_path = str(tmp_path / 'r.csv.gz'), str(tmp_path / 'r.parquet')
+    assert write_export(storage.iter_user_history(USER, chunk_size=chunk_size), 'csv.gz', csv_path) == 60
+    assert write_export(storage.iter_user_history(USER, chunk_size=chunk_size), 'parquet', parquet_path) == 60
+
+    from_csv = pd.read_csv(csv_path, dtype={name: str for name in RIWAYAT_HEADER if name not in NUMERIC_COLUMNS})
+    from_parquet = pd.read_parquet(parquet_path)
+    assert list(from_parquet.columns) == RIWAYAT_HEADER
+    for name in RIWAYAT_HEADER:
+        if name in NUMERIC_COLUMNS:
+            np.testing.assert_allclose(from_parquet[name], pd.to_numeric(expected[name]))
+            np.testing.assert_allclose(from_csv[name], from_parquet[name])
+        else:
+            assert from_parquet[name].tolist() == from_csv[name].tolist() == expected[name].tolist()
+
+
+def test_parquet_schema_is_fixed_across_chunks(tmp_path):
+    # Potongan pertama tanpa Gender/Hasil yang dikenal (kolom kosong), potongan berikutnya berisi teks dan angka rusak
+    rows = synthetic_history(4, 1, seed=4)
+    first = pd.DataFrame(rows[:2], columns=RIWAYAT_HEADER).assign(Gender=None, Hasil=None)
+    second = pd.DataFrame(rows[2:], columns=RIWAYAT_HEADER).assign(AGE='abc')
+    path = str(tmp_path / 'r.parquet')
+    assert write_export([first, second], 'parquet', path) == 4
+    schema = pq.read_schema(path)
+    assert str(schema.field('AGE').type) == 'double' and str(schema.field('Gender').type) == 'string'
+    frame = pd.read_parquet(path)
+    assert frame['AGE'].isna().tolist() == [False, False, True, True]
+    assert frame['Gender'].isna().tolist() == [True, True, False, False]
+
+
+def test_empty_history_exports_header_only(tmp_path):
+    path = str(tmp_path / 'r.csv.gz')
+    assert write_export(iter(()), 'csv.gz', path) == 0
+    assert pd.read_csv(path).empty
+
+
+def test_export_cache_reuses_file_until_history_changes(storage, tmp_path):
+    cache = ExportCache(str(tmp_path / 'cache'))
+    first = cache.get(storage, USER.upper(), 'parquet')
+    assert cache.get(storage, USER, 'parquet') == first
+    assert cache.stats()['hits'] == 1
+
+    storage.append_history(synthetic_history(1, 1, seed=5)[0])
+    second = cache.get(storage, USER, 'parquet')
+    assert second != first and not os.path.exists(first)
+    assert len(pd.read_parquet(second)) == 61
+
+    with pytest.raises(ValueError):
+        cache.get(storage, USER, 'xlsx')
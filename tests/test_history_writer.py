@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from history_writer import HistoryWriter
+
+
+class RecordingWorksheet:
+    def __init__(self, delay=0.0):
+        self.rows = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows):
+        time.sleep(self.delay)
+        with self._lock:
+            self.rows.extend(rows)
+
+
+def _writer(worksheet, path, **kwargs):
+    return HistoryWriter(lambda: worksheet, journal_path=path, batch_size=5, flush_interval=0.01, **kwargs)
+
+
+def test_writers_sharing_a_journal_send_each_row_once(tmp_path):
+    # Dua writer dengan koneksi SQLite sendiri-sendiri, seperti dua proses dari checkout yang sama
+    path = str(tmp_path / 'journal.db')
+    worksheet = RecordingWorksheet(delay=0.005)
+    first, second = _writer(worksheet, path), _writer(worksheet, path)
+    for i in range(100):
+        (first if i % 2 else second).submit([f'user{i}', i])
+    first.start(), second.start()
+    try:
+        assert first.flush(timeout=20) and second.flush(timeout=20)
+    finally:
+        first.stop(), second.stop()
+    sent = sorted(row[1] for row in worksheet.rows)
+    assert sent == list(range(100))
+    assert first.flushed_rows + second.flushed_rows == 100
+
+
+def test_stale_claim_is_taken_over(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    dead = _writer(RecordingWorksheet(), path)
+    dead.submit(['user', 1])
+    assert len(dead._next_batch()) == 1  # diklaim lalu "proses" mati sebelum mengirim
+
+    worksheet = RecordingWorksheet()
+    live = _writer(worksheet, path, claim_timeout=60)
+    assert live._next_batch() == []
+    live.claim_timeout = 0.0
+    live.start()
+    try:
+        assert live.flush(timeout=5)
+    finally:
+        live.stop()
+    assert worksheet.rows == [['user', 1]]
+
+
+def test_legacy_journal_gets_claim_columns(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE journal (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+               "created_at REAL NOT NULL)")
+    db.execute("INSERT INTO journal (payload, created_at) VALUES ('[\"lama\", 1]', 0)")
+    db.commit()
+    db.close()
+
+    worksheet = RecordingWorksheet()
+    writer = _writer(worksheet, path).start()
+    try:
+        assert writer.flush(timeout=5)
+    finally:
+        writer.stop()
+    assert worksheet.rows == [['lama', 1]]
+
+
+def test_locked_journal_does_not_kill_the_writer(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    worksheet = RecordingWorksheet()
+    writer = _writer(worksheet, path, busy_timeout=0.02, base_backoff=0.01, max_backoff=0.05).start()
+    # Proses lain memegang lock eksklusif lebih lama dari busy_timeout
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    time.sleep(0.5)
+    other.execute("COMMIT")
+    other.close()
+    try:
+        assert writer._thread.is_alive()
+        assert writer.failed_attempts > 0 and 'locked' in writer.last_error
+        writer.submit(['user', 1])
+        assert writer.flush(timeout=5)
+    finally:
+        writer.stop()
+    assert worksheet.rows == [['user', 1]]
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_submit_restarts_a_dead_writer(tmp_path):
+    worksheet = RecordingWorksheet()
+    flushes = []
+
+    def on_flush(count):
+        flushes.append(count)
+        if len(flushes) == 1:
+            raise RuntimeError("callback rusak")
+
+    writer = _writer(worksheet, str(tmp_path / 'journal.db'), on_flush=on_flush).start()
+    try:
+        writer.submit(['user', 1])
+        writer._thread.join(timeout=5)
+        assert not writer._thread.is_alive()
+        writer.submit(['user', 2])
+        assert writer.flush(timeout=5)
+    finally:
+        writer.stop()
+    assert [row[1] for row in worksheet.rows] == [1, 2]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.synthetic import synthetic_records
+from prediction_cache import TreePredictionCache
+from predictor import Predictor
+
+
+def _grid(model, n_rows=4000, seed=0):
+    """Input acak ditambah nilai tepat di, sedikit di bawah, dan sedikit di atas setiap threshold"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, model.n_features_in_)).astype(np.float32)
+    tree = model.tree_
+    internal = np.flatnonzero(tree.feature >= 0)
+    for i, node in enumerate(internal):
+        threshold = np.float32(tree.threshold[node])
+        for j, value in enumerate((threshold, np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf))):
+            X[(3 * i + j) % n_rows, tree.feature[node]] = value
+    return X
+
+
+@pytest.fixture(scope='module')
+def tree():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(600, 5)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + (X[:, 3] > 1)
+    return DecisionTreeClassifier(random_state=0, max_depth=8).fit(X, y)
+
+
+def test_equal_keys_mean_equal_leaves(tree):
+    cache = TreePredictionCache(tree)
+    X = _grid(tree)
+    leaves = tree.apply(X)
+    seen = {}
+    for row, leaf in zip(X, leaves):
+        assert seen.setdefault(cache.key(row[np.newaxis]), leaf) == leaf
+
+
+def test_nan_gets_its_own_cell(tree):
+    cache = TreePredictionCache(tree)
+    row = np.zeros((1, tree.n_features_in_), dtype=np.float32)
+    with_nan = row.copy()
+    with_nan[0, cache.features[0]] = np.nan
+    assert cache.key(with_nan) != cache.key(row)
+    assert -1 in cache.key(with_nan)
+
+
+def test_forest_keys_cover_every_tree():
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(400, 4)).astype(np.float32)
+    forest = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(X, X[:, 0] > X[:, 1])
+    cache = TreePredictionCache(forest)
+    probe = rng.normal(size=(3000, 4)).astype(np.float32)
+    proba = forest.predict_proba(probe)
+    seen = {}
+    for row, expected in zip(probe, proba):
+        np.testing.assert_array_equal(seen.setdefault(cache.key(row[np.newaxis]), expected), expected)
+
+
+def test_non_tree_model_is_rejected():
+    model = LogisticRegression().fit([[0.0], [1.0]], [0, 1])
+    with pytest.raises(ValueError):
+        TreePredictionCache(model)
+
+
+def test_lru_eviction_and_stats(tree):
+    cache = TreePredictionCache(tree, maxsize=2)
+    cache.put((0,), 'a')
+    cache.put((1,), 'b')
+    assert cache.get((0,)) == 'a'
+    cache.put((2,), 'c')
+    assert cache.get((1,)) is None and cache.get((0,)) == 'a'
+    assert cache.stats() == {'entri': 2, 'maks': 2, 'hits': 2, 'misses': 1, 'hit_rate': 0.6667}
+
+
+def test_cached_predictions_match_uncached(fitted):
+    preprocessor, model = fitted
+    cached = Predictor(preprocessor, model, manifest_path=None)
+    uncached = Predictor(preprocessor, model, manifest_path=None, cache_size=0)
+    assert cached.cache is not None and uncached.cache is None
+    for record in synthetic_records(500, seed=3, distinct=50):
+        labels, proba = cached.predict_record(record)
+        expected_labels, expected_proba = uncached.predict_record(record)
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_array_equal(proba, expected_proba)
+        assert not proba.flags.writeable
+    assert cached.cache_stats()['hits'] > 0
@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+
+import joblib
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_frame
+from model_registry import ModelRegistry
+from predictor import cached_predictor
+from serve import MicroBatcher, PredictionServer, make_handler
+
+PATIENT = {"Gender": "M", "AGE": 50, "Urea": 5.0, "Cr": 80, "HbA1c": 6.0, "Chol": 5.0, "TG": 1.5,
+           "HDL": 1.0, "LDL": 3.0, "VLDL": 1.0, "BMI": 25.0}
+
+
+@pytest.fixture
+def model_files(artifacts, tmp_path):
+    preprocessor_path, model_path = artifacts
+    paths = str(tmp_path / 'preprocessor.pkl'), str(tmp_path / 'model.pkl')
+    for source, target in zip((preprocessor_path, model_path), paths):
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            dst.write(src.read())
+    return paths
+
+
+@pytest.fixture
+def server(model_files):
+    registry = ModelRegistry()
+    preprocessor_path, model_path = model_files
+    batcher = MicroBatcher(lambda: cached_predictor(registry, model_path=model_path,
+                                                    preprocessor_path=preprocessor_path, engine_path=None),
+                           max_wait_ms=1)
+    httpd = PredictionServer(('127.0.0.1', 0), make_handler(batcher, max_body_bytes=4096, max_records=3))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(server, body, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    connection.request('POST', '/predict', body=body, headers=headers or {})
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b'null')
+    connection.close()
+    return response.status, payload
+
+
+def test_single_prediction(server):
+    status, payload = _post(server, json.dumps(PATIENT))
+    assert status == 200
+    assert payload['class'] in ('N', 'P', 'Y')
+    assert abs(sum(payload['proba'].values()) - 1.0) < 1e-9
+
+
+def test_oversized_body_is_rejected_without_reading(server):
+    status, payload = _post(server, b'x', headers={'Content-Length': str(10 ** 9)})
+    assert status == 413 and 'byte' in payload['error']
+
+
+def test_too_many_records_is_rejected(server):
+    status, payload = _post(server, json.dumps({'records': [PATIENT] * 4}))
+    assert status == 413
+    status, payload = _post(server, json.dumps({'records': [PATIENT] * 3}))
+    assert status == 200 and len(payload['predictions']) == 3
+
+
+def test_promoted_artifacts_are_picked_up(server, model_files, fitted):
+    from sklearn.dummy import DummyClassifier
+
+    preprocessor, _ = fitted
+    _, model_path = model_files
+    X = preprocessor.transform(synthetic_frame(20, seed=0))
+    assert _post(server, json.dumps({**PATIENT, 'HbA1c': 14.0}))[1]['class'] == 'Y'
+
+    constant = DummyClassifier(strategy='constant', constant='N').fit(X, np.array(['N', 'P', 'Y'] * 6 + ['N', 'N']))
+    joblib.dump(constant, model_path)
+    status, payload = _post(server, json.dumps({**PATIENT, 'HbA1c': 14.0}))
+    assert status == 200 and payload['class'] == 'N'
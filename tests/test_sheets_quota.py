@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from fake_sheets import FakeAPIError
+from sheets_quota import QuotaLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _limiter(clock, **kwargs):
+    return QuotaLimiter(read_per_minute=None, write_per_minute=None, sleep=clock.sleep, clock=clock,
+                        rng=random.Random(0), **kwargs)
+
+
+def _failing(*errors, result='ok'):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+
+@pytest.mark.parametrize('error', [FakeAPIError(503, 'unavailable'), ConnectionError('reset'), TimeoutError()])
+def test_write_is_not_retried_when_it_may_have_been_applied(error):
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    fn, calls = _failing(error)
+    with pytest.raises(type(error)):
+        limiter.call('write', fn)
+    assert len(calls) == 1
+    assert limiter.stats()['gagal'] == 1 and limiter.stats()['diulang'] == 0
+
+
+def test_write_is_retried_on_429():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    fn, calls = _failing(FakeAPIError(429, 'quota'), FakeAPIError(429, 'quota'))
+    assert limiter.call('write', fn) == 'ok'
+    assert len(calls) == 3
+
+
+def test_read_is_retried_on_transient_errors():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    fn, calls = _failing(FakeAPIError(503, 'unavailable'), ConnectionError('reset'))
+    assert limiter.call('read', fn) == 'ok'
+    assert len(calls) == 3
+
+
+def test_total_retry_time_is_capped():
+    clock = FakeClock()
+    limiter = _limiter(clock, max_retries=50, base_backoff=8.0, max_backoff=32.0, max_retry_seconds=5.0)
+    fn, calls = _failing(*[FakeAPIError(503, 'unavailable')] * 50)
+    with pytest.raises(FakeAPIError):
+        limiter.call('read', fn)
+    assert clock.now <= 5.0
+    assert 1 < len(calls) < 50
@@ -0,0 +1,102 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import train
+from benchmarks.synthetic import synthetic_frame, synthetic_history
+from history_export import write_export
+from model_registry import ModelRegistry
+from predictor import active_artifacts, cached_predictor
+from sheets_client import RIWAYAT_HEADER
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    frame = synthetic_frame(400, seed=1)
+    frame['Gender'] = np.where(np.arange(len(frame)) % 7 == 0, 'f', frame['Gender'])
+    # Seperti dataset asli: label dengan spasi di belakang
+    frame['CLASS'] = np.where(frame['HbA1c'] >= 6.5, 'Y ', np.where(frame['HbA1c'] >= 5.7, 'P', 'N'))
+    path = tmp_path / 'dataset.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # active_artifacts membaca models/CURRENT relatif terhadap direktori kerja
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_normalize_chunk_maps_display_labels():
+    chunk = pd.DataFrame({'Gender': ['Laki-laki', 'Perempuan', ' f ', None], 'AGE': ['50', 'x', '40', '30'],
+                          'Hasil': ['Diabetes', 'No Diabetes', 'P', 'tidak dikenal']})
+    frame = train.normalize_chunk(chunk)
+    assert frame['Gender'].tolist() == ['M', 'F', 'F']
+    assert frame['label'].tolist() == ['Y', 'N', 'P']
+    assert np.isnan(frame['AGE'].iloc[1]) and frame['AGE'].dtype == np.float32
+    assert list(frame.columns) == train.FEATURE_COLUMNS + ['label']
+
+
+def test_load_training_data_streams_csv_and_exports(dataset, tmp_path):
+    history = pd.DataFrame(synthetic_history(120, 5, seed=2), columns=RIWAYAT_HEADER)
+    write_export([history], 'csv.gz', str(tmp_path / 'riwayat.csv.gz'))
+    write_export([history], 'parquet', str(tmp_path / 'riwayat.parquet'))
+    frame, sources = train.load_training_data(
+        dataset, [str(tmp_path / 'riwayat.csv.gz'), str(tmp_path / 'riwayat.parquet')], chunk_rows=50)
+    assert sources == {dataset: 400, str(tmp_path / 'riwayat.csv.gz'): 120, str(tmp_path / 'riwayat.parquet'): 120}
+    assert len(frame) == 640
+    assert set(frame['Gender'].dropna()) <= {'M', 'F'} and set(frame['label']) == {'N', 'P', 'Y'}
+
+
+def test_train_writes_complete_version_and_promote_switches_pointer(dataset, workdir):
+    directory, metadata = train.train(dataset, folds=3, jobs=1, models_dir='models')
+    assert sorted(os.listdir(directory)) == ['decision_tree_model.pkl', 'feature_manifest.json', 'metadata.json',
+                                             'model_engine.dtree', 'preprocessor.pkl']
+    assert not [name for name in os.listdir('models') if name.endswith('.tmp')]
+    assert metadata['model'] == 'tree' and 0.0 <= metadata['holdout_accuracy'] <= 1.0
+
+    assert active_artifacts()[0] == 'decision_tree_model.pkl'
+    assert train.promote(directory) == os.path.basename(directory)
+    model_path, _, engine_path, manifest_path = active_artifacts()
+    assert model_path == os.path.join('models', os.path.basename(directory), 'decision_tree_model.pkl')
+    predictor = cached_predictor(ModelRegistry())
+    assert predictor.fused is not None and os.path.exists(engine_path) and os.path.exists(manifest_path)
+
+    with pytest.raises(ValueError):
+        train.promote(str(workdir))
+
+
+def test_readers_never_see_a_mixed_version(dataset, workdir):
+    first, _ = train.train(dataset, folds=2, jobs=1, models_dir='models')
+    os.rename(first, os.path.join('models', 'v1'))
+    # Versi kedua hanya melihat satu Gender sehingga lebar one-hot berbeda; pasangan campuran pasti gagal
+    frame = pd.read_csv(dataset).assign(Gender='M')
+    frame.to_csv('satu_gender.csv', index=False)
+    second, _ = train.train('satu_gender.csv', folds=2, jobs=1, models_dir='models')
+    os.rename(second, os.path.join('models', 'v2'))
+
+    train.promote(os.path.join('models', 'v1'))
+    registry = ModelRegistry()
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                cached_predictor(registry)
+            except Exception as e:  # noqa: BLE001 - setiap error berarti set artefak tercampur
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for i in range(40):
+        train.promote(os.path.join('models', 'v2' if i % 2 else 'v1'))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
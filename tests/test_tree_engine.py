@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from benchmarks.synthetic import synthetic_frame
+from fast_preprocess import FusedPreprocessor
+from features import ORIGINAL_COLUMNS_ORDER
+from tree_engine import BLOCK_ROWS, TreeEngine, export_engine, read_header, verify_engine
+
+
+@pytest.fixture(scope='module')
+def engine(fitted, tmp_path_factory):
+    preprocessor, model = fitted
+    path = str(tmp_path_factory.mktemp('engine') / 'model.dtree')
+    export_engine(model, FusedPreprocessor(preprocessor), path)
+    return TreeEngine(path)
+
+
+def test_engine_matches_sklearn(engine, fitted):
+    preprocessor, model = fitted
+    assert verify_engine(engine, model, n_samples=5000) == 0
+    frame = synthetic_frame(BLOCK_ROWS + 500, seed=7)[ORIGINAL_COLUMNS_ORDER]
+    X = engine.fused.transform_frame(frame)
+    np.testing.assert_array_equal(X, preprocessor.transform(frame))
+    np.testing.assert_array_equal(engine.apply(X), model.apply(X))
+    np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+
+
+def test_missing_values_follow_learned_direction(tmp_path, fitted):
+    preprocessor, _ = fitted
+    frame = synthetic_frame(600, seed=8)[ORIGINAL_COLUMNS_ORDER]
+    X = preprocessor.transform(frame)
+    y = np.where(X[:, 0] > np.median(X[:, 0]), 'Y', 'N')
+    X[::5, 0] = np.nan
+    model = DecisionTreeClassifier(random_state=0, max_depth=5).fit(X, y)
+    path = str(tmp_path / 'nan.dtree')
+    export_engine(model, FusedPreprocessor(preprocessor), path)
+    engine = TreeEngine(path)
+    probe = X[:200].copy()
+    probe[::3, :] = np.nan
+    np.testing.assert_array_equal(engine.predict_proba(probe), model.predict_proba(probe))
+
+
+def test_rejects_foreign_files_and_shapes(engine, tmp_path):
+    path = tmp_path / 'bukan.dtree'
+    path.write_bytes(b'NOTATREE' + bytes(64))
+    with pytest.raises(ValueError):
+        read_header(str(path))
+    with pytest.raises(ValueError):
+        engine.apply(np.zeros((2, engine.n_features_in_ + 1)))
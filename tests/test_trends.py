@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_history
+from sheets_client import RIWAYAT_HEADER
+from trends import HASIL_COLUMN, TrendCache, _StreamingReducer, lttb_indices, minmax_indices, trend_series
+
+
+def _history(n_rows, seed=2):
+    return pd.DataFrame(synthetic_history(n_rows, 1, seed=seed), columns=RIWAYAT_HEADER)
+
+
+def _chunks(frame, size):
+    return [frame.iloc[i:i + size] for i in range(0, len(frame), size)]
+
+
+def test_lttb_keeps_endpoints_and_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    selected = lttb_indices(x, y, 20)
+    assert len(selected) == 20
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 437 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_returns_all_points_below_threshold():
+    x = np.arange(10, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(x, x, 50), np.arange(10))
+
+
+def test_minmax_keeps_extremes_of_every_bucket():
+    y = np.random.default_rng(0).normal(size=10_000)
+    selected = minmax_indices(y, 100)
+    assert len(selected) <= 202
+    assert y.argmin() in selected and y.argmax() in selected
+    assert selected[0] == 0 and selected[-1] == len(y) - 1
+
+
+@pytest.mark.parametrize('n_rows', [150, 1500])
+def test_small_history_matches_lttb_over_full_history(n_rows):
+    frame = _history(n_rows)
+    series = trend_series(_chunks(frame, 97), max_points=200)
+
+    from history import TANGGAL_COLUMN, parse_tanggal
+    tanggal = parse_tanggal(frame[TANGGAL_COLUMN])
+    values = pd.to_numeric(frame['HbA1c'], errors='coerce')
+    order = np.argsort(tanggal.to_numpy(), kind='stable')
+    x = tanggal.to_numpy(dtype='datetime64[s]').astype(np.int64).astype(float)[order]
+    y = values.to_numpy(dtype=float)[order]
+    expected = y[lttb_indices(x, y, 200)]
+    np.testing.assert_array_equal(series['HbA1c'].to_numpy(), expected)
+    assert series['HbA1c'].index.is_monotonic_increasing
+
+
+def test_chunking_does_not_change_small_result():
+    frame = _history(800)
+    whole = trend_series([frame])
+    chunked = trend_series(_chunks(frame, 50))
+    for name in whole:
+        pd.testing.assert_series_equal(whole[name], chunked[name])
+
+
+def test_reducer_memory_is_bounded():
+    reducer = _StreamingReducer(max_points=50)
+    rng = np.random.default_rng(1)
+    peak = 0
+    for start in range(0, 100_000, 1000):
+        reducer.add(np.arange(start, start + 1000, dtype=float), rng.normal(size=1000))
+        peak = max(peak, len(reducer.x))
+    assert peak <= 2 * reducer.keep + 1000
+    assert len(reducer.series('y')) == 50
+
+
+def test_large_history_keeps_range_and_point_budget():
+    frame = _history(20_000)
+    series = trend_series(_chunks(frame, 1000), max_points=100)
+    for name, values in series.items():
+        source = frame[name].map({'N': 0, 'P': 1, 'Y': 2}) if name == HASIL_COLUMN else frame[name]
+        source = pd.to_numeric(source, errors='coerce')
+        assert len(values) == 100
+        assert values.max() == source.max() and values.min() == source.min()
+
+
+class _VersionedStorage:
+    def __init__(self, frame):
+        self.frame = frame
+        self.version = 1
+        self.reads = 0
+
+    def history_version(self, username):
+        return self.version
+
+    def iter_user_history(self, username):
+        self.reads += 1
+        return iter(_chunks(self.frame, 100))
+
+
+def test_trend_cache_recomputes_only_when_history_changes():
+    storage = _VersionedStorage(_history(300))
+    cache = TrendCache()
+    first = cache.get(storage, 'Budi')
+    assert cache.get(storage, 'budi') is first
+    assert storage.reads == 1 and cache.stats()['hits'] == 1
+    storage.version = 2
+    cache.get(storage, 'budi')
+    assert storage.reads == 2 and cache.stats()['misses'] == 2
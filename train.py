@@ -0,0 +1,350 @@
+"""Latih ulang model secara offline dari dataset dasar dan ekspor riwayat, lalu tulis artefak berversi.
+
+Data dibaca per potongan (CSV lewat `read_csv(chunksize=...)`, Parquet per
+batch), hanya kolom fitur dan label yang diambil, lalu dinormalisasi ke
+kode yang dipakai model (Gender M/F, kelas N/P/Y). File ekspor riwayat dari
+halaman Riwayat (csv.gz/parquet, label tampilan seperti 'Laki-laki' dan
+'Diabetes') diterima apa adanya. Kolom Hasil di riwayat adalah hasil
+prediksi, bukan diagnosis, jadi hanya ikut dilatih jika diberikan eksplisit.
+
+Preprocessor (`make_preprocessor`) dan model dilatih sebagai satu Pipeline
+sehingga imputasi/scaling di-fit ulang di setiap fold. Pencarian
+hyperparameter memakai GridSearchCV dengan StratifiedKFold dan dijalankan
+paralel di semua core (`--jobs`). Model terbaik (akurasi CV) diuji pada data
+holdout, di-fit ulang dengan seluruh data, dan disimpan ke `models/<versi>/`
+beserta metadata.json (waktu, akurasi, hash artefak). `--promote` menunjuk
+versi tersebut sebagai artefak aktif lewat `models/CURRENT` (diganti atomik);
+app dan serve.py mengikuti pointer ini di setiap pemuatan model tanpa restart.
+Tanpa pointer, artefak di root repo yang dipakai.
+
+Contoh:
+    python train.py                                        # Dataset saja, DecisionTree
+    python train.py --riwayat riwayat-a.csv.gz riwayat-b.parquet
+    python train.py --models tree,forest,extra --cv 5 --jobs -1
+    python train.py --promote                              # latih lalu pakai sebagai model aktif
+    python train.py --promote-only models/20261018-101500  # aktifkan versi yang sudah ada
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+from features import CATEGORICAL_FEATURES, NUMERIC_FEATURES, class_description_mapping
+from fast_preprocess import MANIFEST_PATH
+from predictor import CURRENT_POINTER, MODEL_PATH, MODELS_DIR, PREPROCESSOR_PATH
+from startup import DATASET_PATH
+from tree_engine import ENGINE_PATH
+
+METADATA_FILE = 'metadata.json'
+CHUNK_ROWS = 50_000
+FEATURE_COLUMNS = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+# Dataset memakai kolom CLASS, sheet/ekspor Riwayat memakai Hasil
+LABEL_COLUMNS = ('CLASS', 'Hasil')
+LABEL_CODES = {**{code: code for code in class_description_mapping},
+               **{description.upper(): code for code, description in class_description_mapping.items()}}
+GENDER_CODES = {'M': 'M', 'F': 'F', 'LAKI-LAKI': 'M', 'PEREMPUAN': 'F'}
+
+
+def _search_spaces():
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    # Ensemble memakai n_jobs=1: paralelisme ada di level fold/kandidat GridSearchCV
+    return {
+        'tree': (DecisionTreeClassifier(random_state=42), {
+            'max_depth': [4, 6, 8, 10, None],
+            'min_samples_leaf': [1, 2, 5, 10],
+            'criterion': ['gini', 'entropy'],
+        }),
+        'forest': (RandomForestClassifier(random_state=42, n_jobs=1), {
+            'n_estimators': [100, 200],
+            'max_depth': [6, 10, None],
+            'min_samples_leaf': [1, 3],
+        }),
+        'extra': (ExtraTreesClassifier(random_state=42, n_jobs=1), {
+            'n_estimators': [100, 200],
+            'max_depth': [6, 10, None],
+            'min_samples_leaf': [1, 3],
+        }),
+    }
+
+
+MODEL_NAMES = ('tree', 'forest', 'extra')
+
+
+def normalize_chunk(chunk):
+    """Potongan data mentah -> DataFrame FEATURE_COLUMNS + 'label' (kode N/P/Y); baris tanpa label valid dibuang"""
+    import pandas as pd
+
+    chunk = chunk.rename(columns=lambda c: str(c).strip())
+    label_column = next((c for c in LABEL_COLUMNS if c in chunk.columns), None)
+    if label_column is None:
+        raise ValueError(f"Kolom label tidak ditemukan (salah satu dari {', '.join(LABEL_COLUMNS)})")
+    frame = pd.DataFrame(index=chunk.index)
+    for column in NUMERIC_FEATURES:
+        # Kolom yang tidak ada menjadi NaN dan diisi imputer
+        values = chunk[column] if column in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+        frame[column] = pd.to_numeric(values, errors='coerce').astype('float32')
+    gender = chunk['Gender'] if 'Gender' in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+    # Dataset asli memuat 'f' huruf kecil; None dibiarkan agar diisi imputer
+    frame['Gender'] = gender.astype('string').str.strip().str.upper().map(GENDER_CODES).astype(object)
+    frame['label'] = chunk[label_column].astype('string').str.strip().str.upper().map(LABEL_CODES)
+    return frame[frame['label'].notna()]
+
+
+def _wanted(column):
+    return str(column).strip() in FEATURE_COLUMNS or str(column).strip() in LABEL_COLUMNS
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Potongan DataFrame ternormalisasi dari file CSV (boleh .gz) atau Parquet"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in parquet.schema_arrow.names if _wanted(name)]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield normalize_chunk(batch.to_pandas())
+        return
+    import pandas as pd
+
+    # Kolom dibaca sebagai string; konversi tipe dilakukan sekali di normalize_chunk
+    with pd.read_csv(path, chunksize=chunk_rows, usecols=_wanted, dtype=str) as reader:
+        for chunk in reader:
+            yield normalize_chunk(chunk)
+
+
+def load_training_data(dataset_path=DATASET_PATH, riwayat_paths=(), chunk_rows=CHUNK_ROWS):
+    """(DataFrame gabungan, {path: jumlah baris}) dari dataset dasar dan file ekspor riwayat"""
+    import pandas as pd
+
+    parts, sources = [], {}
+    for path in [p for p in (dataset_path, *riwayat_paths) if p]:
+        rows = 0
+        for chunk in iter_chunks(path, chunk_rows):
+            parts.append(chunk)
+            rows += len(chunk)
+        sources[path] = rows
+    if not parts:
+        raise ValueError("Tidak ada data latih")
+    frame = pd.concat(parts, ignore_index=True)
+    if frame.empty:
+        raise ValueError("Tidak ada baris dengan label valid di data latih")
+    return frame, sources
+
+
+def _cv_folds(labels, folds):
+    """Jumlah fold dibatasi kelas terkecil agar StratifiedKFold tetap valid"""
+    smallest = int(labels.value_counts().min())
+    if min(folds, smallest) < 2:
+        raise ValueError(f"Setiap kelas butuh minimal 2 baris untuk cross-validation (terkecil: {smallest})")
+    return min(folds, smallest)
+
+
+def search_models(X, y, model_names=('tree',), folds=5, jobs=-1, seed=42):
+    """GridSearchCV paralel per jenis model; kembalikan daftar hasil terurut dari akurasi CV tertinggi"""
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+    from sklearn.pipeline import Pipeline
+
+    from features import make_preprocessor
+
+    spaces = _search_spaces()
+    cv = StratifiedKFold(n_splits=_cv_folds(y, folds), shuffle=True, random_state=seed)
+    results = []
+    for name in model_names:
+        estimator, grid = spaces[name]
+        pipeline = Pipeline([('preprocessor', make_preprocessor()), ('model', estimator)])
+        search = GridSearchCV(pipeline, {f'model__{k}': v for k, v in grid.items()}, scoring='accuracy',
+                              cv=cv, n_jobs=jobs, refit=True)
+        start = time.perf_counter()
+        search.fit(X, y)
+        seconds = time.perf_counter() - start
+        best = search.best_index_
+        results.append({
+            'model': name,
+            'params': {k.removeprefix('model__'): v for k, v in search.best_params_.items()},
+            'cv_accuracy': float(search.cv_results_['mean_test_score'][best]),
+            'cv_std': float(search.cv_results_['std_test_score'][best]),
+            'candidates': len(search.cv_results_['params']),
+            'folds': cv.n_splits,
+            'search_seconds': round(seconds, 3),
+            'mean_fit_seconds': float(search.cv_results_['mean_fit_time'][best]),
+            'pipeline': search.best_estimator_,
+        })
+    return sorted(results, key=lambda r: r['cv_accuracy'], reverse=True)
+
+
+def _atomic_dump(obj, path):
+    import joblib
+
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_artifacts(pipeline, directory, metadata):
+    """Tulis preprocessor, model, manifest fitur, dan (untuk DecisionTree) tree engine ke `directory`"""
+    from fast_preprocess import FusedPreprocessor, UnsupportedPreprocessor, write_manifest
+    from model_registry import file_sha256
+    from tree_engine import TreeEngine, export_engine, verify_engine
+
+    os.makedirs(directory, exist_ok=True)
+    preprocessor, model = pipeline.named_steps['preprocessor'], pipeline.named_steps['model']
+    paths = {name: os.path.join(directory, os.path.basename(name))
+             for name in (PREPROCESSOR_PATH, MODEL_PATH, MANIFEST_PATH, ENGINE_PATH)}
+    _atomic_dump(preprocessor, paths[PREPROCESSOR_PATH])
+    _atomic_dump(model, paths[MODEL_PATH])
+    try:
+        fused = FusedPreprocessor(preprocessor)
+    except UnsupportedPreprocessor:
+        fused = None
+    if fused is not None:
+        write_manifest(fused, model, paths[MANIFEST_PATH])
+    if fused is not None and hasattr(model, 'tree_'):
+        source = {'model_sha256': file_sha256(paths[MODEL_PATH]),
+                  'preprocessor_sha256': file_sha256(paths[PREPROCESSOR_PATH])}
+        export_engine(model, fused, paths[ENGINE_PATH], source=source)
+        mismatched = verify_engine(TreeEngine(paths[ENGINE_PATH]), model)
+        if mismatched:
+            os.remove(paths[ENGINE_PATH])
+            raise RuntimeError(f"Verifikasi tree engine gagal: {mismatched} baris berbeda dari predict_proba")
+    metadata['artefak'] = {os.path.basename(path): file_sha256(path) for path in paths.values() if os.path.exists(path)}
+    with open(os.path.join(directory, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+    return metadata
+
+
+def promote(directory, models_dir=MODELS_DIR):
+    """Jadikan versi `directory` (subdirektori `models_dir`) sebagai artefak aktif; kembalikan nama versinya.
+
+    File versi tidak pernah disalin atau diubah. Yang diganti hanya pointer
+    `CURRENT` lewat satu os.replace, sehingga pembaca (active_artifacts)
+    selalu melihat set model/preprocessor/manifest/engine yang utuh, baik
+    versi lama maupun baru. Versi dimuat dan dicek dulu sebelum pointer diganti.
+    """
+    from fast_preprocess import check_layout
+    from model_registry import ModelRegistry
+    from predictor import load_predictor
+
+    directory = os.path.abspath(directory)
+    if os.path.dirname(directory) != os.path.abspath(models_dir):
+        raise ValueError(f"Versi harus berada langsung di dalam {models_dir}/: {directory}")
+    paths = {name: os.path.join(directory, os.path.basename(name))
+             for name in (MODEL_PATH, PREPROCESSOR_PATH, ENGINE_PATH, MANIFEST_PATH)}
+    for name in (MODEL_PATH, PREPROCESSOR_PATH):
+        if not os.path.exists(paths[name]):
+            raise FileNotFoundError(f"Artefak {paths[name]} tidak ditemukan")
+    predictor = load_predictor(ModelRegistry(), model_path=paths[MODEL_PATH],
+                               preprocessor_path=paths[PREPROCESSOR_PATH], engine_path=paths[ENGINE_PATH])
+    if predictor.fused is not None:
+        check_layout(predictor.layout, predictor.model, manifest_path=paths[MANIFEST_PATH])
+
+    version = os.path.basename(directory)
+    pointer_path = os.path.join(models_dir, os.path.basename(CURRENT_POINTER))
+    tmp_path = f"{pointer_path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, pointer_path)
+    return version
+
+
+def train(dataset_path=DATASET_PATH, riwayat_paths=(), model_names=('tree',), folds=5, jobs=-1, holdout=0.2,
+          seed=42, models_dir=MODELS_DIR, chunk_rows=CHUNK_ROWS):
+    """Jalankan seluruh pipeline pelatihan; kembalikan (direktori versi, metadata)"""
+    import sklearn
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+
+    timings = {}
+    start = time.perf_counter()
+    frame, sources = load_training_data(dataset_path, riwayat_paths, chunk_rows)
+    timings['muat_data'] = time.perf_counter() - start
+    X, y = frame[FEATURE_COLUMNS], frame['label']
+
+    if holdout:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=holdout, stratify=y, random_state=seed)
+    else:
+        X_train, X_test, y_train, y_test = X, None, y, None
+    start = time.perf_counter()
+    results = search_models(X_train, y_train, model_names, folds=folds, jobs=jobs, seed=seed)
+    timings['pencarian'] = time.perf_counter() - start
+    best = results[0]
+    holdout_accuracy = None
+    if X_test is not None:
+        holdout_accuracy = float(accuracy_score(y_test, best['pipeline'].predict(X_test)))
+
+    # Artefak akhir di-fit dengan seluruh data memakai hyperparameter terbaik
+    start = time.perf_counter()
+    pipeline = clone(best['pipeline']).fit(X, y)
+    timings['fit_akhir'] = time.perf_counter() - start
+
+    version = time.strftime('%Y%m%d-%H%M%S')
+    directory = os.path.join(models_dir, version)
+    metadata = {
+        'versi': version,
+        'dibuat': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sklearn': sklearn.__version__,
+        'data': {'sumber': sources, 'baris': len(frame), 'kelas': y.value_counts().sort_index().to_dict(),
+                 'holdout': holdout},
+        'model': best['model'],
+        'params': best['params'],
+        'cv_accuracy': best['cv_accuracy'],
+        'cv_std': best['cv_std'],
+        'holdout_accuracy': holdout_accuracy,
+        'kandidat': [{k: v for k, v in r.items() if k != 'pipeline'} for r in results],
+        'waktu_detik': {k: round(v, 3) for k, v in timings.items()},
+    }
+    # Ditulis ke direktori sementara lalu di-rename: versi di models/ selalu lengkap
+    staging = os.path.join(models_dir, f".{version}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        write_artifacts(pipeline, staging, metadata)
+        os.rename(staging, directory)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging)
+    return directory, metadata
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Latih ulang model dan tulis artefak berversi")
+    parser.add_argument('--dataset', default=DATASET_PATH, help='CSV dataset dasar (kolom CLASS); "" untuk melewati')
+    parser.add_argument('--riwayat', nargs='*', default=[], help='File ekspor riwayat (csv.gz/parquet)')
+    parser.add_argument('--models', default='tree', help=f"Jenis model dipisah koma: {','.join(MODEL_NAMES)}. "
+                        "Hanya tree yang bisa memakai tree engine di app")
+    parser.add_argument('--cv', type=int, default=5, help='Jumlah fold cross-validation')
+    parser.add_argument('--jobs', type=int, default=-1, help='Proses paralel GridSearchCV (-1 = semua core)')
+    parser.add_argument('--holdout', type=float, default=0.2, help='Porsi data uji (0 = tanpa holdout)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--models-dir', default=MODELS_DIR, help=f'App dan serve.py membaca {CURRENT_POINTER}')
+    parser.add_argument('--promote', action='store_true', help='Jadikan artefak hasil latih sebagai artefak aktif app')
+    parser.add_argument('--promote-only', metavar='DIR', help='Aktifkan artefak versi yang sudah ada tanpa melatih')
+    args = parser.parse_args(argv)
+
+    if args.promote_only:
+        print(f"Versi aktif: {promote(args.promote_only, args.models_dir)}")
+        return
+    model_names = [name.strip() for name in args.models.split(',') if name.strip()]
+    unknown = sorted(set(model_names) - set(MODEL_NAMES))
+    if unknown:
+        parser.error(f"Jenis model tidak dikenal: {', '.join(unknown)}")
+    directory, metadata = train(args.dataset, args.riwayat, model_names, folds=args.cv, jobs=args.jobs,
+                                holdout=args.holdout, models_dir=args.models_dir, chunk_rows=args.chunk_rows)
+    print(f"Data: {metadata['data']['baris']} baris {metadata['data']['kelas']}")
+    for result in metadata['kandidat']:
+        print(f"{result['model']:8s} CV {result['cv_accuracy']:.4f} ± {result['cv_std']:.4f} "
+              f"({result['candidates']} kandidat x {result['folds']} fold, {result['search_seconds']:.1f} s) "
+              f"{result['params']}")
+    if metadata['holdout_accuracy'] is not None:
+        print(f"Akurasi holdout {metadata['model']}: {metadata['holdout_accuracy']:.4f}")
+    print(f"Waktu (detik): {metadata['waktu_detik']}")
+    print(f"Artefak ditulis ke {directory}")
+    if args.promote:
+        print(f"Versi aktif: {promote(directory, args.models_dir)}")
+
+
+if __name__ == '__main__':
+    main()
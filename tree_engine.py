@@ -0,0 +1,243 @@
+"""Mesin inferensi decision tree murni NumPy dengan artefak biner yang bisa di-mmap.
+
+Decision tree hanyalah array indeks fitur, threshold, anak kiri/kanan, dan
+nilai leaf. Exporter menulis array tersebut beserta parameter preprocessor
+terkompilasi (FusedPreprocessor) ke satu file `.dtree`:
+
+    MAGIC (8 byte) | panjang header (uint64 LE) | header JSON | array mentah (rata 64 byte)
+
+TreeEngine membuka file dengan `np.memmap` sehingga worker yang berbeda
+berbagi halaman memori yang sama dan startup tidak memerlukan sklearn
+maupun unpickle. Evaluasi dilakukan per level pohon untuk seluruh batch
+sekaligus. Hasil identik dengan `model_dt.predict_proba`: input dikonversi
+ke float32 dan dibandingkan dengan `x <= threshold` seperti di scikit-learn.
+
+Contoh:
+    python tree_engine.py --export   # tulis model_engine.dtree dari artefak pkl dan verifikasi
+    python tree_engine.py --info     # tampilkan header artefak
+"""
+import json
+import os
+
+import numpy as np
+
+from fast_preprocess import FusedPreprocessor, check_layout
+
+ENGINE_PATH = 'model_engine.dtree'
+ENGINE_MAGIC = b'DTENGINE'
+ENGINE_VERSION = 1
+_ALIGN = 64
+BLOCK_ROWS = 8192
+
+
+class TreeArrays:
+    """Array struktur pohon dengan nama atribut yang sama seperti `sklearn.tree._tree.Tree`"""
+
+    def __init__(self, feature, threshold, children_left, children_right, missing_go_to_left, value, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.max_depth = max_depth
+        self.node_count = len(feature)
+
+
+def _leaf_proba(model):
+    """Probabilitas per node dengan normalisasi yang sama seperti DecisionTreeClassifier.predict_proba"""
+    proba = np.array(model.tree_.value[:, 0, :model.n_classes_], dtype=np.float64)
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    proba /= normalizer
+    return proba
+
+
+def export_engine(model, fused, path=ENGINE_PATH, source=None):
+    """Tulis model pohon dan FusedPreprocessor ke artefak `.dtree` secara atomik"""
+    if not hasattr(model, 'tree_') or getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Hanya DecisionTreeClassifier dengan satu output yang bisa diekspor")
+    check_layout(fused.layout(), model, manifest_path=None)
+    tree = model.tree_
+    missing = getattr(tree, 'missing_go_to_left', None)
+    arrays = {
+        'feature': np.asarray(tree.feature, dtype=np.int64),
+        'threshold': np.asarray(tree.threshold, dtype=np.float64),
+        'children_left': np.asarray(tree.children_left, dtype=np.int64),
+        'children_right': np.asarray(tree.children_right, dtype=np.int64),
+        # Tanpa info missing value (sklearn lama), NaN <= threshold bernilai False sehingga ke kanan
+        'missing_go_to_left': (np.asarray(missing, dtype=np.uint8) if missing is not None
+                               else np.zeros(tree.node_count, dtype=np.uint8)),
+        'value': _leaf_proba(model),
+    }
+    preprocessor_spec, preprocessor_arrays = fused.spec()
+    arrays.update(preprocessor_arrays)
+
+    header = {
+        'version': ENGINE_VERSION,
+        'classes': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+        'n_features_in': int(model.n_features_in_),
+        'max_depth': int(tree.max_depth),
+        'preprocessor': preprocessor_spec,
+        'source': source or {},
+        'arrays': {},
+    }
+    # Offset dihitung relatif terhadap awal blok data sehingga tidak bergantung pada panjang header
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(ENGINE_MAGIC) + 8 + len(header_bytes)) // _ALIGN) * _ALIGN
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(ENGINE_MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(ENGINE_MAGIC)) != ENGINE_MAGIC:
+            raise ValueError(f"{path} bukan artefak tree engine")
+        length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(length).decode('utf-8'))
+    if header.get('version') != ENGINE_VERSION:
+        raise ValueError(f"Versi artefak {header.get('version')} tidak didukung (harus {ENGINE_VERSION})")
+    header['_data_start'] = -(-(len(ENGINE_MAGIC) + 8 + length) // _ALIGN) * _ALIGN
+    return header
+
+
+class TreeEngine:
+    """Pengganti `model_dt` untuk inferensi: `predict_proba`, `predict`, `classes_`, `n_features_in_`.
+
+    Atribut `fused` berisi preprocessor terkompilasi dari artefak yang sama.
+    """
+
+    def __init__(self, path=ENGINE_PATH):
+        self.path = path
+        header = read_header(path)
+        self.header = header
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        arrays = {}
+        for name, meta in header['arrays'].items():
+            start = header['_data_start'] + meta['offset']
+            dtype = np.dtype(meta['dtype'])
+            count = int(np.prod(meta['shape'], dtype=np.int64))
+            arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=start).reshape(meta['shape'])
+        self.classes_ = np.array(header['classes'], dtype=object)
+        self.n_classes_ = len(self.classes_)
+        self.n_features_in_ = header['n_features_in']
+        self.tree_ = TreeArrays(arrays['feature'], arrays['threshold'], arrays['children_left'],
+                                arrays['children_right'], arrays['missing_go_to_left'].astype(bool),
+                                arrays['value'], header['max_depth'])
+        self.fused = FusedPreprocessor.from_spec(header['preprocessor'], arrays)
+        self._compile()
+
+    def _compile(self):
+        """Leaf dijadikan node yang menunjuk dirinya sendiri sehingga setiap level bisa dievaluasi tanpa masking"""
+        tree = self.tree_
+        leaf = tree.feature < 0
+        nodes = np.arange(tree.node_count)
+        self._feature = np.where(leaf, 0, tree.feature).astype(np.intp)
+        self._threshold = np.where(leaf, np.inf, tree.threshold)
+        self._missing_left = np.where(leaf, False, tree.missing_go_to_left)
+        # next[2 * node + (x <= threshold)]: indeks genap = anak kanan, ganjil = anak kiri
+        self._next = np.stack([np.where(leaf, nodes, tree.children_right),
+                               np.where(leaf, nodes, tree.children_left)], axis=1).astype(np.intp).ravel()
+
+    def apply(self, X):
+        """Indeks leaf untuk setiap baris, dievaluasi per level untuk seluruh batch"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X harus berbentuk (n, {self.n_features_in_}), bukan {X.shape}")
+        if len(X) <= BLOCK_ROWS:
+            return self._apply_block(X)
+        # Batch besar diproses per blok agar array sementara tetap muat di cache CPU
+        node = np.empty(len(X), dtype=np.intp)
+        for start in range(0, len(X), BLOCK_ROWS):
+            node[start:start + BLOCK_ROWS] = self._apply_block(X[start:start + BLOCK_ROWS])
+        return node
+
+    def _apply_block(self, X):
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        row_base = np.arange(n_rows, dtype=np.intp) * n_features
+        node = np.zeros(n_rows, dtype=np.intp)
+        for _ in range(self.tree_.max_depth):
+            # Hanya nilai yang dibutuhkan yang dikonversi ke float32, lalu dibandingkan dengan
+            # threshold float64, sama dengan Tree.apply di scikit-learn
+            values = np.take(flat, row_base + np.take(self._feature, node)).astype(np.float32)
+            go_left = values <= np.take(self._threshold, node)
+            missing = np.isnan(values)
+            if missing.any():
+                go_left = np.where(missing, np.take(self._missing_left, node), go_left)
+            node = np.take(self._next, 2 * node + go_left)
+        return node
+
+    def predict_proba(self, X):
+        return np.take(self.tree_.value, self.apply(X), axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def verify_engine(engine, model, n_samples=20000, seed=0):
+    """Bandingkan engine dengan model sklearn pada input sintetis; kembalikan jumlah baris berbeda"""
+    import pandas as pd
+
+    from features import FEATURE_RANGES, GENDER_VALUES, ORIGINAL_COLUMNS_ORDER
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({column: rng.uniform(lo, hi, n_samples) for column, (lo, hi) in FEATURE_RANGES.items()})
+    frame['Gender'] = rng.choice(GENDER_VALUES, n_samples)
+    frame['ID'] = rng.integers(1, 1000, n_samples)
+    frame['No_Pation'] = rng.integers(10000, 99999, n_samples)
+    X = engine.fused.transform_frame(frame[ORIGINAL_COLUMNS_ORDER])
+    # Sisipkan nilai persis di threshold agar kasus batas ikut teruji
+    internal = model.tree_.feature >= 0
+    for i, (feature, threshold) in enumerate(zip(model.tree_.feature[internal], model.tree_.threshold[internal])):
+        X[i % n_samples, feature] = threshold
+    return int((model.predict_proba(X) != engine.predict_proba(X)).any(axis=1).sum())
+
+
+def main(argv=None):
+    import argparse
+
+    from model_registry import default_registry, file_sha256
+    from predictor import MODEL_PATH, PREPROCESSOR_PATH
+
+    parser = argparse.ArgumentParser(description="Ekspor dan periksa artefak tree engine")
+    parser.add_argument('--export', action='store_true', help=f'Tulis {ENGINE_PATH} dari artefak pkl')
+    parser.add_argument('--info', action='store_true', help='Tampilkan header artefak')
+    parser.add_argument('--path', default=ENGINE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.export:
+        registry = default_registry()
+        preprocessor = registry.get(PREPROCESSOR_PATH)
+        model = registry.get(MODEL_PATH)
+        source = {'model_sha256': file_sha256(MODEL_PATH), 'preprocessor_sha256': file_sha256(PREPROCESSOR_PATH)}
+        export_engine(model, FusedPreprocessor(preprocessor), args.path, source=source)
+        mismatched = verify_engine(TreeEngine(args.path), model)
+        if mismatched:
+            os.remove(args.path)
+            raise SystemExit(f"Verifikasi gagal: {mismatched} baris berbeda dari model_dt.predict_proba")
+        print(f"Artefak ditulis ke {args.path} ({os.path.getsize(args.path)} byte), hasil identik dengan model_dt")
+    if args.info:
+        header = read_header(args.path)
+        header.pop('preprocessor')
+        print(json.dumps(header, indent=2))
+
+
+if __name__ == '__main__':
+    main()
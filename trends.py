@@ -0,0 +1,161 @@
+"""Deret tren nilai lab dan hasil prediksi per user untuk grafik di halaman riwayat.
+
+Deret dihitung di server dari riwayat yang sudah di-cache penyimpanan, lalu
+diperkecil ke anggaran titik tetap dengan LTTB (Largest-Triangle-Three-Buckets)
+yang mempertahankan bentuk kurva (puncak dan lembah tetap terlihat). Riwayat
+dipadatkan per potongan sehingga memori tidak bergantung pada panjang riwayat.
+Hasilnya disimpan per user di TrendCache sampai `history_version` user berubah.
+"""
+import threading
+from collections import OrderedDict
+
+from metrics import span
+
+TREND_COLUMNS = ('HbA1c', 'BMI', 'Chol', 'TG')
+# Hasil prediksi sebagai angka agar bisa digambar sebagai deret
+HASIL_COLUMN = 'Hasil'
+HASIL_LEVELS = {'N': 0, 'P': 1, 'Y': 2}
+TREND_POINTS = 200
+
+
+def lttb_indices(x, y, threshold):
+    """Indeks titik yang dipilih LTTB dari deret (x, y) terurut; semua titik jika len(x) <= threshold"""
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        # Titik rata-rata bucket berikutnya menjadi ujung ketiga segitiga
+        next_start, next_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, buckets):
+    """Indeks titik terendah dan tertinggi di setiap bucket (jumlah titik sama), plus kedua ujung; vektor penuh"""
+    import numpy as np
+
+    n = len(y)
+    if n <= 2 * buckets + 2:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    # Di dalam setiap bucket terurut menurut y: elemen pertama = minimum, terakhir = maksimum
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate([[0, n - 1], order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+class _StreamingReducer:
+    """Titik (x, y) satu deret yang dipadatkan setiap kali melebihi batas.
+
+    Pemadatan antara memakai min/max per bucket (vektor, puncak dan lembah
+    tetap ada); LTTB dijalankan sekali di akhir. Memori hanya sebesar satu
+    potongan riwayat ditambah `16 * max_points` titik, berapa pun panjang
+    riwayatnya. Jika total titik tidak melebihi batas, hasilnya sama dengan
+    LTTB atas seluruh riwayat.
+    """
+
+    def __init__(self, max_points):
+        import numpy as np
+
+        self.max_points = max_points
+        self.keep = 8 * max_points
+        self.x = np.empty(0, dtype=float)
+        self.y = np.empty(0, dtype=float)
+
+    def _sort(self):
+        import numpy as np
+
+        # Urutan simpan tidak selalu urutan waktu (baris lama tanpa jam); kedua reduksi butuh x terurut
+        order = np.argsort(self.x, kind='stable')
+        self.x, self.y = self.x[order], self.y[order]
+
+    def add(self, x, y):
+        import numpy as np
+
+        self.x, self.y = np.concatenate([self.x, x]), np.concatenate([self.y, y])
+        if len(self.x) > 2 * self.keep:
+            self._sort()
+            selected = minmax_indices(self.y, self.keep // 2)
+            self.x, self.y = self.x[selected], self.y[selected]
+
+    def series(self, name):
+        import numpy as np
+        import pandas as pd
+
+        from history import TANGGAL_COLUMN
+
+        self._sort()
+        selected = lttb_indices(self.x, self.y, self.max_points)
+        index = pd.DatetimeIndex(self.x[selected].astype(np.int64).astype('datetime64[s]').astype('datetime64[ns]'),
+                                 name=TANGGAL_COLUMN)
+        return pd.Series(self.y[selected], index=index, name=name)
+
+
+def trend_series(chunks, columns=TREND_COLUMNS, max_points=TREND_POINTS):
+    """{kolom: Series} dari potongan riwayat user; `HASIL_COLUMN` berisi level HASIL_LEVELS.
+
+    Setiap potongan langsung dipadatkan ke reducer per kolom, tidak digabung dulu menjadi satu frame.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from history import TANGGAL_COLUMN, parse_tanggal
+
+    names = (*columns, HASIL_COLUMN)
+    reducers = {name: _StreamingReducer(max_points) for name in names}
+    for chunk in chunks:
+        frame = chunk.reindex(columns=[TANGGAL_COLUMN, *names])
+        tanggal = parse_tanggal(frame[TANGGAL_COLUMN])
+        x = tanggal.to_numpy(dtype='datetime64[s]').astype(np.int64).astype(float)
+        has_tanggal = tanggal.notna().to_numpy()
+        for name in names:
+            raw = frame[name].map(HASIL_LEVELS) if name == HASIL_COLUMN else frame[name]
+            values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+            mask = has_tanggal & ~np.isnan(values)
+            reducers[name].add(x[mask], values[mask])
+    return {name: reducers[name].series(name) for name in names}
+
+
+class TrendCache:
+    """Deret tren terakhir per user, dihitung ulang hanya jika riwayat user berubah"""
+
+    def __init__(self, max_users=256, max_points=TREND_POINTS):
+        self.max_users = max_users
+        self.max_points = max_points
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, storage, username):
+        key = str(username).lower()
+        version = storage.history_version(username)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        with span('trend_series'):
+            series = trend_series(storage.iter_user_history(username), max_points=self.max_points)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, series)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return series
+
+    def stats(self):
+        with self._lock:
+            return {'entri': len(self._entries), 'maks': self.max_users, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from metrics import span
+
+
+def column_letter(index):
+    """Ubah indeks kolom (1-based) menjadi huruf kolom A1, mis. 1 -> 'A', 27 -> 'AA'"""
+    letters = ''
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+class UserDirectory:
+    """Indeks username -> data user di memori, disinkronkan dari sheet "Users".
+
+    Setelah TTL habis hanya baris baru (setelah baris terakhir yang sudah
+    disinkronkan) yang diambil. Sinkronisasi penuh tetap dilakukan berkala
+    untuk menangkap perubahan pada baris lama. Login dan lookup profil
+    menjadi akses dict O(1).
+    """
+
+    def __init__(self, get_worksheet, ttl=60, full_refresh_interval=600, title="Users"):
+        self._get_worksheet = get_worksheet
+        self.title = title
+        self.ttl = ttl
+        self.full_refresh_interval = full_refresh_interval
+        self._lock = threading.Lock()
+        self._header = None
+        self._index = {}
+        self._row_count = 0
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+        self.generation = 0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    def _to_record(self, row):
+        padded = list(row) + [''] * (len(self._header) - len(row))
+        return dict(zip(self._header, padded))
+
+    def _apply_full(self, values):
+        self._header = values[0] if values else []
+        self._index = {}
+        for row in values[1:]:
+            record = self._to_record(row)
+            self._index[str(record.get('username', ''))] = record
+        self._row_count = max(len(values) - 1, 0)
+        self._full_synced_at = time.monotonic()
+        self.full_syncs += 1
+
+    def _apply_rows(self, rows):
+        for row in rows:
+            if not any(cell != '' for cell in row):
+                continue
+            record = self._to_record(row)
+            self._index[str(record.get('username', ''))] = record
+        self._row_count += len(rows)
+        self.incremental_syncs += 1
+
+    def _plan(self, force):
+        """None jika indeks masih segar, '' untuk sinkronisasi penuh, atau range A1 baris baru"""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.ttl:
+            return None
+        if self._header is None or now - self._full_synced_at >= self.full_refresh_interval:
+            return ''
+        # Baris 1 adalah header, data ke-n berada di baris n + 1
+        return f"A{self._row_count + 2}:{column_letter(len(self._header))}"
+
+    def sync_range(self, force=False):
+        """Range A1 (dengan nama sheet) yang perlu dibaca untuk menyegarkan indeks, atau None.
+        Dipakai bersama `apply_range` untuk menggabungkan beberapa sheet dalam satu batch read."""
+        plan = self._plan(force)
+        if plan is None:
+            return None
+        return f"'{self.title}'!{plan}" if plan else f"'{self.title}'"
+
+    def apply_range(self, range_name, values, generation=None):
+        """Terapkan hasil pembacaan `sync_range`; diabaikan (False) jika indeks berubah sejak range dibuat"""
+        with self._lock:
+            if range_name != self.sync_range(force=True):
+                return False
+            if '!' in range_name:
+                self._apply_rows(values)
+            else:
+                self._apply_full(values)
+            # invalidate() selama pembacaan berjalan: baris tetap dipakai, tetapi tetap dianggap basi
+            if generation is None or generation == self.generation:
+                self._synced_at = time.monotonic()
+            return True
+
+    def refresh(self, force=False):
+        with self._lock:
+            plan = self._plan(force)
+            if plan is None:
+                return
+            with span('load_user_data'):
+                worksheet = self._get_worksheet()
+                if plan:
+                    self._apply_rows(worksheet.get_values(plan))
+                else:
+                    self._apply_full(worksheet.get_all_values())
+            self._synced_at = time.monotonic()
+
+    def invalidate(self):
+        """Tandai indeks basi sehingga akses berikutnya mengambil baris baru"""
+        with self._lock:
+            self._synced_at = 0.0
+            self.generation += 1
+
+    def get(self, username):
+        self.refresh()
+        return self._index.get(str(username))
+
+    def exists(self, username):
+        # Selalu ambil baris baru dulu agar cek duplikat tidak memakai data basi
+        self.refresh(force=True)
+        return str(username) in self._index
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,54 @@
+"""Statistik prediksi per user yang diperbarui secara inkremental setiap ada baris riwayat baru.
+
+Bentuk tersimpan (dict, bisa diserialisasi JSON):
+    {'total': 3, 'Y': 1, 'P': 1, 'N': 1,
+     'sum': {'HbA1c': 18.2, 'BMI': 75.0}, 'count': {'HbA1c': 3, 'BMI': 3},
+     'latest': {'Tanggal Prediksi': '1 September 2025', 'Hasil': 'Y'}}
+"""
+
+CLASS_LABELS = ('Y', 'P', 'N')
+MEAN_COLUMNS = ('HbA1c', 'BMI')
+
+
+def new_stats():
+    stats = {'total': 0, 'sum': {c: 0.0 for c in MEAN_COLUMNS}, 'count': {c: 0 for c in MEAN_COLUMNS}, 'latest': None}
+    stats.update({label: 0 for label in CLASS_LABELS})
+    return stats
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def update_stats(stats, record):
+    """Tambahkan satu baris riwayat (dict dengan kolom RIWAYAT_HEADER) ke statistik, O(1)"""
+    stats['total'] += 1
+    hasil = str(record.get('Hasil', ''))
+    if hasil in CLASS_LABELS:
+        stats[hasil] += 1
+    for column in MEAN_COLUMNS:
+        value = _number(record.get(column))
+        if value is not None:
+            stats['sum'][column] += value
+            stats['count'][column] += 1
+    stats['latest'] = {'Tanggal Prediksi': record.get('Tanggal Prediksi'), 'Hasil': hasil}
+    return stats
+
+
+def summarize(stats):
+    """Nilai siap tampil: jumlah per kelas, prediksi terakhir, dan rata-rata berjalan"""
+    stats = stats or new_stats()
+    summary = {'total': stats['total'], **{label: stats[label] for label in CLASS_LABELS}}
+    latest = stats.get('latest') or {}
+    summary['latest_hasil'] = latest.get('Hasil')
+    summary['latest_tanggal'] = latest.get('Tanggal Prediksi')
+    for column in MEAN_COLUMNS:
+        count = stats['count'][column]
+        summary[f'mean_{column}'] = stats['sum'][column] / count if count else None
+    return summary